@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import GameSession
+from .models import Dartboard, GameSession, Task
 
 
-admin.site.register(GameSession)
\ No newline at end of file
+admin.site.register(GameSession)
+admin.site.register(Dartboard)
+admin.site.register(Task)
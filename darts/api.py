@@ -0,0 +1,316 @@
+"""
+JSON API for scoring devices, mounted under /api/v1/ (see api_urls.py).
+
+Electronic boards and scoring apps log in like the browser, with the session cookie and the
+CSRF token on writes, and get compact JSON instead of rendered pages:
+
+    GET     sessions/                           game sessions, newest first, keyset paginated like the home page
+    POST    sessions/                           {"game_type": 1, "players": [3, 4]}, player ids in seat order, each once
+    GET     sessions/state/?uuid=<uuid>&...     state of up to STATE_BATCH_SIZE game sessions in one call
+    GET     sessions/<uuid>/                    state of a game session, its version is the ETag
+    POST    sessions/<uuid>/turns/              one turn, same body and answer as the play page's turn endpoint
+    POST    sessions/<uuid>/undo/               optional {"version": n}
+    GET     players/                            players by name
+    POST    players/                            {"name": "Anna"}
+    GET, PATCH, DELETE players/<id>/
+    POST    boards/events/                      darts of an electronic board, see board_events_view
+
+Errors are {"error": message} with a 4xx status, invalid fields are listed in "fields".
+"""
+from functools import wraps
+import json
+import uuid as uuid_lib
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET, require_http_methods, require_POST
+
+from .cache import roster
+from .checkouts import MAX_CHECKOUT
+from .db import ScoresChanged, delete_player
+from .forms import GameCreateForm
+from .history import start_history
+from .ingest import TAKEOUT, QueueFull, offer
+from .models import Dartboard, GameSession, Player
+from .signals import UndoRefused
+from .stats import skill_buckets
+from .utils import checkout_tables, start_scores
+from .views import CONFLICT_MESSAGE, home_page, is_int, json_turn_response, parse_hit, parse_version, undo_turn
+from user.forms import PlayerForm
+from user.models import PlayerStats
+
+
+# game sessions one batch state request may ask for
+STATE_BATCH_SIZE = 50
+
+
+def api_login_required(view):
+    """401 with a JSON error instead of the login page redirect"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def read_json(request):
+    """Object in the request body, empty for an empty body. Raises ValueError if it isn't a JSON object"""
+    if not request.body:
+        return {}
+    data = json.loads(request.body)
+    if not isinstance(data, dict):
+        raise ValueError('Body must be a JSON object')
+    return data
+
+
+def form_errors(form):
+    return {name: list(messages) for name, messages in form.errors.items()}
+
+
+def owned_game(request, uuid):
+    return GameSession.objects.filter(owner_id=request.user, uuid=uuid).first()
+
+
+def session_summary(game):
+    """Game session as listed, players in seat order"""
+    return {
+        'uuid': str(game.uuid),
+        'game_type': game.game_type,
+        'players': [{'id': player.id, 'name': player.name} for player in game.seated_players() if player],
+        'version': game.version,
+        'turn_count': game.turn_count,
+        'time_modified': game.time_modified.isoformat(),
+    }
+
+
+def session_state(game, buckets):
+    """Scores of a game session, X01 games add the checkout advised for the player to throw, None if there is none.
+    `buckets` are the skill buckets of the seats"""
+    state = {'uuid': str(game.uuid), 'game_type': game.game_type, 'version': game.version, 'turn_count': game.turn_count, 'scores': game.scores}
+    if not game.is_cricket:
+        seat = game.scores['turn']
+        points = game.scores['points'][seat]
+        state['checkout'] = checkout_tables(buckets[seat])[3][points] if points <= MAX_CHECKOUT else None
+    return state
+
+
+def session_states(games):
+    """States of many game sessions with the skill of all their players read in one query"""
+    seats = [player_id for game in games for player_id in game.scores['seats']]
+    buckets = dict(zip(seats, skill_buckets(seats)))
+    return [session_state(game, [buckets[player_id] for player_id in game.scores['seats']]) for game in games]
+
+
+def player_payload(player, stats=False):
+    payload = {'id': player.id, 'name': player.name}
+    if stats:
+        try:
+            player_stats = player.stats
+        except PlayerStats.DoesNotExist:
+            payload['stats'] = None
+        else:
+            payload['stats'] = {
+                'visits': player_stats.visits, 'average': player_stats.average, 'first9_average': player_stats.first9_average,
+                'legs_won': player_stats.legs_won, 'highest_checkout': player_stats.highest_checkout,
+                'checkout_percentage': player_stats.checkout_percentage,
+            }
+    return payload
+
+
+@api_login_required
+@require_http_methods(['GET', 'POST'])
+def sessions_view(request):
+    """Lists the user's game sessions, ?before=<time_modified>&before_id=<id> pages like the home page, or creates one"""
+    if request.method == 'POST':
+        return create_session(request)
+    try:
+        before = parse_datetime(request.GET.get('before', ''))
+        before_id = int(request.GET.get('before_id', ''))
+    except ValueError:
+        before = before_id = None
+    games, next_page, _ = home_page(request.user, before, before_id)
+    return JsonResponse({'sessions': [session_summary(game) for game in games], 'next': next_page})
+
+
+def create_session(request):
+    try:
+        data = read_json(request)
+    except ValueError:
+        return error('Invalid JSON')
+    # seats are taken from the posted ids, the form would take 1 and "1" for the same player
+    player_ids = data.get('players', [])
+    if not isinstance(player_ids, list) or not all(is_int(player_id) for player_id in player_ids):
+        return error('Invalid game session', fields={'players': ['Players must be a list of player ids.']})
+    if len(set(player_ids)) < len(player_ids):
+        return error('Invalid game session', fields={'players': ['A player can only take one seat.']})
+    form = GameCreateForm(data)
+    form.fields['players'].queryset = Player.objects.filter(owner=request.user)
+    if not form.is_valid():
+        return error('Invalid game session', fields=form_errors(form))
+    game = form.save(commit=False)
+    game.owner = request.user
+    # players sit in the order they are posted in
+    seats = player_ids
+    game.scores = start_scores(game, seats)
+    with transaction.atomic():
+        game.save()
+        form.save_m2m()
+        start_history(game, game.scores)
+    return JsonResponse(session_state(game, skill_buckets(seats)), status=201)
+
+
+def session_etag(request, uuid):
+    version = GameSession.objects.filter(owner_id=request.user, uuid=uuid).values_list('version', flat=True).first()
+    return None if version is None else f'v{version}'
+
+
+@api_login_required
+@require_GET
+@cache_control(no_cache=True, private=True)
+@condition(etag_func=session_etag)
+def session_view(request, uuid):
+    """State of one game session, answers 304 Not Modified to If-None-Match with the current version"""
+    game = owned_game(request, uuid)
+    if game is None:
+        return error('Game session not found', 404)
+    return JsonResponse(session_states([game])[0])
+
+
+@api_login_required
+@require_GET
+def session_batch_view(request):
+    """States of the game sessions named by ?uuid=, in the order asked, unknown uuids are listed in "missing" """
+    try:
+        uuids = list(dict.fromkeys(str(uuid_lib.UUID(value)) for value in request.GET.getlist('uuid')))
+    except ValueError:
+        return error('Invalid uuid')
+    if not 0 < len(uuids) <= STATE_BATCH_SIZE:
+        return error(f'Ask for 1 to {STATE_BATCH_SIZE} game sessions')
+    games = {str(game.uuid): game for game in GameSession.objects.filter(owner_id=request.user, uuid__in=uuids)}
+    return JsonResponse({
+        'sessions': session_states([games[uuid] for uuid in uuids if uuid in games]),
+        'missing': [uuid for uuid in uuids if uuid not in games],
+    })
+
+
+@api_login_required
+@require_POST
+def session_turn_view(request, uuid):
+    """Commits one turn, see views.turn_commit_view for the body and the answer"""
+    game = owned_game(request, uuid)
+    if game is None:
+        return error('Game session not found', 404)
+    return json_turn_response(request, game)
+
+
+@api_login_required
+@require_POST
+def session_undo_view(request, uuid):
+    """Undoes the last turn, with "version" only if the game is still on it. Returns the state and whether a turn was undone,
+    409 Conflict when the game moved on or its turns can no longer be undone"""
+    game = owned_game(request, uuid)
+    if game is None:
+        return error('Game session not found', 404)
+    try:
+        version = parse_version(read_json(request).get('version'))
+    except ValueError:
+        return error('Invalid JSON')
+    try:
+        undone = undo_turn(game, version)
+    except ScoresChanged:
+        game.refresh_from_db(fields=['scores', 'turn_count', 'version'])
+        return error(CONFLICT_MESSAGE, 409, **session_states([game])[0])
+    except UndoRefused as refused:
+        return error(str(refused), 409, **session_states([game])[0])
+    return JsonResponse({**session_states([game])[0], 'undone': undone})
+
+
+@api_login_required
+@require_http_methods(['GET', 'POST'])
+def players_view(request):
+    """Lists the user's players by name or creates one"""
+    if request.method == 'GET':
+        return JsonResponse({'players': [player_payload(player) for player in roster(request.user.pk)]})
+    try:
+        data = read_json(request)
+    except ValueError:
+        return error('Invalid JSON')
+    form = PlayerForm(data, request=request)
+    form.instance.owner = request.user
+    if not form.is_valid():
+        return error('Invalid player', fields=form_errors(form))
+    return JsonResponse(player_payload(form.save()), status=201)
+
+
+@api_login_required
+@require_http_methods(['GET', 'PATCH', 'DELETE'])
+def player_view(request, pk):
+    """Player with all time stats, renames it or deletes it with its game sessions"""
+    player = Player.objects.filter(owner=request.user, pk=pk).select_related('stats').first()
+    if player is None:
+        return error('Player not found', 404)
+    if request.method == 'GET':
+        return JsonResponse(player_payload(player, stats=True))
+    if request.method == 'DELETE':
+        delete_player(player)
+        return HttpResponse(status=204)
+    try:
+        data = read_json(request)
+    except ValueError:
+        return error('Invalid JSON')
+    form = PlayerForm(data, instance=player, request=request)
+    if not form.is_valid():
+        return error('Invalid player', fields=form_errors(form))
+    return JsonResponse(player_payload(form.save()))
+
+
+def parse_board_event(event):
+    """(id, dart or TAKEOUT) of a posted board event, raises ValueError if it's invalid"""
+    event_id = event['id']
+    if not isinstance(event_id, (str, int)) or len(str(event_id)) > 64:
+        raise ValueError('Event id must be a string or a number of up to 64 characters')
+    if event.get('takeout'):
+        return event_id, TAKEOUT
+    dart = parse_hit(str(event.get('dart', '')))
+    if dart is None:
+        raise ValueError('Unknown dart value')
+    return event_id, dart
+
+
+@csrf_exempt
+@require_POST
+def board_events_view(request):
+    """Darts of an electronic board, which sends its token in the X-Board-Token header instead of logging in.
+    Body: {"events": [{"id": "boot7-17", "dart": "T20"}, {"id": "boot7-18", "takeout": true}]}, darts written like
+    the cricket fields take them (20, S20, D20, T20, 25, SB, DB, 0 for a miss). Ids must not repeat, a resent event
+    is counted once. Answers 202 with the numbers of queued and duplicate events, 429 with Retry-After when
+    the board's queue is full"""
+    board = Dartboard.objects.filter(token=request.headers.get('X-Board-Token', '')).values_list('id', 'game_session_id').first()
+    if board is None:
+        return error('Unknown board', 403)
+    board_id, game_id = board
+    if game_id is None:
+        return error('The board is not playing a game session', 409)
+    try:
+        events = [parse_board_event(event) for event in read_json(request).get('events', [])]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return error('Invalid events')
+    size = getattr(settings, 'INGEST_QUEUE_SIZE', 64)
+    if len(events) > size:
+        return error(f'Post at most {size} events at once')
+    try:
+        queued, duplicates = offer(board_id, events)
+    except QueueFull:
+        response = error('The board sends faster than its darts are scored, send the events again later', 429)
+        response['Retry-After'] = '1'
+        return response
+    return JsonResponse({'queued': queued, 'duplicates': duplicates}, status=202)
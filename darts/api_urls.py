@@ -0,0 +1,14 @@
+from django.urls import path
+from . import api
+
+
+urlpatterns = [
+    path('sessions/', api.sessions_view, name='api_sessions'),
+    path('sessions/state/', api.session_batch_view, name='api_session_batch'),
+    path('sessions/<uuid:uuid>/', api.session_view, name='api_session'),
+    path('sessions/<uuid:uuid>/turns/', api.session_turn_view, name='api_session_turn'),
+    path('sessions/<uuid:uuid>/undo/', api.session_undo_view, name='api_session_undo'),
+    path('players/', api.players_view, name='api_players'),
+    path('players/<int:pk>/', api.player_view, name='api_player'),
+    path('boards/events/', api.board_events_view, name='api_board_events'),
+]
@@ -1,6 +1,31 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class DartsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'darts'
+
+    def ready(self):
+        from user.models import Player
+        from .cache import game_players_changed, owner_changed
+        from .db import configure_sqlite
+        from .legs import queue_leg_completed
+        from .metrics import registry
+        from .models import GameSession
+        from .signals import leg_won
+        # ingest and odds register their tasks for the worker
+        from . import ingest, odds, tasks
+        connection_created.connect(configure_sqlite)
+        # cached rosters and home lists of the owner
+        post_save.connect(owner_changed, sender=Player, dispatch_uid='darts_player_saved')
+        post_delete.connect(owner_changed, sender=Player, dispatch_uid='darts_player_deleted')
+        post_save.connect(owner_changed, sender=GameSession, dispatch_uid='darts_game_saved')
+        post_delete.connect(owner_changed, sender=GameSession, dispatch_uid='darts_game_deleted')
+        m2m_changed.connect(game_players_changed, sender=GameSession.players.through, dispatch_uid='darts_game_players')
+        # backpressure of the dartboard queues next to the request metrics
+        registry.collect(ingest.exposition)
+        registry.collect(tasks.exposition)
+        # won legs are archived by the background worker
+        leg_won.connect(queue_leg_completed, dispatch_uid='darts_leg_completed')
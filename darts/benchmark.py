@@ -0,0 +1,208 @@
+"""
+Scripted legs to benchmark the scoring hot path.
+
+`LEG_SCRIPT` is one leg of 501 as a board plays it: visits added up by the score calculator
+(the numeric presses end in one turn commit), manual scores, a bust, its undo, the checkout
+and a reset back to a fresh leg, so a board can play it over and over. `play_legs` drives it
+through the test client against play_game_view and the turn endpoint, every step timed until the
+board shows the play page again. `engine_legs` runs the same visits on the X01 engine and
+checkout_check with no request or database. `finish_tasks` waits for the work the boards queued.
+`summarize` turns the timings into the numbers kept in a baseline and `regressions` tells
+which of them got worse than the baseline by more than a tolerance.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .engine import BUST, RESET, SCORE, Turn, apply_turn, new_state
+from .history import start_history
+from .models import GameChoices, GameSession
+from .tasks import run_all, worker
+from .utils import checkout_check, start_scores
+from user.models import Player
+
+# (step, value) of one leg, seats throw in turn from the first
+LEG_SCRIPT = (
+    ('score', 180),
+    ('darts', (20, 20, 20)),
+    ('score', 180),
+    ('bust', None),
+    ('undo', None),
+    ('darts', (19, 19, 19)),
+    ('score', 141),
+    ('reset', None),
+)
+
+# baselines the benchmark command compares against, kept in the repository
+BASELINE_PATH = Path(__file__).resolve().parent / 'benchmark_baseline.json'
+
+# numbers of a run, True where a higher number is better
+MEASURES = {
+    'requests_per_second': True,
+    'p50_ms': False,
+    'p99_ms': False,
+    'queries_per_turn': False,
+}
+# queries per turn the same code varies by with clients at the same time, they share cached rosters
+QUERIES_NOISE = 0.2
+
+
+def client_host():
+    """A host the running settings accept, test clients default to 'testserver'"""
+    return next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+
+
+def create_boards(user, boards):
+    """One fresh 501 game session of two new players per board"""
+    games = []
+    for board in range(boards):
+        players = [Player.objects.create(name=f'Board {board + 1} {seat}', owner=user) for seat in 'AB']
+        game = GameSession(owner=user, game_type=GameChoices.DARTS501)
+        game.scores = start_scores(game, [player.id for player in players])
+        game.save()
+        game.players.set(players)
+        start_history(game, game.scores)
+        games.append(game)
+    return games
+
+
+def step_request(client, game, step, value):
+    """Posts one step of the script the way the play page does and ends on the page the board then shows:
+    the calculator's turn commit is followed by the page reload, forms by their redirect"""
+    play = reverse('play', kwargs={'uuid': game.uuid})
+    if step == 'darts':
+        response = client.post(
+            reverse('turn', kwargs={'uuid': game.uuid}), json.dumps({'darts': value}), content_type='application/json',
+        )
+        return client.get(play) if response.status_code == 200 else response
+    if step == 'score':
+        return client.post(play, {'submit_score': 'submit_score', 'score_manual': value, 'checkout_darts_used': 3}, follow=True)
+    if step == 'bust':
+        return client.post(play, {'bust': '0'}, follow=True)
+    if step == 'undo':
+        return client.post(play, {'undo': 'undo'}, follow=True)
+    return client.post(reverse('reset', kwargs={'uuid': game.uuid}), follow=True)
+
+
+def play_legs(user, game, legs):
+    """Plays LEG_SCRIPT `legs` times on one board through the test client.
+    Returns the seconds and database queries of every request and the number of failed ones"""
+    client = Client(HTTP_HOST=client_host())
+    client.force_login(user)
+    timings, queries, errors = [], [], 0
+    for _ in range(legs):
+        for step, value in LEG_SCRIPT:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = step_request(client, game, step, value)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            errors += response.status_code != 200
+    return timings, queries, errors
+
+
+def play_legs_threaded(user, game, legs):
+    try:
+        return play_legs(user, game, legs)
+    finally:
+        # every thread has its own connection
+        connection.close()
+
+
+def play_boards(user, games, legs, threads):
+    """Plays every board, `threads` of them at the same time. Returns (timings, queries, errors, seconds)"""
+    started = time.perf_counter()
+    if threads == 1:
+        results = [play_legs(user, game, legs) for game in games]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(play_legs_threaded, [user] * len(games), games, [legs] * len(games)))
+    elapsed = time.perf_counter() - started
+    timings = [timing for board_timings, _, _ in results for timing in board_timings]
+    queries = [count for _, board_queries, _ in results for count in board_queries]
+    return timings, queries, sum(errors for _, _, errors in results), elapsed
+
+
+def engine_legs(legs, bucket=None):
+    """Plays LEG_SCRIPT `legs` times on the X01 engine, with the checkout shown after every step and
+    after every numeric press of the calculator. Returns the seconds of every step"""
+    state, timings = new_state(501), []
+    undo = []
+    for _ in range(legs):
+        for step, value in LEG_SCRIPT:
+            started = time.perf_counter()
+            if step == 'undo':
+                state = undo.pop()
+            else:
+                undo.append(state)
+                if step == 'darts':
+                    pressed = 0
+                    for darts_left, dart in zip((3, 2, 1), value):
+                        checkout_check(state.points[state.turn] - pressed, darts_left, bucket)
+                        pressed += dart
+                    turn = Turn(SCORE, pressed)
+                else:
+                    turn = {'score': Turn(SCORE, value or 0), 'bust': Turn(BUST), 'reset': Turn(RESET)}[step]
+                state, _ = apply_turn(state, turn)
+            checkout_check(state.points[state.turn], 3, bucket)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def finish_tasks(timeout=120):
+    """Waits for the worker thread and runs the tasks still queued, False if the worker took over `timeout` seconds"""
+    idle = worker.wait(timeout)
+    run_all()
+    return idle
+
+
+def percentile(timings, fraction):
+    """Value at `fraction` of the sorted timings, in ms"""
+    ordered = sorted(timings)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000
+
+
+def summarize(timings, elapsed, queries=None):
+    """Numbers of one run as kept in a baseline, rounded so the file stays readable"""
+    result = {
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5), 4),
+        'p99_ms': round(percentile(timings, 0.99), 4),
+    }
+    if queries is not None:
+        result['queries_per_turn'] = round(sum(queries) / len(queries), 2)
+    return result
+
+
+def best(results):
+    """Best of every number over several runs of the same benchmark, the others are noise of the machine"""
+    return {
+        measure: (max if MEASURES[measure] else min)(result[measure] for result in results)
+        for measure in results[0]
+    }
+
+
+def regressions(result, baseline, tolerance):
+    """Messages for the numbers of `result` worse than `baseline` by more than `tolerance` (0.5 is 50%),
+    queries per turn are counted, not timed, so any more of them than the noise of sharing the cache is a regression"""
+    worse = []
+    for measure, higher_is_better in MEASURES.items():
+        if measure not in result or measure not in baseline:
+            continue
+        value, expected = result[measure], baseline[measure]
+        if measure == 'queries_per_turn':
+            failed = value > expected + QUERIES_NOISE
+        elif higher_is_better:
+            failed = value < expected * (1 - tolerance)
+        else:
+            failed = value > expected * (1 + tolerance)
+        if failed:
+            worse.append(f'{measure} {value:g}, baseline {expected:g}')
+    return worse
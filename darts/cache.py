@@ -0,0 +1,73 @@
+"""
+Per user caches of the player roster and the first page of the home list.
+
+Both are dropped whenever a player or game session of the user is saved or deleted, by the
+signal receivers below (connected in apps.py). Turn commits update the game row without
+signals, db.save_game drops the home list itself. Keys are dropped again when the transaction commits,
+so a request reading in between can't keep stale rows cached.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import GameSession
+from user.models import Player
+
+# seconds cached entries live without being dropped
+ROSTER_TIMEOUT = 60 * 60
+HOME_TIMEOUT = 5 * 60
+
+
+def roster_key(user_id):
+    return f'darts:roster:{user_id}'
+
+
+def home_key(user_id):
+    return f'darts:home:{user_id}'
+
+
+def roster(user_id):
+    """Players of a user ordered by name"""
+    players = cache.get(roster_key(user_id))
+    if players is None:
+        players = list(Player.objects.filter(owner_id=user_id).order_by('name'))
+        cache.set(roster_key(user_id), players, ROSTER_TIMEOUT)
+    return players
+
+
+def seated_players(game):
+    """Players of a game session in seat order, from the owner's roster"""
+    players = {player.id: player for player in roster(game.owner_id)}
+    if not all(player_id in players for player_id in game.scores['seats']):
+        return game.seated_players()
+    return [players[player_id] for player_id in game.scores['seats']]
+
+
+def forget(keys):
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_home(user_id):
+    """Drops the cached home list of a user"""
+    forget([home_key(user_id)])
+
+
+def forget_user(user_id):
+    """Drops the cached roster and home list of a user"""
+    forget_users([user_id])
+
+
+def forget_users(user_ids):
+    """Drops the cached rosters and home lists of users in one cache call"""
+    forget([key for user_id in user_ids for key in (roster_key(user_id), home_key(user_id))])
+
+
+def owner_changed(sender, instance, **kwargs):
+    """A player or game session was saved or deleted"""
+    forget_user(instance.owner_id)
+
+
+def game_players_changed(sender, instance, **kwargs):
+    # sent for both sides of the relation
+    if isinstance(instance, GameSession):
+        forget_user(instance.owner_id)
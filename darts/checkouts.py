@@ -161,4 +161,104 @@ checkouts = {
 	'4': 'D2',
 	'3': '1 D1',
 	'2': 'D1',
-}
\ No newline at end of file
+}
+
+
+# Generated checkout tables
+# Every double out finish is enumerated for 1, 2 and 3 darts left, ranked, and the best
+# route is stored in tuples indexed by points, so lookups are a plain index.
+# Hand picked routes from `checkouts` above win over generated ones for 3 darts left, as long
+# as they check out; the ones that don't are left out.
+
+MAX_CHECKOUT = 170
+
+SINGLES = tuple((f'{number}', number) for number in range(20, 0, -1)) + (('SB', 25),)
+DOUBLES = tuple((f'D{number}', number * 2) for number in range(20, 0, -1)) + (('DB', 50),)
+TREBLES = tuple((f'T{number}', number * 3) for number in range(20, 0, -1))
+SEGMENTS = TREBLES + SINGLES + DOUBLES
+
+# finishing doubles in order of preference, ones that split well after a miss first
+DOUBLE_PREFERENCE = ('D20', 'D16', 'D18', 'D12', 'D10', 'D8', 'D19', 'D17', 'D14', 'D15',
+                     'D13', 'D11', 'D9', 'D6', 'D7', 'D5', 'D4', 'DB', 'D3', 'D2', 'D1')
+DOUBLE_RANK = {name: rank for rank, name in enumerate(DOUBLE_PREFERENCE)}
+# setup darts aimed at trebles, doubles or bull are harder to hit than big singles
+HARD_SEGMENTS = frozenset(name for name, _ in TREBLES + DOUBLES) | {'SB'}
+DOUBLES_BY_VALUE = {}
+for name, value in DOUBLES:
+    DOUBLES_BY_VALUE.setdefault(value, []).append(name)
+# '-' in a hand picked route is a dart not thrown
+SEGMENT_VALUES = dict(SEGMENTS, **{'-': 0})
+
+
+def route_rank(route):
+    """Sort key for a route: fewest darts, best finishing double, fewest hard setup darts, biggest first dart"""
+    setup = route[:-1]
+    return (
+        len(route),
+        DOUBLE_RANK[route[-1][0]],
+        sum(name in HARD_SEGMENTS for name, _ in setup),
+        -sum(value for _, value in setup[:1]),
+    )
+
+
+def generate_routes(points, darts_left=3):
+    """All double out finishes of points with at most darts_left darts, best first.
+    Routes are tuples of (segment name, value), setup darts are only listed in descending order"""
+    routes = [((name, points),) for name in DOUBLES_BY_VALUE.get(points, ())]
+    if darts_left >= 2:
+        for first in SEGMENTS:
+            rest = points - first[1]
+            for name in DOUBLES_BY_VALUE.get(rest, ()):
+                routes.append((first, (name, rest)))
+    if darts_left >= 3:
+        for i, first in enumerate(SEGMENTS):
+            for second in SEGMENTS[i:]:
+                rest = points - first[1] - second[1]
+                for name in DOUBLES_BY_VALUE.get(rest, ()):
+                    routes.append((first, second, (name, rest)))
+    routes.sort(key=route_rank)
+    return routes
+
+
+def route_name(route):
+    return ' '.join(name for name, _ in route)
+
+
+def checks_out(route, points, darts_left=3):
+    """Whether a route named like 'T20 T20 DB' adds up to points and finishes on a double"""
+    names = route.split()
+    return (
+        0 < len(names) <= darts_left
+        and all(name in SEGMENT_VALUES for name in names)
+        and sum(SEGMENT_VALUES[name] for name in names) == points
+        and names[-1] in DOUBLE_RANK
+    )
+
+
+def hand_picked_route(points):
+    """The hand picked routes of points from `checkouts` that check out, None if there are none"""
+    routes = [route.strip() for route in checkouts.get(str(points), '').split('|')]
+    routes = [route for route in routes if checks_out(route, points)]
+    return ' | '.join(routes) or None
+
+
+def build_checkout_table(darts_left):
+    """Tuple indexed by points (0-170) with the best checkout route for darts_left darts, None if there is none"""
+    table = []
+    for points in range(MAX_CHECKOUT + 1):
+        route = hand_picked_route(points) if darts_left == 3 else None
+        if route:
+            table.append(route)
+            continue
+        routes = generate_routes(points, darts_left)
+        table.append(route_name(routes[0]) if routes else None)
+    return tuple(table)
+
+
+# CHECKOUT_TABLES[darts_left][points], darts_left 0 has no checkouts
+CHECKOUT_TABLES = (
+    (None,) * (MAX_CHECKOUT + 1),
+    build_checkout_table(1),
+    build_checkout_table(2),
+    build_checkout_table(3),
+)
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import forget_home
+from .models import GameSession
+from .signals import games_deleting
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Write-ahead log for SQLite when SQLITE_WAL is on: readers and the one writer don't block each other"""
+    if connection.vendor == 'sqlite' and getattr(settings, 'SQLITE_WAL', False):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            # safe with WAL, only the last commits can be lost on power failure
+            cursor.execute('PRAGMA synchronous=NORMAL')
+
+
+class ScoresChanged(Exception):
+    """The game session was changed by another request since it was read"""
+
+
+def lock_game(game):
+    """Locks the game session row until the transaction ends, for changes that read more than the game before writing.
+    Raises ScoresChanged when it was changed since it was read. The lock is a no-op update, so on SQLite
+    the transaction takes the write lock up front instead of failing when it upgrades from reading"""
+    if not GameSession.objects.filter(pk=game.pk, version=game.version).update(version=F('version')):
+        raise ScoresChanged
+
+
+def save_game(game):
+    """Saves the changed fields of a game session with compare and swap on its version, skips the write if nothing changed.
+    It's the first write of a turn's transaction, nobody else can commit a change of the same version.
+    Raises ScoresChanged when another request got there first"""
+    fields = game.changed_fields()
+    if not fields:
+        return
+    updated = GameSession.objects.filter(pk=game.pk, version=game.version).update(
+        version=F('version') + 1, time_modified=timezone.now(), **{name: getattr(game, name) for name in fields},
+    )
+    if not updated:
+        raise ScoresChanged
+    game.version += 1
+    game.remember_saved()
+    # the home list shows when games were modified
+    forget_home(game.owner_id)
+
+
+def delete_game_sessions(games):
+    """Deletes game sessions with their turns, snapshots and leg archive in one transaction, whatever their history.
+    Django's collector deletes what hangs on them with a batched delete per table and clears the links of other models,
+    so the number of queries doesn't grow with the history. Receivers of games_deleting get the ids first"""
+    game_ids = list(games.values_list('id', flat=True))
+    if not game_ids:
+        return
+    with transaction.atomic():
+        games_deleting.send(sender=GameSession, game_ids=game_ids)
+        GameSession.objects.filter(id__in=game_ids).delete()
+
+
+def delete_player(player):
+    """Deletes a player with all of their game sessions"""
+    with transaction.atomic():
+        delete_game_sessions(GameSession.objects.filter(players=player))
+        player.delete()
@@ -0,0 +1,7 @@
+"""Game rules without Django imports. X01 is exported here, cricket lives in cricket.py"""
+from . import cricket
+from .x01 import (
+    SCORE, BUST, SWITCH, RESET, Turn, X01State, new_state, apply_turn, replay,
+    SCORES_FIELDS, to_scores, from_scores,
+    calculate_average, calculate_total_average,
+)
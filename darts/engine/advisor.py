@@ -0,0 +1,123 @@
+"""
+Checkout advice for a player's skill by dynamic programming.
+
+With the outcome table of a skill bucket (see board.py) the chance to finish from every
+score up to MAX_CHECKOUT with 1 to 3 darts in hand is worked out over all segments one can
+aim at, a bust or a dart that leaves 1 ends the visit. Where a checkout exists a dart aims at
+the segment of a route with the highest chance to finish this visit, misses included, ties
+and scores without a checkout go to the aim leaving the best chance for the next visit. The policy of a bucket is computed once and memoized,
+`route_table` has the same layout as checkouts.CHECKOUT_TABLES so callers just index it.
+"""
+from functools import lru_cache
+
+from ..checkouts import CHECKOUT_TABLES, MAX_CHECKOUT
+from .board import AIMS, bucket_sigma, outcome_probabilities
+
+# chances closer than this count as a tie
+TIE = 1e-9
+
+
+def aim_value(aim):
+    """(points, is double) of a dart hitting the segment it aims at"""
+    if aim == 'DB':
+        return 50, True
+    if aim == 'SB':
+        return 25, False
+    number = int(aim[1:])
+    return number * {'T': 3, 'D': 2, 'S': 1}[aim[0]], aim[0] == 'D'
+
+
+def route_segment(aim):
+    """Aim as checkout tables name it: 'S20' is '20'"""
+    return aim[1:] if aim[0] == 'S' and aim != 'SB' else aim
+
+
+def candidates(outcomes, points, darts_left):
+    """Aims worth considering from `points`: when there is a checkout, the segments whose hit
+    finishes or leaves a checkout for the darts after it, else every segment"""
+    if not CHECKOUT_TABLES[darts_left][points]:
+        return outcomes
+    routes = []
+    for aim, aim_outcomes in outcomes:
+        value, double = aim_value(aim)
+        left = points - value
+        if (left == 0 and double) or (left >= 2 and darts_left > 1 and CHECKOUT_TABLES[darts_left - 1][left]):
+            routes.append((aim, aim_outcomes))
+    return routes
+
+
+def visit_chances(outcomes, points, next_chances):
+    """Chance to finish from `points` aiming with `outcomes`, when the dart doesn't finish
+    or end the visit the rest is worth next_chances[points left]"""
+    chance = 0.0
+    for value, double, probability in outcomes:
+        left = points - value
+        if left == 0:
+            if double:
+                chance += probability
+        elif left >= 2:
+            chance += probability * next_chances[left]
+    return chance
+
+
+@lru_cache(maxsize=None)
+def policy(bucket):
+    """(aims, chances) of a skill bucket, both indexed by [darts_left][points]:
+    where to aim and the chance to finish this visit, None and 0 below 2"""
+    outcomes = [(aim, outcome_probabilities(bucket_sigma(bucket))[aim]) for aim in AIMS]
+    empty = (0.0,) * (MAX_CHECKOUT + 1)
+    # chances to finish this visit
+    chances = [empty]
+    for darts_left in (1, 2, 3):
+        chances.append(tuple(
+            max(
+                visit_chances(aim_outcomes, points, chances[darts_left - 1])
+                for _, aim_outcomes in candidates(outcomes, points, darts_left)
+            )
+            if points >= 2 else 0.0
+            for points in range(MAX_CHECKOUT + 1)
+        ))
+    # chances to finish this visit or the next one, with the aims picked by this visit first
+    later = [chances[3]]
+    aims = [None]
+    for darts_left in (1, 2, 3):
+        darts_aims, darts_later = [None, None], [0.0, 0.0]
+        for points in range(2, MAX_CHECKOUT + 1):
+            best = chances[darts_left][points]
+            picked = max(
+                (
+                    (visit_chances(aim_outcomes, points, later[darts_left - 1]), aim)
+                    for aim, aim_outcomes in candidates(outcomes, points, darts_left)
+                    if visit_chances(aim_outcomes, points, chances[darts_left - 1]) >= best - TIE
+                ),
+                key=lambda candidate: candidate[0],
+            )
+            darts_later.append(picked[0])
+            darts_aims.append(picked[1])
+        aims.append(tuple(darts_aims))
+        later.append(tuple(darts_later))
+    return tuple(aims), tuple(chances)
+
+
+def advise(points, darts_left, bucket):
+    """(route, chance to finish this visit) from `points` with darts_left darts in hand,
+    route is None when there is no checkout"""
+    aims, chances = policy(bucket)
+    if not 2 <= points <= MAX_CHECKOUT or not CHECKOUT_TABLES[darts_left][points]:
+        return None, 0.0
+    chance, route = chances[darts_left][points], []
+    # follow the policy as if every dart hit what it aims at
+    for darts in range(darts_left, 0, -1):
+        aim = aims[darts][points]
+        route.append(route_segment(aim))
+        value, double = aim_value(aim)
+        points -= value
+        if points < 2:
+            break
+    return ' '.join(route), chance
+
+
+@lru_cache(maxsize=None)
+def route_table(bucket, darts_left):
+    """Tuple indexed by points (0-170) of the advised route with darts_left darts in hand, None where there is none"""
+    return tuple(advise(points, darts_left, bucket)[0] for points in range(MAX_CHECKOUT + 1))
@@ -0,0 +1,144 @@
+"""
+Dartboard geometry and a Gaussian model of where a player's darts land.
+
+A player's skill is the spread `sigma` (mm) of their darts around the point they aim at.
+`outcome_table` turns a spread into, for every segment one can aim at, the probabilities of
+what the dart scores. It is sampled once per spread with a fixed set of normal offsets, so the
+same spread always gives the same table, and memoized. Skill is grouped in buckets of 3-dart
+average, `bucket_sigma` finds the spread whose darts at T20 score that average.
+"""
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+import math
+import random
+
+# radii of the rings in mm, standard board
+INNER_BULL = 6.35
+OUTER_BULL = 15.9
+TREBLE_INNER = 99.0
+TREBLE_OUTER = 107.0
+DOUBLE_INNER = 162.0
+DOUBLE_OUTER = 170.0
+# numbers clockwise from the top
+SEGMENT_ORDER = (20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5)
+
+# segments a dart can be aimed at, S20 aims at the big single between bull and treble
+AIMS = (
+    tuple(f'T{number}' for number in range(20, 0, -1))
+    + tuple(f'D{number}' for number in range(20, 0, -1))
+    + tuple(f'S{number}' for number in range(20, 0, -1))
+    + ('SB', 'DB')
+)
+# 3-dart averages players are grouped by
+SKILL_BUCKETS = (20, 30, 40, 50, 60, 70, 80, 90, 100, 110)
+# landing positions sampled per aim and spread
+NOISE_SAMPLES = 3000
+
+
+def landing(x, y):
+    """(points, is double) of a dart landing x, y mm from the centre, y pointing up"""
+    radius = math.hypot(x, y)
+    if radius <= INNER_BULL:
+        return 50, True
+    if radius <= OUTER_BULL:
+        return 25, False
+    if radius > DOUBLE_OUTER:
+        return 0, False
+    angle = math.degrees(math.atan2(x, y))
+    number = SEGMENT_ORDER[int(((angle + 9) % 360) // 18)]
+    if TREBLE_INNER <= radius <= TREBLE_OUTER:
+        return number * 3, False
+    if radius >= DOUBLE_INNER:
+        return number * 2, True
+    return number, False
+
+
+def aim_point(aim):
+    """x, y of the middle of a segment like 'T20', 'D16', 'S5', 'SB' or 'DB'"""
+    if aim == 'DB':
+        return 0.0, 0.0
+    if aim == 'SB':
+        radius, number = (INNER_BULL + OUTER_BULL) / 2, 20
+    else:
+        ring, number = aim[0], int(aim[1:])
+        radius = {
+            'T': (TREBLE_INNER + TREBLE_OUTER) / 2,
+            'D': (DOUBLE_INNER + DOUBLE_OUTER) / 2,
+            'S': (OUTER_BULL + TREBLE_INNER) / 2,
+        }[ring]
+    angle = math.radians(SEGMENT_ORDER.index(number) * 18)
+    return radius * math.sin(angle), radius * math.cos(angle)
+
+
+def aim_name(segment):
+    """Aim for a segment as checkout tables name it: 'T20', 'D20', '20', 'SB', 'DB'"""
+    return segment if segment[0] in 'TDS' else f'S{segment}'
+
+
+@lru_cache(maxsize=None)
+def unit_noise():
+    """Fixed standard normal offsets, the same for every spread so tables change smoothly with it"""
+    rng = random.Random(180)
+    return tuple((rng.gauss(0, 1), rng.gauss(0, 1)) for _ in range(NOISE_SAMPLES))
+
+
+def outcome_counts(aim, sigma):
+    x, y = aim_point(aim)
+    return Counter(landing(x + sigma * dx, y + sigma * dy) for dx, dy in unit_noise())
+
+
+@lru_cache(maxsize=None)
+def outcome_table(sigma):
+    """{aim: (outcomes, cum_weights)}, outcomes are (points, is double) pairs, ready for random.choices"""
+    table = {}
+    for aim in AIMS:
+        counts = outcome_counts(aim, sigma)
+        outcomes = tuple(counts)
+        cum_weights, total = [], 0
+        for outcome in outcomes:
+            total += counts[outcome]
+            cum_weights.append(total)
+        table[aim] = (outcomes, tuple(cum_weights))
+    return table
+
+
+def outcome_probabilities(sigma):
+    """{aim: [(points, is double, probability)]} of the memoized outcome table"""
+    probabilities = {}
+    for aim, (outcomes, cum_weights) in outcome_table(sigma).items():
+        previous = 0
+        probabilities[aim] = []
+        for (points, double), cumulative in zip(outcomes, cum_weights):
+            probabilities[aim].append((points, double, (cumulative - previous) / NOISE_SAMPLES))
+            previous = cumulative
+    return probabilities
+
+
+def treble_twenty_average(sigma):
+    """3-dart average of darts aimed at T20 with spread sigma"""
+    counts = outcome_counts('T20', sigma)
+    return 3 * sum(points * count for (points, _), count in counts.items()) / NOISE_SAMPLES
+
+
+@lru_cache(maxsize=None)
+def bucket_sigma(bucket):
+    """Spread in mm whose darts at T20 average `bucket` points per visit, by bisection"""
+    low, high = 1.0, 200.0
+    for _ in range(30):
+        middle = (low + high) / 2
+        if treble_twenty_average(middle) > bucket:
+            low = middle
+        else:
+            high = middle
+    return round((low + high) / 2, 2)
+
+
+def skill_bucket(average):
+    """Nearest skill bucket of a 3-dart average"""
+    index = bisect_left(SKILL_BUCKETS, average)
+    if index == len(SKILL_BUCKETS):
+        return SKILL_BUCKETS[-1]
+    if index and average - SKILL_BUCKETS[index - 1] < SKILL_BUCKETS[index] - average:
+        return SKILL_BUCKETS[index - 1]
+    return SKILL_BUCKETS[index]
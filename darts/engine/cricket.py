@@ -0,0 +1,170 @@
+"""
+Cricket and Cut-Throat Cricket rules on plain Python values.
+
+Targets are 15 to 20 and bull. A player's marks on all seven targets are packed in one int,
+two bits per target counting 0 to 3 marks, and how many players closed each target is packed
+the same way in four bits per target, so hitting, closing and "closed by everyone" checks are
+a few bit operations per dart.
+
+Extra marks on a target the player closed score its value unless every player closed it.
+In Cricket they go to the thrower and the leg is won by closing everything with the most points.
+In Cut-Throat they go to every opponent who hasn't closed the target and the leg is won by
+closing everything with the fewest points.
+"""
+from collections import namedtuple
+
+from .x01 import SWITCH, RESET
+
+# turn kind of a cricket visit, same value as darts.models.TurnKind.MARKS
+MARKS = 4
+
+TARGETS = (15, 16, 17, 18, 19, 20, 25)
+TARGET_INDEX = {number: index for index, number in enumerate(TARGETS)}
+# marks of a player who closed every target
+ALL_CLOSED = sum(3 << (2 * index) for index in range(len(TARGETS)))
+
+CricketTurn = namedtuple('CricketTurn', ['kind', 'hits'], defaults=[()])
+CricketTurn.__doc__ = 'One visit of the player whose turn it is, hits are up to 3 (number, multiplier) darts, 0 is a miss'
+
+
+class CricketState(namedtuple('CricketState', ['cut_throat', 'turn', 'marks', 'points', 'games', 'darts', 'darts_total', 'marks_total', 'closers'])):
+    """Scores of a cricket game session. `turn` is the seat to throw, the other fields are tuples indexed by seat:
+    packed marks, points, legs won, darts of the current leg, darts and marks of the session.
+    `closers` is the packed count of players that closed each target"""
+    __slots__ = ()
+
+    @property
+    def mpr(self):
+        """Marks per round of the session"""
+        return tuple(round(marks / darts * 3, 2) if darts else 0 for marks, darts in zip(self.marks_total, self.darts_total))
+
+
+def new_state(seats=2, cut_throat=False):
+    """State of a fresh game session, first seat to throw"""
+    zeros = (0,) * seats
+    return CricketState(cut_throat, 0, zeros, zeros, zeros, zeros, zeros, zeros, 0)
+
+
+def target_marks(marks, number):
+    """Marks, 0 to 3, a player's packed marks hold on a target number"""
+    return (marks >> (2 * TARGET_INDEX[number])) & 3
+
+
+def valid_hit(number, multiplier):
+    """Any board number or 0 for a miss, bull has no treble"""
+    if number == 0:
+        return True
+    if number == 25:
+        return multiplier in (1, 2)
+    return 1 <= number <= 20 and multiplier in (1, 2, 3)
+
+
+def leg_winner(state, seats):
+    """First of `seats` who closed every target and leads on points, None if nobody did"""
+    for seat in seats:
+        if state.marks[seat] != ALL_CLOSED:
+            continue
+        others = state.points[:seat] + state.points[seat + 1:]
+        if state.cut_throat:
+            if state.points[seat] <= min(others):
+                return seat
+        elif state.points[seat] >= max(others):
+            return seat
+    return None
+
+
+def throw(state, seat, number, multiplier):
+    """State after one dart of `seat`, the turn doesn't pass"""
+    index = TARGET_INDEX.get(number)
+    if index is None:
+        # missed or not a cricket number
+        return state
+    shift = 2 * index
+    marks, points, closers = list(state.marks), list(state.points), state.closers
+    have = (marks[seat] >> shift) & 3
+    closing = min(3 - have, multiplier)
+    extra = multiplier - closing
+    counted = closing
+    if closing:
+        marks[seat] += closing << shift
+        if have + closing == 3:
+            closers += 1 << (4 * index)
+    if extra and (closers >> (4 * index)) & 15 != len(marks):
+        # target is still open for somebody, extra marks score
+        value = number * extra
+        counted += extra
+        if state.cut_throat:
+            for other, other_marks in enumerate(marks):
+                if other != seat and (other_marks >> shift) & 3 != 3:
+                    points[other] += value
+        else:
+            points[seat] += value
+    marks_total = state.marks_total[:seat] + (state.marks_total[seat] + counted,) + state.marks_total[seat + 1:]
+    return state._replace(marks=tuple(marks), points=tuple(points), closers=closers, marks_total=marks_total)
+
+
+def apply_turn(state, turn):
+    """Plays `turn` for the seat whose turn it is.
+    Returns the new state and the number of darts the leg was won with, 0 if the leg goes on"""
+    kind, hits = turn
+    seats = len(state.points)
+    if kind == RESET:
+        return new_state(seats, state.cut_throat), 0
+    seat = state.turn
+    next_turn = (seat + 1) % seats
+    if kind == SWITCH:
+        return state._replace(turn=next_turn), 0
+
+    thrown = 0
+    for number, multiplier in hits[:3]:
+        thrown += 1
+        state = throw(state, seat, number, multiplier)
+        # cut-throat points go to opponents, so any of them may be the one who wins
+        winner = leg_winner(state, range(seats) if state.cut_throat else (seat,))
+        if winner is not None:
+            leg_darts = state.darts[seat] + thrown
+            darts_total = state.darts_total[:seat] + (state.darts_total[seat] + thrown,) + state.darts_total[seat + 1:]
+            games = state.games[:winner] + (state.games[winner] + 1,) + state.games[winner + 1:]
+            zeros = (0,) * seats
+            return state._replace(
+                turn=next_turn, marks=zeros, points=zeros, games=games, darts=zeros, darts_total=darts_total, closers=0,
+            ), leg_darts if winner == seat else 0
+    # a visit is three darts, missed or not thrown
+    return state._replace(
+        turn=next_turn,
+        darts=state.darts[:seat] + (state.darts[seat] + 3,) + state.darts[seat + 1:],
+        darts_total=state.darts_total[:seat] + (state.darts_total[seat] + 3,) + state.darts_total[seat + 1:],
+    ), 0
+
+
+def replay(state, turns):
+    """State after playing `turns`, any iterable of CricketTurn or (kind, hits) tuples, in order"""
+    for turn in turns:
+        state, _ = apply_turn(state, turn)
+    return state
+
+
+# per seat fields of the stored scores dict, in CricketState order
+SCORES_FIELDS = ('marks', 'points', 'games', 'darts', 'darts_total', 'marks_total')
+
+
+def to_scores(state, seats):
+    """Scores dict as stored on GameSession, `seats` are the player ids in seat order.
+    Every per seat field is a list indexed by seat, 'marks' are packed two bits per target"""
+    scores_dict = {'seats': list(seats), 'turn': state.turn, 'cut_throat': state.cut_throat}
+    for field, values in zip(SCORES_FIELDS, state[2:]):
+        scores_dict[field] = list(values)
+    scores_dict['mpr'] = list(state.mpr)
+    return scores_dict
+
+
+def from_scores(scores_dict):
+    """State of a scores dict as stored on GameSession"""
+    closers = 0
+    for marks in scores_dict['marks']:
+        for index in range(len(TARGETS)):
+            if (marks >> (2 * index)) & 3 == 3:
+                closers += 1 << (4 * index)
+    return CricketState(
+        scores_dict['cut_throat'], scores_dict['turn'], *(tuple(scores_dict[field]) for field in SCORES_FIELDS), closers,
+    )
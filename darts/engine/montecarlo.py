@@ -0,0 +1,114 @@
+"""
+Monte Carlo win probabilities of an X01 leg.
+
+Every seat throws with the outcome table of its skill (see board.py): a dart aims at the
+first segment of the checkout route when there is one, else at T20 or a setup single, and
+what it hits is drawn from the table. Darts are drawn in batches of BATCH per seat and aim
+with random.choices, which keeps the inner loop to a few list operations per dart.
+`leg_win_probabilities` is memoized by remaining points, seat to throw and skill buckets, so the
+background worker (see darts/odds.py) doesn't simulate a state it has seen again.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import random
+
+from ..checkouts import CHECKOUT_TABLES, MAX_CHECKOUT
+from .board import aim_name, bucket_sigma, outcome_table
+
+# darts drawn per random.choices call
+BATCH = 512
+# legs simulated per probability
+SIMULATED_LEGS = 2000
+# visits per seat after which a simulated leg is given up
+MAX_VISITS = 100
+
+
+def setup_aim(points):
+    """Single to aim at without a checkout route: the biggest leaving a one dart finish, else the biggest that doesn't bust"""
+    for number in range(20, 0, -1):
+        rest = points - number
+        if rest == 50 or (2 <= rest <= 40 and rest % 2 == 0):
+            return f'S{number}'
+    for number in range(20, 0, -1):
+        if points - number >= 2:
+            return f'S{number}'
+    return 'S1'
+
+
+def build_aim_table(darts_left):
+    """Tuple indexed by points (0-170) of where to aim with darts_left darts in hand"""
+    aims = []
+    for points in range(MAX_CHECKOUT + 1):
+        route = CHECKOUT_TABLES[darts_left][points]
+        if route:
+            aims.append(aim_name(route.split('|')[0].split()[0]))
+        elif points - 60 >= 2:
+            aims.append('T20')
+        else:
+            aims.append(setup_aim(points))
+    return tuple(aims)
+
+
+# AIM_TABLES[darts_left][points], above MAX_CHECKOUT everybody aims at T20
+AIM_TABLES = (None, build_aim_table(1), build_aim_table(2), build_aim_table(3))
+
+
+def simulate_legs(points, turn, sigmas, legs, seed):
+    """Plays `legs` legs from the remaining `points` per seat with `turn` to throw.
+    Returns the number of legs won by each seat"""
+    rng = random.Random(seed)
+    choices = rng.choices
+    seats = len(points)
+    tables = [outcome_table(sigma) for sigma in sigmas]
+    # per seat and aim, drawn darts not thrown yet
+    drawn = [{} for _ in range(seats)]
+    aim_tables = AIM_TABLES
+    wins = [0] * seats
+    for _ in range(legs):
+        left = list(points)
+        seat = turn
+        for _ in range(MAX_VISITS * seats):
+            start = remaining = left[seat]
+            seat_drawn = drawn[seat]
+            for darts_left in (3, 2, 1):
+                aim = aim_tables[darts_left][remaining] if remaining <= MAX_CHECKOUT else 'T20'
+                batch = seat_drawn.get(aim)
+                if not batch:
+                    outcomes, cum_weights = tables[seat][aim]
+                    batch = seat_drawn[aim] = choices(outcomes, cum_weights=cum_weights, k=BATCH)
+                value, double = batch.pop()
+                remaining -= value
+                if remaining < 2:
+                    if remaining == 0 and double:
+                        break
+                    # bust, back to the points the visit started with
+                    remaining = start
+                    break
+            if remaining == 0:
+                wins[seat] += 1
+                break
+            left[seat] = remaining
+            seat = (seat + 1) % seats
+    return wins
+
+
+def win_probabilities(points, turn, sigmas, legs=SIMULATED_LEGS, workers=0, seed=0):
+    """Probability of every seat to win the leg. With workers > 1 the legs are split over a process pool"""
+    if workers > 1:
+        shares = [legs // workers + (index < legs % workers) for index in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                simulate_legs, [points] * workers, [turn] * workers, [sigmas] * workers, shares,
+                [seed + index for index in range(workers)],
+            )
+            wins = [sum(seat_wins) for seat_wins in zip(*results)]
+    else:
+        wins = simulate_legs(points, turn, sigmas, legs, seed)
+    return tuple(seat_wins / legs for seat_wins in wins)
+
+
+@lru_cache(maxsize=4096)
+def leg_win_probabilities(points, turn, buckets):
+    """Memoized win probabilities of a leg, `points` and `buckets` (skill buckets, see board.py) are per seat tuples"""
+    # seeded by the state, so the same state always gets the same odds
+    return win_probabilities(points, turn, tuple(bucket_sigma(bucket) for bucket in buckets), seed=hash((points, turn, buckets)))
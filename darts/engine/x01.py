@@ -0,0 +1,129 @@
+"""
+X01 rules (301, 501, 701, double out) on plain Python values.
+
+A game is an immutable `X01State` holding one entry per seat in every field, `apply_turn`
+returns the state after one turn, so replays, simulations and benchmarks run without
+Django or a database. `from_scores` and `to_scores` convert to the scores dict stored on
+GameSession.
+"""
+from collections import namedtuple
+
+# turn kinds, same values as darts.models.TurnKind
+SCORE, BUST, SWITCH, RESET = range(4)
+
+Turn = namedtuple('Turn', ['kind', 'score', 'darts'], defaults=[0, 3])
+Turn.__doc__ = 'One turn of the player whose turn it is, darts only count when the turn checks out'
+
+
+def calculate_average(game_win_points, player_points, player_total_darts_thrown):
+    """Calculates player's average, takes in 301, 501 or 701 as game win points, player's current points left and total number of darts thrown"""
+    # Average = Total points scored divided by the number of darts thrown multiplied by 3.
+    player_total_points_scored = game_win_points - player_points
+    player_average = round(player_total_points_scored / player_total_darts_thrown * 3, 1)
+    return player_average
+
+
+def calculate_total_average(player_total_points_scored, player_total_darts_thrown):
+    """Calculates player's total average, takes in total points scored in a game session and a total number of darts thrown in same session"""
+    player_total_average = round(player_total_points_scored / player_total_darts_thrown * 3, 1)
+    return player_total_average
+
+
+class X01State(namedtuple('X01State', ['win_points', 'turn', 'points', 'games', 'darts', 'darts_total', 'scored', 'average'])):
+    """Scores of an X01 game session. `turn` is the seat to throw, the other fields are tuples indexed by seat:
+    points left, legs won, darts of the current leg, darts of the session, points scored in the session
+    and the average of the last leg played"""
+    __slots__ = ()
+
+    @property
+    def average_total(self):
+        return tuple(
+            calculate_total_average(scored, darts) if darts else 0 for scored, darts in zip(self.scored, self.darts_total)
+        )
+
+
+def new_state(win_points, seats=2):
+    """State of a fresh game session, first seat to throw"""
+    zeros = (0,) * seats
+    return X01State(win_points, 0, (win_points,) * seats, zeros, zeros, zeros, zeros, zeros)
+
+
+def replace_seat(values, seat, value):
+    return values[:seat] + (value,) + values[seat + 1:]
+
+
+def apply_turn(state, turn):
+    """Plays `turn` for the seat whose turn it is.
+    Returns the new state and the number of darts the leg was won with, 0 if the leg goes on"""
+    kind, score, darts = turn
+    if kind == RESET:
+        return new_state(state.win_points, len(state.points)), 0
+    seat = state.turn
+    next_turn = (seat + 1) % len(state.points)
+    if kind == SWITCH:
+        return state._replace(turn=next_turn), 0
+
+    win_points = state.win_points
+    points, games = state.points, state.games
+    p_points = points[seat]
+    p_game_darts_thrown = state.darts[seat] + 3
+    p_total_darts_thrown = state.darts_total[seat] + 3
+    p_total_points_scored = state.scored[seat]
+    result = p_points - score
+    leg_darts = 0
+
+    if kind == BUST or result < 0 or result == 1:
+        # Result can't be less than 0 or 1 (double out rule), bust!
+        p_average = calculate_average(win_points, p_points, p_game_darts_thrown)
+    elif result == 0:
+        # Leg won! Checkout darts used for stats
+        p_total_points_scored += score
+        p_game_darts_thrown -= 3 - darts
+        p_total_darts_thrown -= 3 - darts
+        p_average = calculate_average(win_points, result, p_game_darts_thrown)
+        leg_darts = p_game_darts_thrown
+        # new leg for every seat, 1 game to the winner
+        points = (win_points,) * len(points)
+        games = replace_seat(games, seat, games[seat] + 1)
+    else:
+        # Legal result scored
+        p_total_points_scored += score
+        p_average = calculate_average(win_points, result, p_game_darts_thrown)
+        points = replace_seat(points, seat, result)
+
+    return X01State(
+        win_points,
+        next_turn,
+        points,
+        games,
+        (0,) * len(points) if leg_darts else replace_seat(state.darts, seat, p_game_darts_thrown),
+        replace_seat(state.darts_total, seat, p_total_darts_thrown),
+        replace_seat(state.scored, seat, p_total_points_scored),
+        replace_seat(state.average, seat, p_average),
+    ), leg_darts
+
+
+def replay(state, turns):
+    """State after playing `turns`, any iterable of Turn or (kind, score, darts) tuples, in order"""
+    for turn in turns:
+        state, _ = apply_turn(state, turn)
+    return state
+
+
+# per seat fields of the stored scores dict, in X01State order
+SCORES_FIELDS = ('points', 'games', 'darts', 'darts_total', 'total_points_scored', 'average')
+
+
+def to_scores(state, seats):
+    """Scores dict as stored on GameSession, `seats` are the player ids in seat order.
+    Every per seat field is a list indexed by seat, 'turn' is the seat to throw"""
+    scores_dict = {'seats': list(seats), 'turn': state.turn}
+    for field, values in zip(SCORES_FIELDS, state[2:]):
+        scores_dict[field] = list(values)
+    scores_dict['average_total'] = list(state.average_total)
+    return scores_dict
+
+
+def from_scores(scores_dict, win_points):
+    """State of a scores dict as stored on GameSession"""
+    return X01State(win_points, scores_dict['turn'], *(tuple(scores_dict[field]) for field in SCORES_FIELDS))
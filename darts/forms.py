@@ -1,7 +1,11 @@
 from django import forms
 from django.forms import CheckboxSelectMultiple, ChoiceField
 from .models import GameSession, GameChoices
-from user.models import Player
+
+
+# players a game session can seat
+MIN_PLAYERS = 2
+MAX_PLAYERS = 8
 
 
 class GameCreateForm(forms.ModelForm):
@@ -12,17 +16,14 @@ class GameCreateForm(forms.ModelForm):
         model = GameSession
         fields = ('game_type', 'players',)
         widgets = {
-            'players': CheckboxSelectMultiple(choices=Player.objects.all()),
+            'players': CheckboxSelectMultiple,
         }
 
     def clean_players(self):
         data = self.cleaned_data['players']
-        if len(data) != 2:
-            raise forms.ValidationError('Two players must be selected to play!')
+        if not MIN_PLAYERS <= len(data) <= MAX_PLAYERS:
+            raise forms.ValidationError(f'Select {MIN_PLAYERS} to {MAX_PLAYERS} players to play!')
         return data
     
     def clean_game_type(self):
-        data = int(self.cleaned_data['game_type'])
-        if data == 3 or data == 4:
-            raise forms.ValidationError('Cricket games are not implemented yet.')
-        return data
\ No newline at end of file
+        return int(self.cleaned_data['game_type'])
\ No newline at end of file
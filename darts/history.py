@@ -0,0 +1,111 @@
+from django.db import transaction
+
+from . import engine
+from .engine import cricket
+from .db import lock_game, save_game
+from .models import Turn, TurnKind, Snapshot
+from .odds import queue_odds
+from .stats import add_turn_stats, remove_turn_stats
+
+
+# take a snapshot of the scores every this many turns
+SNAPSHOT_INTERVAL = 10
+
+
+def start_history(game, scores_dict):
+    """Checkpoints the starting scores of a new game session and queues its win chances. Caller saves the game session"""
+    game.scores = scores_dict
+    game.turn_count = 0
+    Snapshot.objects.create(game_session=game, sequence=0, scores=scores_dict)
+    queue_odds(game)
+
+
+def record_turn(game, kind, score=0, darts=3, player=None, hits=()):
+    """Applies a turn of `player` to the game session's scores, appends it to the turn log and adds it to the player's stats.
+    X01 turns take a score and checkout darts, cricket visits (TurnKind.MARKS) the hits of up to three darts.
+    Saves the game session before writing the log, raises ScoresChanged if it was changed since it was read.
+    Returns the logged Turn, its leg_darts are the darts the leg was won with, 0 if the leg goes on"""
+    if game.is_cricket:
+        seat, leg_darts, outcome = play_cricket_turn(game, kind, hits)
+    else:
+        seat, leg_darts, outcome = play_x01_turn(game, kind, score, darts)
+    game.turn_count += 1
+    save_game(game)
+    turn = Turn.objects.create(
+        game_session=game, sequence=game.turn_count, kind=kind, seat=seat, player=player, leg_darts=leg_darts, **outcome,
+    )
+    add_turn_stats(turn)
+    if game.turn_count % SNAPSHOT_INTERVAL == 0:
+        Snapshot.objects.create(game_session=game, sequence=game.turn_count, scores=game.scores)
+    queue_odds(game)
+    return turn
+
+
+def play_x01_turn(game, kind, score, darts):
+    """Applies an X01 turn to the game session's scores, returns seat, leg darts and the Turn fields of the outcome"""
+    state = engine.from_scores(game.scores, game.win_points)
+    seat = state.turn
+    points_left = state.points[seat]
+    # darts of the current leg go up by 3 per visit
+    first_nine = state.darts[seat] < 9
+    new_state, leg_darts = engine.apply_turn(state, engine.Turn(kind, score, darts))
+    game.scores = engine.to_scores(new_state, game.scores['seats'])
+    if kind in (TurnKind.SWITCH, TurnKind.RESET):
+        darts = scored = 0
+    else:
+        scored = new_state.scored[seat] - state.scored[seat]
+        if not leg_darts:
+            # checkout darts only count when the turn checks out
+            darts = 3
+    return seat, leg_darts, {
+        'score': score, 'darts': darts, 'points_left': points_left, 'scored': scored, 'first_nine': first_nine,
+    }
+
+
+def play_cricket_turn(game, kind, hits):
+    """Applies a cricket visit to the game session's scores, returns seat, leg darts and the Turn fields of the outcome.
+    The turn's score is the number of marks that counted, scored the points the player got"""
+    state = cricket.from_scores(game.scores)
+    seat = state.turn
+    hits = [list(hit) for hit in hits] if kind == TurnKind.MARKS else []
+    new_state, leg_darts = cricket.apply_turn(state, cricket.CricketTurn(kind, hits))
+    game.scores = cricket.to_scores(new_state, game.scores['seats'])
+    if kind == TurnKind.MARKS:
+        darts = new_state.darts_total[seat] - state.darts_total[seat]
+        marks = new_state.marks_total[seat] - state.marks_total[seat]
+        scored = 0 if leg_darts else max(new_state.points[seat] - state.points[seat], 0)
+    else:
+        darts = marks = scored = 0
+    return seat, leg_darts, {'score': marks, 'darts': darts, 'scored': scored, 'hits': hits}
+
+
+def rebuild_scores(game, sequence):
+    """Rebuilds scores as they were after `sequence` turns by replaying the log from the nearest snapshot"""
+    snapshot = game.snapshots.filter(sequence__lte=sequence).order_by('-sequence').first()
+    turns = game.turns.filter(sequence__gt=snapshot.sequence, sequence__lte=sequence).order_by('sequence')
+    if game.is_cricket:
+        state = cricket.replay(cricket.from_scores(snapshot.scores), turns.values_list('kind', 'hits'))
+        return cricket.to_scores(state, snapshot.scores['seats'])
+    state = engine.replay(engine.from_scores(snapshot.scores, game.win_points), turns.values_list('kind', 'score', 'darts'))
+    return engine.to_scores(state, snapshot.scores['seats'])
+
+
+def undo_turns(game, levels=1):
+    """Drops the last `levels` turns from the log and restores the scores before them.
+    Returns False without writing anything if there is nothing to undo. Saves the game session like record_turn.
+    The log is read with the game session locked, raises ScoresChanged if it was changed since it was read"""
+    first_snapshot = game.snapshots.order_by('sequence').values_list('sequence', flat=True).first()
+    target = max(game.turn_count - levels, first_snapshot or 0)
+    if target >= game.turn_count:
+        return False
+    with transaction.atomic():
+        lock_game(game)
+        game.scores = rebuild_scores(game, target)
+        undone = list(game.turns.filter(sequence__gt=target))
+        game.turn_count = target
+        save_game(game)
+        game.turns.filter(sequence__gt=target).delete()
+        remove_turn_stats(undone)
+        game.snapshots.filter(sequence__gt=target).delete()
+        queue_odds(game)
+    return True
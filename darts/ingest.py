@@ -0,0 +1,206 @@
+"""
+Darts pushed by electronic dartboards.
+
+A board posts its darts to the ingest endpoint (api.board_events_view) as they land, every event
+with an id of its own so a batch sent again after a timeout isn't counted twice. `offer` stores the
+new events of a post as BoardEvent rows and queues a 'board_events' task (see tasks.py) in the same
+transaction: events among the last DEDUPE_WINDOW ids of the board are dropped, a batch that doesn't
+fit in the board's INGEST_QUEUE_SIZE waiting events is refused whole and the board retries it later
+(429), which is counted as backpressure. The task takes everything waiting for a board at once,
+groups the darts into visits on the live scores (three darts, the takeout, a checkout or a bust end
+one) and commits them in its transaction. Darts of an unfinished visit wait for the board's next events.
+
+The queue is in the database like the tasks, so any web process can take a board's posts and any
+worker score them. Only the event counters are kept per process, like the request metrics.
+"""
+from collections import Counter, defaultdict
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from .cache import seated_players
+from .db import ScoresChanged
+from .models import BoardEvent, Dartboard, TurnKind
+from .tasks import enqueue, task
+from .views import COMMIT_ATTEMPTS, save_turn
+
+logger = logging.getLogger(__name__)
+
+# event ids of a board remembered to drop resent events
+DEDUPE_WINDOW = 256
+# event of the player pulling the darts out of the board, ends the visit
+TAKEOUT = 'takeout'
+
+# (help, type) of the numbers kept per board
+BOARD_METRICS = {
+    'events_total': ('Dart events of boards by what became of them', 'counter'),
+    'turns_total': ('Visits committed from board darts', 'counter'),
+    'queue_depth': ('Events waiting for the worker', 'gauge'),
+}
+
+# event counts of this process by board id
+_counts = defaultdict(Counter)
+_counts_lock = threading.Lock()
+
+
+class QueueFull(Exception):
+    """The board's queue has no room for the events, the board should send them again later"""
+
+
+def count(board_id, counts):
+    with _counts_lock:
+        _counts[board_id].update(counts)
+
+
+def reset():
+    """Forgets the event counts of this process"""
+    with _counts_lock:
+        _counts.clear()
+
+
+def offer(board_id, events):
+    """Queues the new ones of `events`, (id, dart or TAKEOUT) pairs in the order they happened.
+    Returns the numbers of queued and duplicate events, raises QueueFull if they don't fit"""
+    size = getattr(settings, 'INGEST_QUEUE_SIZE', 64)
+    new = {}
+    for event_id, value in events:
+        new.setdefault(str(event_id), value)
+    with transaction.atomic():
+        seen = set(BoardEvent.objects.filter(board_id=board_id, event_id__in=list(new)).values_list('event_id', flat=True))
+        new = {event_id: value for event_id, value in new.items() if event_id not in seen}
+        duplicates = len(events) - len(new)
+        if BoardEvent.objects.filter(board_id=board_id, applied=False).count() + len(new) > size:
+            count(board_id, Counter(duplicate=duplicates, rejected=len(new)))
+            raise QueueFull
+        # a post sent twice at once stores its events once
+        BoardEvent.objects.bulk_create(
+            [
+                BoardEvent(board_id=board_id, event_id=event_id, dart=None if value == TAKEOUT else list(value))
+                for event_id, value in new.items()
+            ],
+            ignore_conflicts=True,
+        )
+        if new:
+            enqueue('board_events', board_id=board_id)
+    count(board_id, Counter(duplicate=duplicates, queued=len(new)))
+    return len(new), duplicates
+
+
+def queue_depth():
+    """Number of events waiting for the worker by board id"""
+    return dict(
+        BoardEvent.objects.filter(applied=False).values_list('board_id').annotate(count=Count('id')).order_by()
+    )
+
+
+def exposition():
+    """Numbers of every board in the Prometheus text format, for the metrics view"""
+    depth = queue_depth()
+    with _counts_lock:
+        counts = {board_id: Counter(board_counts) for board_id, board_counts in _counts.items()}
+    board_ids = sorted(set(counts) | set(depth))
+    lines = []
+    for name, (description, kind) in BOARD_METRICS.items():
+        lines.append(f'# HELP darts_ingest_{name} {description}')
+        lines.append(f'# TYPE darts_ingest_{name} {kind}')
+        for board_id in board_ids:
+            board_counts = counts.get(board_id, Counter())
+            if name == 'events_total':
+                lines.extend(
+                    f'darts_ingest_events_total{{board="{board_id}",outcome="{outcome}"}} {board_counts[outcome]}'
+                    for outcome in ('queued', 'duplicate', 'rejected', 'dropped')
+                )
+            elif name == 'turns_total':
+                lines.append(f'darts_ingest_turns_total{{board="{board_id}"}} {board_counts["turns"]}')
+            else:
+                lines.append(f'darts_ingest_queue_depth{{board="{board_id}"}} {depth.get(board_id, 0)}')
+    return lines
+
+
+def dart_value(dart):
+    """(points, is a double) of a (number, multiplier) dart"""
+    number, multiplier = dart
+    return number * multiplier, multiplier == 2
+
+
+def visit_turn(game, darts, finished=False):
+    """(kind, score, checkout darts) of the visit when the darts so far end it, None while it goes on.
+    `finished` is set when the darts were taken out"""
+    if game.is_cricket:
+        return (TurnKind.MARKS, 0, 3) if finished or len(darts) == 3 else None
+    scored = sum(dart_value(dart)[0] for dart in darts)
+    left = game.scores['points'][game.scores['turn']] - scored
+    if left == 0 and dart_value(darts[-1])[1]:
+        return TurnKind.SCORE, scored, len(darts)
+    if left <= 1:
+        # below zero, one left or zero not on a double
+        return TurnKind.BUST, 0, 3
+    return (TurnKind.SCORE, scored, 3) if finished or len(darts) == 3 else None
+
+
+def apply_events(game, players, events):
+    """Commits the visits the events complete to the game session, returns the number of visits and
+    the id of the last event they used up, None if they used up none. Raises ScoresChanged"""
+    darts, turns, used = [], 0, None
+    for event in events:
+        if event.dart is not None:
+            darts.append(tuple(event.dart))
+        if not darts:
+            # takeout of an empty board
+            used = event.id
+            continue
+        turn = visit_turn(game, darts, finished=event.dart is None)
+        if turn is None:
+            continue
+        kind, score, checkout_darts = turn
+        save_turn(game, kind, score, checkout_darts, players, darts if kind == TurnKind.MARKS else ())
+        darts, turns, used = [], turns + 1, event.id
+    return turns, used
+
+
+@task('board_events')
+def board_events(board_id):
+    """Scores the events waiting for the board on its game session, one worker at a time per board.
+    Events of the board's unfinished visit stay waiting"""
+    # locks the board, so two workers don't score the same darts
+    if not Dartboard.objects.filter(pk=board_id).update(game_session=F('game_session')):
+        return
+    game = Dartboard.objects.select_related('game_session').get(pk=board_id).game_session
+    waiting = BoardEvent.objects.filter(board_id=board_id, applied=False)
+    events = list(waiting.order_by('id'))
+    if not events:
+        return
+    if game is None:
+        # the board was taken out of its game since the events came in
+        waiting.update(applied=True)
+        count(board_id, Counter(dropped=len(events)))
+        return
+    players = seated_players(game)
+    for attempt in range(COMMIT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                turns, used = apply_events(game, players, events)
+        except ScoresChanged:
+            # scores were changed on a tablet as well, the board's darts go on top of them
+            game.refresh_from_db(fields=['scores', 'turn_count', 'version'])
+            continue
+        if used is not None:
+            waiting.filter(id__lte=used).update(applied=True)
+        forget_old_events(board_id)
+        count(board_id, Counter(turns=turns))
+        return
+    logger.warning('Darts of board %s dropped, its game kept changing', board_id)
+    waiting.update(applied=True)
+    count(board_id, Counter(dropped=len(events)))
+
+
+def forget_old_events(board_id):
+    """Deletes the board's scored events beyond the last DEDUPE_WINDOW"""
+    oldest = list(
+        BoardEvent.objects.filter(board_id=board_id).order_by('-id').values_list('id', flat=True)[DEDUPE_WINDOW:DEDUPE_WINDOW + 1]
+    )
+    if oldest:
+        BoardEvent.objects.filter(board_id=board_id, applied=True, id__lte=oldest[0]).delete()
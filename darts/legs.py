@@ -0,0 +1,58 @@
+"""
+Work after a won leg, off the request path.
+
+`queue_leg_completed` (connected to signals.leg_won in apps.py) queues a task in the turn's
+transaction, the background worker (see tasks.py) then archives the leg as a LegRecord and awards
+the achievements it earned. Both hang on the winning turn, undoing it takes them away again.
+Stats of the players are already added up with every turn, in its transaction.
+"""
+import math
+
+from .engine import calculate_average
+from .models import Achievement, AchievementKind, LegRecord, Turn
+from .tasks import enqueue, task
+
+# checkouts earning achievements
+TON_PLUS = 100
+BIG_FISH = 170
+
+
+def queue_leg_completed(sender, game, seat, turn, **kwargs):
+    """Queues the leg's archive for the worker"""
+    enqueue('leg_completed', turn_id=turn.id, player_id=game.scores['seats'][seat])
+
+
+def earned(record, win_points):
+    """Achievements of an archived X01 leg"""
+    kinds = []
+    # 60 a dart is the most there is
+    if record.darts <= math.ceil(win_points / 60):
+        kinds.append(AchievementKind.PERFECT_LEG)
+    if record.checkout >= TON_PLUS:
+        kinds.append(AchievementKind.TON_PLUS_CHECKOUT)
+    if record.checkout == BIG_FISH:
+        kinds.append(AchievementKind.BIG_FISH)
+    return kinds
+
+
+@task('leg_completed')
+def leg_completed(turn_id, player_id):
+    """Archives the leg won by the turn and awards its achievements, runs again without doubling them"""
+    turn = Turn.objects.select_related('game_session').filter(pk=turn_id).first()
+    if turn is None:
+        # undone, or the game session deleted, before the worker got to it
+        return
+    game = turn.game_session
+    record, created = LegRecord.objects.get_or_create(turn=turn, defaults={
+        'game_session': game,
+        'winner_id': player_id,
+        'darts': turn.leg_darts,
+        'checkout': 0 if game.is_cricket else turn.scored,
+        # the winner scored all of the leg's points
+        'average': 0 if game.is_cricket else calculate_average(game.win_points, 0, turn.leg_darts),
+    })
+    if game.is_cricket or not created:
+        return
+    Achievement.objects.bulk_create(
+        [Achievement(player_id=player_id, leg=record, kind=kind) for kind in earned(record, game.win_points)]
+    )
@@ -0,0 +1,181 @@
+"""
+Live scoreboard push channel.
+
+Scoring views publish every change of a GameSession to `hub`, an in-process fan-out that
+keeps the latest state per game session uuid and hands each update to all subscribed viewers.
+`sse_application` is a plain ASGI app mounted by dartsconfig/asgi.py under /live/<uuid>/ that
+streams those updates to any number of read-only viewers as Server-Sent Events, so one
+scoring write feeds every display without further database reads.
+
+The hub lives in the process, run a single ASGI worker (or one per venue) to share it.
+"""
+import asyncio
+import json
+import threading
+import uuid as uuid_lib
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .models import GameSession
+
+
+# updates a slow viewer may lag behind before they are replaced by the full state
+VIEWER_QUEUE_SIZE = 16
+# seconds between keep-alive comments on idle streams
+KEEPALIVE_INTERVAL = 15
+
+
+def state_payload(game):
+    """What viewers get to see of a game session"""
+    return {'turn_count': game.turn_count, 'scores': game.scores}
+
+
+class LiveHub:
+    """Fan-out of game state updates to viewers, keyed by game session uuid"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._latest = {}
+
+    def subscribe(self, key):
+        """Registers a viewer on the running event loop, returns the queue its updates arrive on"""
+        queue = asyncio.Queue(maxsize=VIEWER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, key, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(key, set())
+            subscribers.difference_update({item for item in subscribers if item[1] is queue})
+            if not subscribers:
+                # nobody watches, stop keeping its state around
+                self._subscribers.pop(key, None)
+                self._latest.pop(key, None)
+
+    def viewers(self, key):
+        with self._lock:
+            return len(self._subscribers.get(key, ()))
+
+    def latest(self, key):
+        """Last published state of a watched game session, None if it isn't known in this process"""
+        with self._lock:
+            return self._latest.get(key)
+
+    def remember(self, key, state):
+        """Caches a state read from the database without broadcasting it"""
+        with self._lock:
+            self._latest.setdefault(key, state)
+
+    def publish(self, key, state):
+        """Stores the new state and sends viewers only the top level scores entries that changed.
+        Safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+            if not subscribers:
+                self._latest.pop(key, None)
+                return
+            previous = self._latest.get(key)
+            self._latest[key] = state
+        if previous is None:
+            message = {'full': True, **state}
+        else:
+            scores = state['scores']
+            changes = {name: value for name, value in scores.items() if previous['scores'].get(name) != value}
+            message = {'full': False, 'turn_count': state['turn_count'], 'changes': changes}
+        data = json.dumps(message)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(offer, queue, data, state)
+
+    def forget(self, key):
+        with self._lock:
+            self._latest.pop(key, None)
+
+
+def offer(queue, data, state):
+    """Puts data on a viewer queue. A viewer that can't keep up gets the full `state` instead of everything
+    it has waiting, changes only make sense on top of all the ones before them"""
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        data = json.dumps({'full': True, **state})
+    queue.put_nowait(data)
+
+
+hub = LiveHub()
+
+
+def publish_game(game):
+    """Broadcasts the game session state to live viewers once the current transaction commits"""
+    key = str(game.uuid)
+    state = state_payload(game)
+    transaction.on_commit(lambda: hub.publish(key, state))
+
+
+@sync_to_async
+def load_state(key):
+    game = GameSession.objects.filter(uuid=key).only('uuid', 'turn_count', 'scores').first()
+    return state_payload(game) if game else None
+
+
+async def send_text(send, status, text):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': text.encode()})
+
+
+async def sse_application(scope, receive, send):
+    """ASGI app streaming /live/<uuid>/ as Server-Sent Events, first event is the full state"""
+    if scope['type'] != 'http':
+        return
+    if scope['method'] != 'GET':
+        return await send_text(send, 405, 'Method not allowed')
+    try:
+        key = str(uuid_lib.UUID(scope['path'].strip('/').split('/')[-1]))
+    except ValueError:
+        return await send_text(send, 404, 'Not found')
+
+    # subscribe before reading the state so no update published in between gets lost
+    queue = hub.subscribe(key)
+    state = hub.latest(key)
+    if state is None:
+        state = await load_state(key)
+        if state is None:
+            hub.unsubscribe(key, queue)
+            return await send_text(send, 404, 'Not found')
+        hub.remember(key, state)
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    watcher = asyncio.ensure_future(wait_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        first = json.dumps({'full': True, **state})
+        await send({'type': 'http.response.body', 'body': f'data: {first}\n\n'.encode(), 'more_body': True})
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, watcher}, timeout=KEEPALIVE_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                chunk = f'data: {getter.result()}\n\n'
+            else:
+                getter.cancel()
+                if watcher in done:
+                    break
+                chunk = ': keep-alive\n\n'
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    except OSError:
+        pass
+    finally:
+        watcher.cancel()
+        hub.unsubscribe(key, queue)
@@ -0,0 +1,120 @@
+import json
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from darts.benchmark import (
+    BASELINE_PATH, best, create_boards, engine_legs, finish_tasks, play_boards, regressions, summarize,
+)
+from darts.engine.board import skill_bucket
+from darts.stats import DEFAULT_AVERAGE
+from darts.utils import checkout_tables
+
+
+# options a run has to share with the baseline for its timings to compare
+RUN_OPTIONS = {
+    'client': ('boards', 'legs', 'threads'),
+    'worker': ('boards', 'legs', 'threads'),
+    'engine': ('boards', 'legs'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Plays scripted 501 legs on many boards through the test client, again with a worker thread running '
+        'the queued tasks at the same time, and on the bare engine, reports requests/s, p50/p99 latency and queries per turn and fails on a regression from the stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=('all', 'client', 'worker', 'engine'), default='all',
+            help="Benchmarks to run, 'worker' is the client one with the tasks run while the boards play",
+        )
+        parser.add_argument('--boards', type=int, default=10, help='Game sessions played at the same time')
+        parser.add_argument('--legs', type=int, default=5, help='Scripted legs played per board')
+        parser.add_argument('--threads', type=int, default=0, help='Concurrent clients, 0 is one per board, 1 plays the boards one after another')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs of every benchmark, the best numbers of them count')
+        parser.add_argument('--baseline', default=str(BASELINE_PATH), help='JSON file of the baseline')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline instead of comparing')
+        parser.add_argument('--tolerance', type=float, default=0.5, help='How much slower than the baseline timings may get, 0.5 is 50%%')
+
+    def handle(self, *args, **options):
+        options['threads'] = options['threads'] or options['boards']
+        modes = tuple(RUN_OPTIONS) if options['mode'] == 'all' else (options['mode'],)
+        # the advised checkouts of a bucket are worked out on first use, not part of the hot path
+        bucket = skill_bucket(DEFAULT_AVERAGE)
+        checkout_tables(bucket)
+
+        results = {}
+        for mode in modes:
+            result = best([
+                self.run_engine(options, bucket) if mode == 'engine' else self.run_client(options, mode == 'worker')
+                for _ in range(options['repeat'])
+            ])
+            result.update({option: options[option] for option in RUN_OPTIONS[mode]})
+            results[mode] = result
+            self.stdout.write(f'{mode}: ' + ', '.join(f'{name} {value:g}' for name, value in result.items()))
+
+        if options['save_baseline']:
+            baselines = self.load_baselines(options['baseline'])
+            baselines.update(results)
+            with open(options['baseline'], 'w') as baseline_file:
+                json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+                baseline_file.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {options["baseline"]}'))
+            return
+
+        baselines = self.load_baselines(options['baseline'])
+        failures, compared = [], 0
+        for mode, result in results.items():
+            baseline = baselines.get(mode)
+            if baseline is None:
+                self.stdout.write(self.style.WARNING(f'{mode}: no baseline, run with --save-baseline to store one'))
+                continue
+            compared += 1
+            if any(baseline.get(option) != options[option] for option in RUN_OPTIONS[mode]):
+                # timings of another number of boards or threads don't compare, queries per turn do
+                self.stdout.write(self.style.WARNING(
+                    f'{mode}: baseline was taken with ' + ', '.join(f'--{option} {baseline.get(option)}' for option in RUN_OPTIONS[mode])
+                    + ', only queries per turn are compared'
+                ))
+                baseline = {name: value for name, value in baseline.items() if name == 'queries_per_turn'}
+            failures.extend(f'{mode}: {message}' for message in regressions(result, baseline, options['tolerance']))
+        if failures:
+            raise CommandError('Slower than the baseline: ' + '; '.join(failures))
+        if compared:
+            self.stdout.write(self.style.SUCCESS('No regressions from the baseline'))
+
+    def load_baselines(self, path):
+        try:
+            with open(path) as baseline_file:
+                return json.load(baseline_file)
+        except FileNotFoundError:
+            return {}
+
+    def run_client(self, options, worker=False):
+        name = f'benchmark-{uuid.uuid4().hex[:8]}'
+        user = get_user_model().objects.create_user(name, f'{name}@example.com', uuid.uuid4().hex)
+        try:
+            # without the worker the tasks run here afterwards, with it the worker thread simulates win chances
+            # and archives legs while the boards play; either way they're done before the user is deleted
+            with override_settings(TASK_WORKER=False):
+                games = create_boards(user, options['boards'])
+            with override_settings(TASK_WORKER=worker):
+                timings, queries, errors, elapsed = play_boards(user, games, options['legs'], options['threads'])
+            if not finish_tasks():
+                raise CommandError('The worker thread is still running tasks')
+        finally:
+            user.delete()
+        if errors:
+            raise CommandError(f'{errors} of {len(timings)} requests failed ({connection.vendor})')
+        return summarize(timings, elapsed, queries)
+
+    def run_engine(self, options, bucket):
+        started = time.perf_counter()
+        timings = engine_legs(options['boards'] * options['legs'], bucket)
+        return summarize(timings, time.perf_counter() - started)
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from darts.benchmark import client_host, create_boards, finish_tasks
+
+
+def play_board(user, game, turns, seed):
+    """Commits `turns` random visits on one board through the turn endpoint like the play page does.
+    Returns the seconds every commit took and the number of failed ones"""
+    client = Client(HTTP_HOST=client_host())
+    client.force_login(user)
+    rng = random.Random(seed)
+    url = reverse('turn', kwargs={'uuid': game.uuid})
+    timings, errors = [], 0
+    try:
+        for _ in range(turns):
+            started = time.perf_counter()
+            response = client.post(url, json.dumps({'score': rng.randint(20, 100)}), content_type='application/json')
+            timings.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+    finally:
+        # every thread has its own connection
+        connection.close()
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = 'Scores 501 games on many boards at once through the turn endpoint and reports the throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boards', type=int, default=50, help='Game sessions played at the same time')
+        parser.add_argument('--turns', type=int, default=30, help='Turns committed per board')
+        parser.add_argument('--threads', type=int, default=0, help='Concurrent clients, 0 is one per board, 1 plays the boards one after another')
+        parser.add_argument('--keep', action='store_true', help="Keep the load test's user, players and games")
+        parser.add_argument('--worker', action='store_true', help='Run the queued tasks in a worker thread while the boards play')
+
+    def handle(self, *args, **options):
+        boards, turns = options['boards'], options['turns']
+        threads = options['threads'] or boards
+        name = f'loadtest-{uuid.uuid4().hex[:8]}'
+        user = get_user_model().objects.create_user(name, f'{name}@example.com', uuid.uuid4().hex)
+        games = create_boards(user, boards)
+
+        started = time.perf_counter()
+        # without the worker the legs' tasks run after the boards, either way they're done before the user is deleted
+        with override_settings(TASK_WORKER=options['worker']):
+            if threads == 1:
+                results = [play_board(user, game, turns, seed) for seed, game in enumerate(games)]
+            else:
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    results = list(pool.map(play_board, [user] * boards, games, [turns] * boards, range(boards)))
+        elapsed = time.perf_counter() - started
+        finish_tasks()
+
+        timings = sorted(timing for board_timings, _ in results for timing in board_timings)
+        errors = sum(board_errors for _, board_errors in results)
+        if not options['keep']:
+            user.delete()
+        if not timings:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(timings)} turns on {boards} boards with {threads} threads in {elapsed:.2f}s: '
+            f'{len(timings) / elapsed:.0f} turns/s, p50 {timings[len(timings) // 2] * 1000:.1f}ms, '
+            f'p95 {timings[int(len(timings) * 0.95)] * 1000:.1f}ms, {errors} errors ({connection.vendor})'
+        ))
@@ -0,0 +1,84 @@
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from darts.models import Turn
+from darts.stats import STATS_TURN_FIELDS, NOT_VISITS, turn_counts
+from darts.utils import calculate_total_average
+from user.models import Player, PlayerStats
+
+
+TurnRow = namedtuple('TurnRow', STATS_TURN_FIELDS)
+
+
+def compute_player_stats(player_id, chunk_size):
+    """Streams a player's turns in chunks and adds them up the same way live turn commits do"""
+    totals = Counter()
+    highest_checkout = 0
+    rows = (
+        Turn.objects.filter(player_id=player_id).exclude(kind__in=NOT_VISITS)
+        .order_by().values_list(*STATS_TURN_FIELDS).iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        turn = TurnRow(*row)
+        totals.update(turn_counts(turn))
+        if turn.leg_darts:
+            highest_checkout = max(highest_checkout, turn.scored)
+    values = {field.name: totals[field.name] for field in PlayerStats._meta.concrete_fields if field.name not in ('id', 'player')}
+    values['highest_checkout'] = highest_checkout
+    return player_id, values
+
+
+def compute_in_worker(player_ids, chunk_size):
+    """Runs in a pool process, each worker has its own database connection"""
+    return [compute_player_stats(player_id, chunk_size) for player_id in player_ids]
+
+
+def init_worker():
+    django.setup()
+    # connections inherited from the parent process can't be shared
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds all time player stats from the turn log, e.g. after rule fixes or imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--player', type=int, action='append', dest='players', help='Only this player id, can be repeated')
+        parser.add_argument('--workers', type=int, default=1, help='Processes to spread players over, 1 runs in this process')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Turns fetched per database round trip')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        player_ids = list(Player.objects.order_by('id').values_list('id', flat=True))
+        if options['players']:
+            player_ids = [player_id for player_id in player_ids if player_id in options['players']]
+        chunk_size = options['chunk_size']
+        workers = max(options['workers'], 1)
+
+        if workers == 1:
+            results = [compute_player_stats(player_id, chunk_size) for player_id in player_ids]
+        else:
+            # every worker gets an interleaved share so heavy and light players spread evenly
+            shares = [player_ids[i::workers] for i in range(workers)]
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                results = [result for share in pool.map(compute_in_worker, shares, [chunk_size] * workers) for result in share]
+            results.sort()
+
+        with transaction.atomic():
+            for player_id, values in results:
+                PlayerStats.objects.update_or_create(player_id=player_id, defaults=values)
+
+        for player_id, values in results:
+            if options['verbosity'] >= 2:
+                darts = values.get('darts', 0)
+                average = calculate_total_average(values.get('points', 0), darts) if darts else 0
+                self.stdout.write(f'player {player_id}: {values.get("visits", 0)} visits, average {average}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed stats of {len(results)} players in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from darts.tasks import queue_depth, run_all
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background tasks, the worker to run next to the web server (TASK_WORKER=1 runs a thread in the web process instead)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the tasks that are due and stop')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds to wait when no task is due')
+        parser.add_argument('--status', action='store_true', help='Only show the number of tasks by status')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write(', '.join(f'{status} {count}' for status, count in queue_depth().items()))
+            return
+        done = run_all()
+        while not options['once']:
+            close_old_connections()
+            time.sleep(options['interval'])
+            done += run_all()
+        self.stdout.write(self.style.SUCCESS(f'{done} tasks run'))
@@ -0,0 +1,61 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from darts import tasks
+from darts.benchmark import client_host
+from darts.models import Dartboard
+
+
+# darts the simulated player throws, mostly at the 20
+SEGMENTS = ['T20', '20', '20', '20', '5', '1', 'D20', 'T19', '19', '0', 'SB', 'DB', 'D16', 'T5', 'T1']
+
+
+class Command(BaseCommand):
+    help = "Stands in for an electronic dartboard: posts random darts with the board's token to the ingest endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('token', help="Token of a dartboard that plays a game session")
+        parser.add_argument('--visits', type=int, default=20, help='Visits thrown')
+        parser.add_argument('--batch', type=int, default=3, help='Events sent per post')
+        parser.add_argument('--resend', type=float, default=0.1, help='Share of posts sent twice, like after a timeout')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        board = Dartboard.objects.filter(token=options['token']).select_related('game_session').first()
+        if board is None or board.game_session is None:
+            raise CommandError('No dartboard with that token playing a game session')
+        rng = random.Random(options['seed'])
+        boot = rng.getrandbits(32)
+        events = []
+        for visit in range(options['visits']):
+            events.extend({'id': f'{boot}-{visit}-{dart}', 'dart': rng.choice(SEGMENTS)} for dart in range(3))
+            events.append({'id': f'{boot}-{visit}-out', 'takeout': True})
+
+        client = Client(HTTP_HOST=client_host(), HTTP_X_BOARD_TOKEN=board.token)
+        url = reverse('api_board_events')
+        posts = waits = duplicates = 0
+        for start in range(0, len(events), options['batch']):
+            body = json.dumps({'events': events[start:start + options['batch']]})
+            for _ in range(2 if rng.random() < options['resend'] else 1):
+                # a full queue is sent again until it takes the events
+                response = client.post(url, body, content_type='application/json')
+                while response.status_code == 429:
+                    waits += 1
+                    tasks.run_all()
+                    response = client.post(url, body, content_type='application/json')
+                if response.status_code != 202:
+                    raise CommandError(f'Board events refused: {response.status_code} {response.content.decode()}')
+                posts += 1
+                duplicates += response.json()['duplicates']
+        # scores what the worker hasn't got to yet
+        tasks.run_all()
+        board.game_session.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(events)} events in {posts} posts, {duplicates} duplicates dropped, '
+            f'{waits} times told to wait, {board.game_session.turn_count} turns on the game, '
+            f'points {board.game_session.scores.get("points")}'
+        ))
@@ -0,0 +1,150 @@
+"""
+Opt-in request instrumentation.
+
+With METRICS_ENABLED on, `MetricsMiddleware` times every request and records its database
+queries (count and time), the time spent rendering templates and the bytes of the response.
+They are added up per URL name (play, home, game_create, ...) in `registry`, in-memory
+histograms of the process, which the staff only metrics view serves in the Prometheus text
+format. Counts start over when the process restarts and every process keeps its own.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template.backends.django import Template
+
+
+# upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (1000, 10000, 50000, 100000, 500000, 1000000)
+
+# (help, buckets) of every histogram kept per URL name
+HISTOGRAMS = {
+    'request_seconds': ('Wall time of requests', SECONDS_BUCKETS),
+    'db_queries': ('Database queries per request', QUERIES_BUCKETS),
+    'db_seconds': ('Time spent in database queries per request', SECONDS_BUCKETS),
+    'template_seconds': ('Time spent rendering templates per request', SECONDS_BUCKETS),
+    'response_bytes': ('Bytes of response bodies, streamed responses not counted', BYTES_BUCKETS),
+}
+
+# numbers of the request being handled
+current = ContextVar('darts_request_metrics', default=None)
+
+
+class Histogram:
+    """Cumulative Prometheus style histogram"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+        yield f'{name}_sum{{{labels}}} {self.sum:g}'
+        yield f'{name}_count{{{labels}}} {total}'
+
+
+class MetricsRegistry:
+    """Histograms of every instrumented URL name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._collectors = []
+
+    def record(self, view, values):
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = {name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()}
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def collect(self, collector):
+        """Adds the lines `collector()` returns to every exposition, for numbers kept elsewhere"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def exposition(self):
+        """Everything recorded in the Prometheus text format"""
+        lines = []
+        with self._lock:
+            for name, (description, _) in HISTOGRAMS.items():
+                lines.append(f'# HELP darts_{name} {description}')
+                lines.append(f'# TYPE darts_{name} histogram')
+                for view, histograms in sorted(self._views.items()):
+                    lines.extend(histograms[name].lines(f'darts_{name}', f'view="{view}"'))
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def timed_render(render):
+    """Adds the time of top level template renders to the current request, includes render inside them"""
+    def wrapper(self, *args, **kwargs):
+        metrics = current.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics['template_seconds'] += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Records the numbers of every request in `registry`, not used unless settings.METRICS_ENABLED"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if not getattr(Template.render, 'timed', False):
+            Template.render = timed_render(Template.render)
+
+    def __call__(self, request):
+        metrics = {'db_queries': 0, 'db_seconds': 0.0, 'template_seconds': 0.0}
+        token = current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.time_query):
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        metrics['request_seconds'] = time.perf_counter() - started
+        if not response.streaming:
+            metrics['response_bytes'] = len(response.content)
+        match = request.resolver_match
+        registry.record(match.url_name if match and match.url_name else 'unmatched', metrics)
+        return response
+
+    def time_query(self, execute, sql, params, many, context):
+        metrics = current.get()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics['db_queries'] += 1
+            metrics['db_seconds'] += time.perf_counter() - started
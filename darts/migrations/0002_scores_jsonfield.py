@@ -0,0 +1,44 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:12
+
+import ast
+import json
+
+from django.db import migrations, models
+
+
+def scores_repr_to_json(apps, schema_editor):
+    """Rewrite python dict reprs stored in scores/undo as JSON so the columns can become JSONFields"""
+    GameSession = apps.get_model('darts', 'GameSession')
+    for game in GameSession.objects.only('id', 'scores', 'undo').iterator():
+        game.scores = json.dumps(ast.literal_eval(game.scores or '{}'))
+        game.undo = json.dumps(ast.literal_eval(game.undo or '{}'))
+        game.save(update_fields=['scores', 'undo'])
+
+
+def scores_json_to_repr(apps, schema_editor):
+    GameSession = apps.get_model('darts', 'GameSession')
+    for game in GameSession.objects.only('id', 'scores', 'undo').iterator():
+        game.scores = repr(json.loads(game.scores or '{}'))
+        game.undo = repr(json.loads(game.undo or '{}'))
+        game.save(update_fields=['scores', 'undo'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(scores_repr_to_json, scores_json_to_repr),
+        migrations.AlterField(
+            model_name='gamesession',
+            name='scores',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name='gamesession',
+            name='undo',
+            field=models.JSONField(default=dict),
+        ),
+    ]
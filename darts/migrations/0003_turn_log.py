@@ -0,0 +1,70 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def snapshot_existing_games(apps, schema_editor):
+    """Checkpoint current scores of existing game sessions so their turn log starts from them"""
+    GameSession = apps.get_model('darts', 'GameSession')
+    Snapshot = apps.get_model('darts', 'Snapshot')
+    Snapshot.objects.bulk_create(
+        Snapshot(game_session_id=game_id, sequence=0, scores=scores)
+        for game_id, scores in GameSession.objects.values_list('id', 'scores').iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0002_scores_jsonfield'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='gamesession',
+            name='undo',
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='turn_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Turn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('kind', models.IntegerField(choices=[(0, 'Score'), (1, 'Bust'), (2, 'Switch player')], default=0)),
+                ('seat', models.PositiveSmallIntegerField(default=0)),
+                ('score', models.PositiveSmallIntegerField(default=0)),
+                ('darts', models.PositiveSmallIntegerField(default=3)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+                ('game_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turns', to='darts.gamesession')),
+            ],
+            options={
+                'ordering': ['sequence'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Snapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('scores', models.JSONField()),
+                ('game_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='darts.gamesession')),
+            ],
+            options={
+                'ordering': ['sequence'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='turn',
+            constraint=models.UniqueConstraint(fields=('game_session', 'sequence'), name='unique_turn_sequence'),
+        ),
+        migrations.AddConstraint(
+            model_name='snapshot',
+            constraint=models.UniqueConstraint(fields=('game_session', 'sequence'), name='unique_snapshot_sequence'),
+        ),
+        migrations.RunPython(snapshot_existing_games, migrations.RunPython.noop),
+    ]
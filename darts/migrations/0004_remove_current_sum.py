@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-18 13:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0003_turn_log'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='gamesession',
+            name='current_sum',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0004_remove_current_sum'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['owner', '-time_modified', '-id'], name='gamesession_owner_modified'),
+        ),
+    ]
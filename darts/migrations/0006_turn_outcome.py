@@ -0,0 +1,40 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_player_stats'),
+        ('darts', '0005_gamesession_owner_modified_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turn',
+            name='leg_darts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='turn',
+            name='player',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='turns', to='user.player'),
+        ),
+        migrations.AddField(
+            model_name='turn',
+            name='points_left',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='turn',
+            name='scored',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='turn',
+            name='kind',
+            field=models.IntegerField(choices=[(0, 'Score'), (1, 'Bust'), (2, 'Switch player'), (3, 'Reset game')], default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0006_turn_outcome'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turn',
+            name='first_nine',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.1.5 on 2026-10-18 13:05
+
+from django.db import migrations
+
+
+# per player fields of the scores dict
+SEAT_FIELDS = ('points', 'games', 'darts', 'darts_total', 'total_points_scored', 'average', 'average_total')
+
+
+def keyed_to_seats(scores, seats):
+    """{'points': {'player1': 501, 'player2': 501}, ...} to {'seats': [id1, id2], 'points': [501, 501], ...}"""
+    names = sorted(scores['points'], key=lambda name: int(name[len('player'):]))
+    converted = {'seats': seats, 'turn': next((seat for seat, name in enumerate(names) if scores['turn'][name]), 0)}
+    for field in SEAT_FIELDS:
+        converted[field] = [scores[field][name] for name in names]
+    return converted
+
+
+def seats_to_keyed(scores):
+    names = [f'player{seat + 1}' for seat in range(len(scores['seats']))]
+    converted = {'turn': {name: seat == scores['turn'] for seat, name in enumerate(names)}}
+    for field in SEAT_FIELDS:
+        converted[field] = dict(zip(names, scores[field]))
+    return converted
+
+
+def convert_scores(apps, convert):
+    GameSession = apps.get_model('darts', 'GameSession')
+    Snapshot = apps.get_model('darts', 'Snapshot')
+    for game in GameSession.objects.prefetch_related('players').iterator(chunk_size=500):
+        if not game.scores:
+            continue
+        game.scores = convert(game, game.scores)
+        game.save(update_fields=['scores'])
+        for snapshot in Snapshot.objects.filter(game_session=game):
+            snapshot.scores = convert(game, snapshot.scores)
+            snapshot.save(update_fields=['scores'])
+
+
+def forwards(apps, schema_editor):
+    def convert(game, scores):
+        # two player sessions seated their players by name
+        seats = [player.id for player in sorted(game.players.all(), key=lambda player: player.name)]
+        return keyed_to_seats(scores, seats)
+
+    convert_scores(apps, convert)
+
+
+def backwards(apps, schema_editor):
+    convert_scores(apps, lambda game, scores: seats_to_keyed(scores))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0007_turn_first_nine'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
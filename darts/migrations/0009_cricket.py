@@ -0,0 +1,23 @@
+# Generated by Django 4.1.5 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0008_scores_seats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turn',
+            name='hits',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='turn',
+            name='kind',
+            field=models.IntegerField(choices=[(0, 'Score'), (1, 'Bust'), (2, 'Switch player'), (3, 'Reset game'), (4, 'Cricket visit')], default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0009_cricket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:20
+
+import darts.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('darts', '0010_gamesession_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dartboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=40)),
+                ('token', models.CharField(default=darts.models.new_board_token, max_length=64, unique=True)),
+                ('game_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dartboards', to='darts.gamesession')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
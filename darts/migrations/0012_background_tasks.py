@@ -0,0 +1,80 @@
+# Generated by Django 4.1.5 on 2026-10-18 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_player_stats_first9_checkout'),
+        ('darts', '0011_dartboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.IntegerField(choices=[(0, 'Perfect leg'), (1, 'Ton-plus checkout'), (2, 'Big fish')])),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LegRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('darts', models.PositiveSmallIntegerField(default=0)),
+                ('checkout', models.PositiveSmallIntegerField(default=0)),
+                ('average', models.FloatField(default=0)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.IntegerField(choices=[(0, 'Pending'), (1, 'Running'), (2, 'Failed')], default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+                ('time_modified', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_after'], name='task_status_run_after'),
+        ),
+        migrations.AddField(
+            model_name='legrecord',
+            name='game_session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leg_records', to='darts.gamesession'),
+        ),
+        migrations.AddField(
+            model_name='legrecord',
+            name='turn',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leg_record', to='darts.turn'),
+        ),
+        migrations.AddField(
+            model_name='legrecord',
+            name='winner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leg_records', to='user.player'),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='leg',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to='darts.legrecord'),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='player',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='achievements', to='user.player'),
+        ),
+        migrations.AddConstraint(
+            model_name='achievement',
+            constraint=models.UniqueConstraint(fields=('leg', 'kind'), name='unique_leg_achievement'),
+        ),
+    ]
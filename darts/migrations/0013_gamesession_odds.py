@@ -0,0 +1,23 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0012_background_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='odds',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='odds_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
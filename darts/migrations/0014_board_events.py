@@ -0,0 +1,33 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('darts', '0013_gamesession_odds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=64)),
+                ('dart', models.JSONField(blank=True, null=True)),
+                ('applied', models.BooleanField(default=False)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='darts.dartboard')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='boardevent',
+            index=models.Index(fields=['board', 'applied', 'id'], name='boardevent_board_applied'),
+        ),
+        migrations.AddConstraint(
+            model_name='boardevent',
+            constraint=models.UniqueConstraint(fields=('board', 'event_id'), name='boardevent_board_event_id'),
+        ),
+    ]
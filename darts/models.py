@@ -1,6 +1,9 @@
 from django.db import models
 from user.models import Player
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+import copy
+import secrets
 import uuid
     
     
@@ -13,6 +16,13 @@ class GameChoices(models.IntegerChoices):
     CRICKETCUT = 4, 'Cricket Cut Throat'
 
 
+GAME_WIN_POINTS = {
+    GameChoices.DARTS301: 301,
+    GameChoices.DARTS501: 501,
+    GameChoices.DARTS701: 701,
+}
+
+
 class GameSession(models.Model):    
     """ GameSessions are owned by CustomUser, one CustomUser can have many game sessions """
     uuid = models.UUIDField(unique=True, default=uuid.uuid4)
@@ -21,9 +31,216 @@ class GameSession(models.Model):
     players = models.ManyToManyField(Player, related_name='game_session')
     time_created = models.DateTimeField(auto_now_add=True)
     time_modified = models.DateTimeField(auto_now=True)
-    current_sum = models.IntegerField(default=0)
-    scores = models.TextField()
-    undo = models.TextField(default='{}')
+    scores = models.JSONField(default=dict)
+    turn_count = models.PositiveIntegerField(default=0)
+    # goes up with every change of the scores, turn commits compare and swap it
+    version = models.PositiveIntegerField(default=0)
+    # X01 leg win chances in percent per seat at odds_version, simulated by the background worker (see odds.py)
+    odds = models.JSONField(default=list, blank=True)
+    odds_version = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # home page lists a user's sessions newest first
+            models.Index(fields=['owner', '-time_modified', '-id'], name='gamesession_owner_modified'),
+        ]
     
+    # fields a turn changes, saved only when they differ from the database (see db.save_game)
+    TRACKED_FIELDS = ('scores', 'turn_count')
+
+    def __str__(self):
+        return f'id:{self.id} owner:{self.owner} game_type:{self.game_type}'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        game = super().from_db(db, field_names, values)
+        game.remember_saved()
+        return game
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        self.remember_saved()
+
+    def remember_saved(self):
+        """Keeps a copy of the loaded tracked fields as they are in the database"""
+        self._saved = {name: copy.deepcopy(self.__dict__[name]) for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def changed_fields(self):
+        """Tracked fields changed since the game session was loaded or saved"""
+        saved = getattr(self, '_saved', {})
+        return [
+            name for name in self.TRACKED_FIELDS
+            if name in self.__dict__ and (name not in saved or saved[name] != self.__dict__[name])
+        ]
+
+    def seated_players(self):
+        """Players in seat order, uses prefetched players if there are any"""
+        players = {player.id: player for player in self.players.all()}
+        return [players.get(player_id) for player_id in self.scores['seats']]
+
+    @property
+    def win_points(self):
+        """Starting points of a leg for X01 games, None for cricket"""
+        return GAME_WIN_POINTS.get(self.game_type)
+
+    @property
+    def is_cricket(self):
+        return self.game_type in (GameChoices.CRICKET, GameChoices.CRICKETCUT)
+
+
+class TurnKind(models.IntegerChoices):
+    """ What happened in a logged turn """
+    SCORE = 0, 'Score'
+    BUST = 1, 'Bust'
+    SWITCH = 2, 'Switch player'
+    RESET = 3, 'Reset game'
+    MARKS = 4, 'Cricket visit'
+
+
+class Turn(models.Model):
+    """ Append-only log of turns played in a GameSession, replayed to rebuild or undo game state """
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='turns')
+    sequence = models.PositiveIntegerField()
+    kind = models.IntegerField(choices=TurnKind.choices, default=TurnKind.SCORE)
+    seat = models.PositiveSmallIntegerField(default=0)
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True, related_name='turns')
+    # score entered and darts thrown, what gets replayed
+    score = models.PositiveSmallIntegerField(default=0)
+    darts = models.PositiveSmallIntegerField(default=3)
+    # cricket darts as [number, multiplier] pairs, number 0 is a miss
+    hits = models.JSONField(default=list, blank=True)
+    # outcome, for stats: points left before the turn, points that counted, darts of a won leg
+    # and whether the turn is one of the player's first three in the leg
+    points_left = models.PositiveSmallIntegerField(default=0)
+    scored = models.PositiveSmallIntegerField(default=0)
+    leg_darts = models.PositiveSmallIntegerField(default=0)
+    first_nine = models.BooleanField(default=False)
+    time_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['game_session', 'sequence'], name='unique_turn_sequence'),
+        ]
+
+    def __str__(self):
+        return f'game:{self.game_session_id} #{self.sequence} {self.get_kind_display()} {self.score}'
+
+
+class Snapshot(models.Model):
+    """ Checkpoint of a GameSession's scores after `sequence` turns, replays start from the nearest one """
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='snapshots')
+    sequence = models.PositiveIntegerField()
+    scores = models.JSONField()
+
+    class Meta:
+        ordering = ['sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['game_session', 'sequence'], name='unique_snapshot_sequence'),
+        ]
+
+    def __str__(self):
+        return f'game:{self.game_session_id} snapshot #{self.sequence}'
+
+
+def new_board_token():
+    return secrets.token_urlsafe(24)
+
+
+class Dartboard(models.Model):
+    """ Electronic dartboard of a CustomUser, pushes its darts to the ingest endpoint with its token (see ingest.py) """
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    name = models.CharField(max_length=40)
+    token = models.CharField(max_length=64, unique=True, default=new_board_token)
+    # game session the board's darts are scored in, none while the board is idle
+    game_session = models.ForeignKey(GameSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='dartboards')
+
+    def __str__(self):
+        return self.name
+
+
+class BoardEvent(models.Model):
+    """ Dart or takeout posted by a Dartboard (see ingest.py), kept after it was scored to drop the event if it's sent again """
+    board = models.ForeignKey(Dartboard, on_delete=models.CASCADE, related_name='events')
+    event_id = models.CharField(max_length=64)
+    # [number, multiplier], null for the takeout
+    dart = models.JSONField(null=True, blank=True)
+    applied = models.BooleanField(default=False)
+    time_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'event_id'], name='boardevent_board_event_id'),
+        ]
+        indexes = [
+            # the worker reads a board's waiting events in the order they came in
+            models.Index(fields=['board', 'applied', 'id'], name='boardevent_board_applied'),
+        ]
+
+    def __str__(self):
+        return f'board:{self.board_id} event:{self.event_id}'
+
+
+class LegRecord(models.Model):
+    """ Archive of a won leg, written by the background worker after the turn that won it (see legs.py) """
+    turn = models.OneToOneField(Turn, on_delete=models.CASCADE, related_name='leg_record')
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='leg_records')
+    winner = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='leg_records')
+    # darts of the winner, 0 when another player's dart won a cut-throat cricket leg
+    darts = models.PositiveSmallIntegerField(default=0)
+    # X01 only: points of the last visit and the winner's 3-dart average of the leg
+    checkout = models.PositiveSmallIntegerField(default=0)
+    average = models.FloatField(default=0)
+    time_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'game:{self.game_session_id} leg won by {self.winner} in {self.darts} darts'
+
+
+class AchievementKind(models.IntegerChoices):
+    """ Feats a won leg can earn """
+    PERFECT_LEG = 0, 'Perfect leg'
+    TON_PLUS_CHECKOUT = 1, 'Ton-plus checkout'
+    BIG_FISH = 2, 'Big fish'
+
+
+class Achievement(models.Model):
+    """ Feat of a Player in a won leg, awarded by the background worker """
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='achievements')
+    leg = models.ForeignKey(LegRecord, on_delete=models.CASCADE, related_name='achievements')
+    kind = models.IntegerField(choices=AchievementKind.choices)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['leg', 'kind'], name='unique_leg_achievement'),
+        ]
+
+    def __str__(self):
+        return f'{self.player} {self.get_kind_display()}'
+
+
+class TaskStatus(models.IntegerChoices):
+    PENDING = 0, 'Pending'
+    RUNNING = 1, 'Running'
+    FAILED = 2, 'Failed'
+
+
+class Task(models.Model):
+    """ Work queued for the background worker (see tasks.py), deleted once done """
+    name = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.IntegerField(choices=TaskStatus.choices, default=TaskStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    time_created = models.DateTimeField(auto_now_add=True)
+    time_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # workers look for due pending tasks
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after'),
+        ]
+
     def __str__(self):
-        return f'id:{self.id} owner:{self.owner} game_type:{self.game_type}'
\ No newline at end of file
+        return f'{self.name} #{self.id} {self.get_status_display()}'
@@ -0,0 +1,45 @@
+"""
+Leg win chances of X01 game sessions, simulated off the request path.
+
+A simulation takes from a few hundred milliseconds to seconds (see engine/montecarlo.py), so
+every change of the scores only queues a 'leg_odds' task for the new version of the game session,
+in the transaction of the change. The background worker simulates it and stores the chances with
+the version they are for. Scoreboards show them once they're there, pages rendered before fetch
+them from odds_view. A change while the task of the game session is still waiting moves that task
+on to the new version instead of queueing another one, and a task simulates the version the game
+session is at when it runs, so versions played on since aren't simulated.
+"""
+from .engine import from_scores
+from .engine.montecarlo import leg_win_probabilities
+from .models import GameSession, Task, TaskStatus
+from .stats import skill_buckets
+from .tasks import enqueue, task
+
+
+def queue_odds(game):
+    """Queues the win chances of the game session's current version"""
+    if game.is_cricket:
+        return
+    payload = {'game_id': game.pk, 'version': game.version}
+    waiting = Task.objects.filter(name='leg_odds', status=TaskStatus.PENDING, payload__game_id=game.pk)
+    if not waiting.update(payload=payload):
+        enqueue('leg_odds', **payload)
+
+
+def win_chances(game):
+    """Win chances in percent per seat at the game session's version, None until they were simulated"""
+    return game.odds if game.odds_version == game.version and game.odds else None
+
+
+@task('leg_odds', atomic=False)
+def leg_odds(game_id, version):
+    """Simulates the leg of the game session's current version, `version` or one played on since,
+    and stores the chances"""
+    game = GameSession.objects.filter(pk=game_id, version__gte=version).first()
+    if game is None or win_chances(game):
+        return
+    state = from_scores(game.scores, game.win_points)
+    chances = leg_win_probabilities(state.points, state.turn, skill_buckets(game.scores['seats']))
+    GameSession.objects.filter(pk=game_id, version=game.version).update(
+        odds=[round(chance * 100) for chance in chances], odds_version=game.version,
+    )
@@ -0,0 +1,18 @@
+from django.dispatch import Signal
+
+
+# sent by commit_turn inside the turn's transaction when a turn wins a leg,
+# with the GameSession as sender and game, seat of the winner and the winning Turn as arguments
+leg_won = Signal()
+
+# sent by undo_turn before turns of a game session are undone, with the GameSession as sender and the game as argument.
+# A receiver raises UndoRefused to keep them
+undoing = Signal()
+
+# sent by delete_game_sessions inside its transaction before game sessions are deleted,
+# with GameSession as sender and the ids of the game sessions as game_ids
+games_deleting = Signal()
+
+
+class UndoRefused(Exception):
+    """The turns of the game session can't be undone, the message says why"""
@@ -0,0 +1,94 @@
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
+
+from .checkouts import CHECKOUT_TABLES, MAX_CHECKOUT
+from .engine.board import skill_bucket
+from .models import Turn, TurnKind
+from user.models import PlayerStats
+
+
+# Turn fields the stats are computed from
+STATS_TURN_FIELDS = ('player_id', 'kind', 'score', 'darts', 'points_left', 'scored', 'leg_darts', 'first_nine')
+# kinds of turns left out of the X01 stats, no visit at the board or a cricket visit
+NOT_VISITS = (TurnKind.SWITCH, TurnKind.RESET, TurnKind.MARKS)
+# players with fewer visits are taken to throw DEFAULT_AVERAGE
+MIN_SKILL_VISITS = 10
+DEFAULT_AVERAGE = 40
+
+
+def counts_turn(turn):
+    return turn.player_id is not None and turn.kind not in NOT_VISITS
+
+
+def turn_counts(turn):
+    """PlayerStats counters a turn adds to. Shared by live updates and recompute_stats so both agree"""
+    counts = {'visits': 1, 'darts': turn.darts, 'points': turn.scored}
+    if turn.kind == TurnKind.BUST or (turn.score and not turn.scored):
+        counts['busts'] = 1
+    if turn.scored == 180:
+        counts['scores_180'] = 1
+    elif turn.scored >= 140:
+        counts['scores_140_plus'] = 1
+    elif turn.scored >= 100:
+        counts['scores_100_plus'] = 1
+    elif turn.scored >= 60:
+        counts['scores_60_plus'] = 1
+    if turn.points_left <= MAX_CHECKOUT and CHECKOUT_TABLES[3][turn.points_left]:
+        counts['checkout_attempts'] = 1
+    if turn.first_nine:
+        counts['first9_points'] = turn.scored
+        counts['first9_darts'] = turn.darts
+    if turn.leg_darts:
+        counts['legs_won'] = 1
+        counts['legs_won_darts'] = turn.leg_darts
+    return counts
+
+
+def stats_changes(turn, sign=1):
+    """Update expressions adding (sign=1) or removing (sign=-1) a turn from its player's stats"""
+    changes = {field: F(field) + sign * value for field, value in turn_counts(turn).items() if value}
+    if turn.leg_darts and sign > 0:
+        changes['highest_checkout'] = Greatest(F('highest_checkout'), turn.scored)
+    return changes
+
+
+def add_turn_stats(turn):
+    """Adds a committed turn to its player's stats with a single update, run in the turn's transaction"""
+    if not counts_turn(turn):
+        return
+    stats = PlayerStats.objects.filter(player_id=turn.player_id)
+    changes = stats_changes(turn)
+    if not stats.update(**changes):
+        # first turn of this player, another first turn at the same time may have created the row already
+        PlayerStats.objects.bulk_create([PlayerStats(player_id=turn.player_id)], ignore_conflicts=True)
+        stats.update(**changes)
+
+
+def remove_turn_stats(turns):
+    """Takes undone turns out of their players' stats, call after the turns are deleted"""
+    for turn in turns:
+        if not counts_turn(turn):
+            continue
+        changes = stats_changes(turn, sign=-1)
+        if turn.leg_darts:
+            # highest checkout can't be taken back by a delta, look it up among the remaining turns
+            highest = (
+                Turn.objects.filter(player_id=turn.player_id, leg_darts__gt=0).exclude(kind__in=NOT_VISITS)
+                .aggregate(highest=Max('scored'))['highest']
+            )
+            changes['highest_checkout'] = highest or 0
+        PlayerStats.objects.filter(player_id=turn.player_id).update(**changes)
+
+
+def skill_buckets(player_ids):
+    """Skill bucket (see engine/board.py) of each player, in order, fitted to their first nine average.
+    First nine darts are thrown at T20 like the skill model's, later ones are diluted by checkouts"""
+    stats = {stats.player_id: stats for stats in PlayerStats.objects.filter(player_id__in=player_ids)}
+    buckets = []
+    for player_id in player_ids:
+        player_stats = stats.get(player_id)
+        if player_stats and player_stats.visits >= MIN_SKILL_VISITS:
+            buckets.append(skill_bucket(player_stats.first9_average))
+        else:
+            buckets.append(skill_bucket(DEFAULT_AVERAGE))
+    return tuple(buckets)
@@ -0,0 +1,173 @@
+"""
+Database backed queue for work done after the request, no broker needed.
+
+`enqueue` adds a Task row in the caller's transaction, so the work a turn queues exists exactly
+when the turn was committed. A worker claims due tasks with a compare and swap of their status,
+runs the function registered for the name with `@task` in a transaction of its own and deletes
+the row when it returns. Long tasks that may run twice are registered with atomic=False and
+run outside a transaction, so they don't hold database locks while they compute. A task that
+raises is tried again RETRY_DELAY * 2**(attempts - 1) seconds later, after MAX_ATTEMPTS it
+stays FAILED with the error for someone to look at in the admin. Tasks left RUNNING by a worker that died are claimed again after RUNNING_TIMEOUT.
+
+Workers are the run_tasks command, running next to the web server in production, or, with
+TASK_WORKER on for development, a thread of the web process woken by every commit that queued work. `queue_depth` counts the tasks by status.
+"""
+from datetime import timedelta
+import logging
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# seconds before the first retry, doubled for every one after it
+RETRY_DELAY = 10
+RUNNING_TIMEOUT = timedelta(minutes=10)
+# tasks a worker claims at once
+CLAIM_SIZE = 20
+# seconds the worker thread sleeps without being woken, for retries coming due
+POLL_INTERVAL = 30
+
+# task functions by name
+TASKS = {}
+# names of tasks run outside a transaction
+NOT_ATOMIC = set()
+
+
+def task(name, atomic=True):
+    """Registers the decorated function as the task `name`, it's called with the payload as keyword arguments"""
+    def register(function):
+        TASKS[name] = function
+        if not atomic:
+            NOT_ATOMIC.add(name)
+        return function
+    return register
+
+
+def enqueue(name, **payload):
+    """Queues a task in the current transaction, `payload` has to be JSON"""
+    Task.objects.create(name=name, payload=payload)
+    if getattr(settings, 'TASK_WORKER', False):
+        transaction.on_commit(worker.wake)
+
+
+def claim(limit=CLAIM_SIZE):
+    """Due tasks this worker got to run, oldest first"""
+    now = timezone.now()
+    due = Task.objects.filter(
+        Q(status=TaskStatus.PENDING, run_after__lte=now)
+        | Q(status=TaskStatus.RUNNING, time_modified__lt=now - RUNNING_TIMEOUT)
+    ).order_by('id')[:limit]
+    claimed = []
+    for queued in due:
+        # another worker may have got there first
+        if Task.objects.filter(pk=queued.pk, status=queued.status, attempts=queued.attempts).update(
+            status=TaskStatus.RUNNING, attempts=queued.attempts + 1, time_modified=now,
+        ):
+            queued.status, queued.attempts = TaskStatus.RUNNING, queued.attempts + 1
+            claimed.append(queued)
+    return claimed
+
+
+def run_task(queued):
+    """Runs a claimed task, returns False if it raised"""
+    try:
+        if queued.name in NOT_ATOMIC:
+            TASKS[queued.name](**queued.payload)
+            queued.delete()
+        else:
+            with transaction.atomic():
+                # writes first, a transaction that reads before it writes can't wait for the lock on SQLite
+                Task.objects.filter(pk=queued.pk).update(time_modified=timezone.now())
+                TASKS[queued.name](**queued.payload)
+                queued.delete()
+    except Exception:
+        logger.exception('Task %s #%s failed', queued.name, queued.id)
+        now = timezone.now()
+        if queued.attempts >= MAX_ATTEMPTS:
+            status, run_after = TaskStatus.FAILED, now
+        else:
+            status, run_after = TaskStatus.PENDING, now + timedelta(seconds=RETRY_DELAY * 2 ** (queued.attempts - 1))
+        Task.objects.filter(pk=queued.pk).update(
+            status=status, run_after=run_after, last_error=traceback.format_exc(), time_modified=now,
+        )
+        return False
+    return True
+
+
+def run_pending(limit=CLAIM_SIZE):
+    """Claims and runs the due tasks, returns how many were run"""
+    claimed = claim(limit)
+    for queued in claimed:
+        run_task(queued)
+    return len(claimed)
+
+
+def run_all():
+    """Runs tasks in this thread until none is due, returns how many were run"""
+    done = 0
+    while True:
+        ran = run_pending()
+        if not ran:
+            return done
+        done += ran
+
+
+def queue_depth():
+    """Number of tasks by status name, due or not"""
+    counts = dict(Task.objects.values_list('status').annotate(count=Count('id')).order_by())
+    return {status.label.lower(): counts.get(status, 0) for status in TaskStatus}
+
+
+def exposition():
+    """Queue depth in the Prometheus text format, for the metrics view"""
+    lines = ['# HELP darts_tasks Background tasks in the queue by status', '# TYPE darts_tasks gauge']
+    lines.extend(f'darts_tasks{{status="{status}"}} {count}' for status, count in queue_depth().items())
+    return lines
+
+
+class Worker:
+    """Thread of the web process running tasks, started by the first commit that queues one"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+
+    def wake(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run, name='darts-tasks', daemon=True)
+                self._thread.start()
+            self._idle.clear()
+            self._wake.set()
+
+    def wait(self, timeout=None):
+        """Waits until the thread ran the tasks it was woken for, returns False after `timeout` seconds"""
+        return self._idle.wait(timeout)
+
+    def run(self):
+        while True:
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+            try:
+                run_all()
+            except Exception:
+                logger.exception('Background tasks could not be run')
+            finally:
+                close_old_connections()
+            with self._lock:
+                if not self._wake.is_set():
+                    self._idle.set()
+
+
+worker = Worker()
@@ -1,3 +1,1173 @@
-from django.test import TestCase
+import ast
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import uuid as uuid_lib
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.query import QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import benchmark, engine, ingest, live, tasks
+from .checkouts import CHECKOUT_TABLES, checkouts, checks_out, generate_routes, route_name
+from .engine import advisor, board, cricket, montecarlo
+from .cache import roster
+from .db import ScoresChanged, save_game
+from .history import SNAPSHOT_INTERVAL, rebuild_scores, undo_turns
+from .metrics import registry
+from .models import Achievement, AchievementKind, BoardEvent, Dartboard, GameSession, LegRecord, Task, TaskStatus, Turn
+from .stats import DEFAULT_AVERAGE
+from .utils import checkout_check, checkout_tables, new_scores
+from .views import HOME_PAGE_SIZE
+from user.models import Player, PlayerStats
+
+
+class DartsTestCase(TestCase):
+    """Logged in user with two players"""
+
+    def setUp(self):
+        # cached rosters and pages are keyed by ids the next test reuses
+        cache.clear()
+        self.user = get_user_model().objects.create_user('darts', 'darts@example.com', 'password')
+        self.client.force_login(self.user)
+        self.player1 = Player.objects.create(name='Anna', owner=self.user)
+        self.player2 = Player.objects.create(name='Bert', owner=self.user)
+
+    def create_games(self, count, game_type=1):
+        games = []
+        for _ in range(count):
+            game = GameSession.objects.create(owner=self.user, game_type=game_type, scores=new_scores(501, [self.player1.id, self.player2.id]))
+            game.players.set([self.player1, self.player2])
+            games.append(game)
+        return games
+
+
+def state(turn_count, points, turn=0):
+    return {'turn_count': turn_count, 'scores': {'points': points, 'games': [0, 0], 'turn': turn}}
+
+
+class LiveHubTests(SimpleTestCase):
+
+    def test_viewers_get_the_full_state_then_changes(self):
+        async def run():
+            hub = live.LiveHub()
+            first, second = hub.subscribe('game'), hub.subscribe('game')
+            hub.publish('game', state(1, [441, 501], 1))
+            hub.publish('game', state(2, [441, 401], 0))
+            # updates are handed to the viewers' loop
+            await asyncio.sleep(0)
+            received = [[json.loads(queue.get_nowait()) for _ in range(queue.qsize())] for queue in (first, second)]
+            hub.unsubscribe('game', first)
+            self.assertEqual((hub.viewers('game'), hub.latest('game')), (1, state(2, [441, 401], 0)))
+            hub.unsubscribe('game', second)
+            self.assertEqual((hub.viewers('game'), hub.latest('game')), (0, None))
+            return received
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, second)
+        self.assertEqual(first, [
+            {'full': True, **state(1, [441, 501], 1)},
+            {'full': False, 'turn_count': 2, 'changes': {'points': [441, 401], 'turn': 0}},
+        ])
+
+    def test_nothing_is_kept_without_viewers(self):
+        hub = live.LiveHub()
+        hub.publish('game', state(1, [441, 501]))
+        self.assertIsNone(hub.latest('game'))
+
+    def test_slow_viewer_catches_up_with_the_full_state(self):
+        async def run():
+            hub = live.LiveHub()
+            queue = hub.subscribe('game')
+            updates = [state(turn_count, [501 - turn_count, 501]) for turn_count in range(live.VIEWER_QUEUE_SIZE + 2)]
+            # games change once, in an update the slow viewer can't take in time
+            updates[1]['scores']['games'] = [1, 0]
+            for update in updates:
+                hub.publish('game', update)
+            await asyncio.sleep(0)
+            # merged like watch.js does
+            messages = [json.loads(queue.get_nowait()) for _ in range(queue.qsize())]
+            scores = None
+            for message in messages:
+                if message['full']:
+                    scores = dict(message['scores'])
+                elif scores is not None:
+                    scores.update(message['changes'])
+            return messages, scores, updates[-1]['scores']
+
+        messages, scores, latest = asyncio.run(run())
+        self.assertLessEqual(len(messages), live.VIEWER_QUEUE_SIZE)
+        self.assertTrue(messages[0]['full'])
+        self.assertEqual(scores, latest)
+
+    def test_publish_from_another_thread(self):
+        async def run():
+            hub = live.LiveHub()
+            queue = hub.subscribe('game')
+            thread = threading.Thread(target=hub.publish, args=('game', state(1, [441, 501])))
+            thread.start()
+            thread.join()
+            return json.loads(await asyncio.wait_for(queue.get(), 1))
+
+        self.assertEqual(asyncio.run(run())['turn_count'], 1)
+
+
+class LiveStreamTests(SimpleTestCase):
+
+    def setUp(self):
+        self.key = str(uuid_lib.uuid4())
+
+    def stream(self, updates=(), path=None, method='GET', events=None):
+        """Messages sse_application sends for a request, `updates` are published after the first event
+        and the viewer disconnects once they arrived, or after `events` events"""
+        async def run():
+            sent = []
+            disconnected = asyncio.Event()
+
+            async def receive():
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                bodies = sum(item['type'] == 'http.response.body' for item in sent)
+                if bodies == 1:
+                    for update in updates:
+                        live.hub.publish(self.key, update)
+                if bodies >= (events or len(updates) + 1):
+                    disconnected.set()
+
+            scope = {'type': 'http', 'method': method, 'path': path or f'/live/{self.key}/'}
+            await asyncio.wait_for(live.sse_application(scope, receive, send), 5)
+            return sent
+
+        return asyncio.run(run())
+
+    def test_state_and_changes_are_streamed_as_events(self):
+        with mock.patch('darts.live.load_state', mock.AsyncMock(return_value=state(0, [501, 501]))):
+            start, first, update = self.stream([state(1, [441, 501], 1)])
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertEqual(first['body'], f'data: {json.dumps({"full": True, **state(0, [501, 501])})}\n\n'.encode())
+        self.assertEqual(update['body'], b'data: {"full": false, "turn_count": 1, "changes": {"points": [441, 501], "turn": 1}}\n\n')
+        self.assertTrue(update['more_body'])
+        # the viewer is gone with its state
+        self.assertEqual((live.hub.viewers(self.key), live.hub.latest(self.key)), (0, None))
+
+    def test_idle_stream_is_kept_alive(self):
+        with mock.patch('darts.live.load_state', mock.AsyncMock(return_value=state(0, [501, 501]))), \
+                mock.patch('darts.live.KEEPALIVE_INTERVAL', 0.01):
+            messages = self.stream(events=2)
+        self.assertEqual(messages[-1]['body'], b': keep-alive\n\n')
+
+    def test_unknown_games_and_methods(self):
+        with mock.patch('darts.live.load_state', mock.AsyncMock(return_value=None)):
+            self.assertEqual(self.stream()[0]['status'], 404)
+        self.assertEqual(live.hub.viewers(self.key), 0)
+        self.assertEqual(self.stream(path='/live/nope/')[0]['status'], 404)
+        self.assertEqual(self.stream(method='POST')[0]['status'], 405)
+
+
+class HomeViewTests(DartsTestCase):
+
+    def home_queries(self, games_count):
+        self.create_games(games_count)
+        # warm up session and user lookups so only the view's own queries differ
+        self.client.get(reverse('home'))
+        cache.clear()
+        with self.assertNumQueries(5):
+            # session, user, games page, players of the games, social account in the navbar
+            return self.client.get(reverse('home'))
+
+    def test_query_count_with_few_games(self):
+        response = self.home_queries(2)
+        self.assertEqual(len(response.context['games']), 2)
+
+    def test_query_count_independent_of_game_count(self):
+        response = self.home_queries(HOME_PAGE_SIZE * 3)
+        self.assertEqual(len(response.context['games']), HOME_PAGE_SIZE)
+        self.assertContains(response, 'Anna vs Bert')
+
+    def test_keyset_pagination_walks_all_games(self):
+        games = self.create_games(HOME_PAGE_SIZE + 5)
+        seen = []
+        url = reverse('home')
+        while url:
+            response = self.client.get(url)
+            seen += [game.id for game in response.context['games']]
+            next_page = response.context['next_page']
+            url = f"{reverse('home')}?{next_page}" if next_page else None
+        self.assertEqual(sorted(seen), sorted(game.id for game in games))
+        self.assertEqual(len(seen), len(set(seen)))
+
+
+class CacheTests(DartsTestCase):
+
+    def test_home_list_is_cached_until_a_game_changes(self):
+        game = self.create_games(1)[0]
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(3):
+            # session, user, social account in the navbar
+            self.client.get(reverse('home'))
+        self.client.post(reverse('turn', kwargs={'uuid': game.uuid}), json.dumps({'score': 60}), content_type='application/json')
+        game.refresh_from_db()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['games'][0].time_modified, game.time_modified)
+        self.player1.name = 'Anja'
+        self.player1.save()
+        self.assertContains(self.client.get(reverse('home')), 'Anja vs Bert')
+
+    def test_roster_is_cached_until_a_player_changes(self):
+        self.assertContains(self.client.get(reverse('game_create')), 'Bert')
+        with self.assertNumQueries(0):
+            roster(self.user.pk)
+        Player.objects.create(name='Cleo', owner=self.user)
+        self.assertContains(self.client.get(reverse('game_create')), 'Cleo')
+        self.player2.delete()
+        self.assertNotContains(self.client.get(reverse('game_create')), 'Bert')
+
+    def test_scoreboard_is_rendered_once_per_version(self):
+        game = self.create_games(1)[0]
+        url = reverse('play', kwargs={'uuid': game.uuid})
+        self.assertTemplateUsed(self.client.get(url), 'scoreboard_table.html')
+        response = self.client.get(url)
+        self.assertTemplateNotUsed(response, 'scoreboard_table.html')
+        self.assertContains(response, '<h1>Bert</h1>', html=True)
+        self.client.post(reverse('turn', kwargs={'uuid': game.uuid}), json.dumps({'score': 60}), content_type='application/json')
+        self.assertContains(self.client.get(url), '441')
+
+    def test_scoreboard_follows_the_players_and_their_skill(self):
+        game = self.create_games(1)[0]
+        url = reverse('play', kwargs={'uuid': game.uuid})
+        self.client.get(url)
+        self.player1.name = 'Anja'
+        self.player1.save()
+        self.assertContains(self.client.get(url), '<h1>Anja</h1>', html=True)
+        self.assertTemplateNotUsed(self.client.get(url), 'scoreboard_table.html')
+        # a first nine average of 90 moves the player to another skill bucket
+        PlayerStats.objects.create(player=self.player1, visits=10, first9_points=900, first9_darts=30)
+        self.assertTemplateUsed(self.client.get(url), 'scoreboard_table.html')
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTests(DartsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_requests_are_recorded_per_view(self):
+        game = self.create_games(1)[0]
+        self.client.get(reverse('home'))
+        self.client.get(reverse('play', kwargs={'uuid': game.uuid}))
+        self.client.get(reverse('play', kwargs={'uuid': game.uuid}))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        self.assertIn('# TYPE darts_request_seconds histogram', text)
+        self.assertIn('darts_request_seconds_count{view="play"} 2', text)
+        self.assertIn('darts_db_queries_bucket{view="home",le="+Inf"} 1', text)
+        samples = dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+        self.assertGreater(float(samples['darts_db_queries_sum{view="play"}']), 0)
+        self.assertGreater(float(samples['darts_template_seconds_sum{view="play"}']), 0)
+        self.assertGreater(float(samples['darts_response_bytes_sum{view="home"}']), 1000)
+
+
+class GameTestCase(DartsTestCase):
+    """301 game session of the two players, created through the view"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.post(reverse('game_create'), {'game_type': 0, 'players': [self.player1.id, self.player2.id]})
+        self.game = GameSession.objects.get()
+
+    def turn(self, **data):
+        return self.client.post(reverse('turn', kwargs={'uuid': self.game.uuid}), json.dumps(data), content_type='application/json')
+
+
+class WatchTests(GameTestCase):
+
+    def watch(self, **headers):
+        return self.client.get(reverse('watch', kwargs={'uuid': self.game.uuid}), **headers)
+
+    def test_unchanged_game_answers_not_modified(self):
+        self.client.logout()
+        response = self.watch()
+        self.assertEqual((response.status_code, response['ETag']), (200, '"v0"'))
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'no-cache', 'public'})
+        self.assertIn('Cookie', response['Vary'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.watch(HTTP_IF_NONE_MATCH='"v0"').status_code, 304)
+        # no time based validator, two changes in the same second differ
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.watch(HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200)
+
+    def test_tag_follows_the_version_only(self):
+        self.assertEqual(self.watch()['ETag'], '"v0"')
+        self.turn(score=60)
+        self.assertEqual(self.watch(HTTP_IF_NONE_MATCH='"v0"')['ETag'], '"v1"')
+        self.client.logout()
+        self.assertEqual(self.watch(HTTP_IF_NONE_MATCH='"v1"').status_code, 304)
+        self.assertEqual(self.client.get(reverse('watch', kwargs={'uuid': uuid_lib.uuid4()})).status_code, 404)
+
+    def test_watching_never_writes(self):
+        self.turn(score=60)
+        for logged_in in (True, False):
+            if not logged_in:
+                self.client.logout()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.watch().status_code, 200)
+            self.assertEqual([query['sql'] for query in queries if not query['sql'].startswith('SELECT')], [])
+        self.assertEqual(self.client.post(reverse('watch', kwargs={'uuid': self.game.uuid})).status_code, 405)
+
+
+class PlayerStatsTests(GameTestCase):
+
+    def test_turns_update_stats(self):
+        # Anna: 180, 130 (bust), 121 checkout with 2 darts, Bert: 100, 140
+        for score in (180, 100, 130, 140, 121):
+            self.turn(score=score, checkout_darts_used=2)
+        stats = PlayerStats.objects.get(player=self.player1)
+        self.assertEqual(stats.visits, 3)
+        self.assertEqual(stats.points, 301)
+        self.assertEqual(stats.darts, 8)
+        self.assertEqual(stats.scores_180, 1)
+        self.assertEqual(stats.scores_100_plus, 1)
+        self.assertEqual(stats.busts, 1)
+        self.assertEqual(stats.legs_won, 1)
+        self.assertEqual(stats.darts_per_leg, 8)
+        self.assertEqual(stats.highest_checkout, 121)
+        self.assertEqual(PlayerStats.objects.get(player=self.player2).scores_140_plus, 1)
+
+    def test_first_turns_of_a_player_at_once(self):
+        update = QuerySet.update
+
+        def racing_update(queryset, **changes):
+            # another first turn of Anna creates her stats after this one found none
+            if queryset.model is PlayerStats and not PlayerStats.objects.filter(player=self.player1).exists():
+                PlayerStats.objects.create(player=self.player1, visits=1, points=60)
+                return 0
+            return update(queryset, **changes)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            self.assertEqual(self.turn(score=100).status_code, 200)
+        stats = PlayerStats.objects.get(player=self.player1)
+        self.assertEqual((stats.visits, stats.points), (2, 160))
+
+    def test_undo_takes_turn_out_of_stats(self):
+        for score in (100, 60, 180, 60, 21):
+            self.turn(score=score, checkout_darts_used=1)
+        self.client.post(reverse('play', kwargs={'uuid': self.game.uuid}), {'undo': 'undo'})
+        stats = PlayerStats.objects.get(player=self.player1)
+        self.assertEqual((stats.visits, stats.points, stats.legs_won, stats.highest_checkout), (2, 280, 0, 0))
+
+    def test_recompute_matches_live_stats(self):
+        for score in (180, 100, 130, 140, 60, 45, 61, 0, 0, 26):
+            self.turn(score=score, checkout_darts_used=2)
+        live = list(PlayerStats.objects.order_by('player_id').values())
+        PlayerStats.objects.all().delete()
+        call_command('recompute_stats', stdout=io.StringIO())
+        self.assertEqual(list(PlayerStats.objects.order_by('player_id').values('player_id')), [{'player_id': row['player_id']} for row in live])
+        for row, recomputed in zip(live, PlayerStats.objects.order_by('player_id').values()):
+            row.pop('id')
+            recomputed.pop('id')
+            self.assertEqual(row, recomputed)
+        self.assertEqual(PlayerStats.objects.get(player=self.player1).first9_average, 60.0)
+
+
+class X01EngineTests(SimpleTestCase):
+
+    def test_bust_keeps_points_and_passes_turn(self):
+        state = engine.new_state(301)._replace(points=(50, 301))
+        for score in (51, 49):
+            # below zero or one left is a bust
+            after, leg_darts = engine.apply_turn(state, engine.Turn(engine.SCORE, score))
+            self.assertEqual((after.points, after.turn, after.darts, leg_darts), ((50, 301), 1, (3, 0), 0))
+        after, _ = engine.apply_turn(state, engine.Turn(engine.BUST))
+        self.assertEqual(after.points, (50, 301))
+
+    def test_checkout_wins_leg(self):
+        state = engine.replay(engine.new_state(301), [(engine.SCORE, 180, 3), (engine.SCORE, 60, 3)])
+        state, leg_darts = engine.apply_turn(state, engine.Turn(engine.SCORE, 121, 2))
+        self.assertEqual(leg_darts, 5)
+        self.assertEqual((state.points, state.games, state.darts, state.darts_total), ((301, 301), (1, 0), (0, 0), (5, 3)))
+        self.assertEqual((state.average, state.average_total), ((180.6, 60.0), (180.6, 60.0)))
+
+    def test_state_is_immutable(self):
+        state = engine.new_state(501)
+        engine.apply_turn(state, engine.Turn(engine.SCORE, 100))
+        self.assertEqual(state, engine.new_state(501))
+        with self.assertRaises(AttributeError):
+            state.turn = 1
+
+    def test_scores_dict_round_trip(self):
+        state = engine.replay(engine.new_state(501, 3), [(engine.SCORE, 100, 3), (engine.SWITCH, 0, 0), (engine.SCORE, 26, 3)])
+        scores_dict = engine.to_scores(state, [7, 8, 9])
+        self.assertEqual((scores_dict['seats'], scores_dict['turn'], scores_dict['points']), ([7, 8, 9], 0, [401, 501, 475]))
+        self.assertEqual(engine.from_scores(scores_dict, 501), state)
+
+
+class TurnLogTests(GameTestCase):
+
+    def test_replay_matches_committed_scores(self):
+        for score in (180, 100, 130, 140, 121, 60, 45, 61):
+            self.turn(score=score, checkout_darts_used=2)
+        self.game.refresh_from_db()
+        self.assertEqual(rebuild_scores(self.game, self.game.turn_count), self.game.scores)
+
+    def play(self, turns):
+        """Scores of the game before the first and after every turn"""
+        scores = [GameSession.objects.get().scores]
+        for number in range(turns):
+            self.turn(score=(45, 26)[number % 2])
+            scores.append(GameSession.objects.get().scores)
+        return scores
+
+    def test_turns_are_logged_with_snapshots(self):
+        scores = self.play(SNAPSHOT_INTERVAL + 2)
+        self.game.refresh_from_db()
+        self.assertEqual(list(self.game.turns.values_list('sequence', flat=True)), list(range(1, SNAPSHOT_INTERVAL + 3)))
+        self.assertEqual(list(self.game.snapshots.values_list('sequence', flat=True)), [0, SNAPSHOT_INTERVAL])
+        self.assertEqual(self.game.snapshots.last().scores, scores[SNAPSHOT_INTERVAL])
+        for sequence in (3, SNAPSHOT_INTERVAL, SNAPSHOT_INTERVAL + 1):
+            self.assertEqual(rebuild_scores(self.game, sequence), scores[sequence])
+
+    def test_undo_replays_from_the_nearest_snapshot(self):
+        scores = self.play(SNAPSHOT_INTERVAL + 2)
+        self.game.refresh_from_db()
+        self.assertTrue(undo_turns(self.game, 3))
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.scores, self.game.turn_count), (scores[SNAPSHOT_INTERVAL - 1], SNAPSHOT_INTERVAL - 1))
+        self.assertEqual(self.game.turns.count(), SNAPSHOT_INTERVAL - 1)
+        self.assertEqual(list(self.game.snapshots.values_list('sequence', flat=True)), [0])
+        # never past the start of the game
+        self.assertTrue(undo_turns(self.game, 100))
+        self.assertEqual((self.game.scores, self.game.turn_count), (scores[0], 0))
+        self.assertFalse(undo_turns(self.game))
+
+    def test_undo_of_a_changed_game_writes_nothing(self):
+        self.play(2)
+        stale = GameSession.objects.get()
+        self.turn(score=60)
+        with self.assertRaises(ScoresChanged):
+            undo_turns(stale)
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.turn_count, self.game.turns.count(), self.game.version), (3, 3, 3))
+
+
+class TurnEndpointTests(GameTestCase):
+
+    def test_valid_turns_are_committed(self):
+        self.assertEqual(self.turn(darts=[20, 20, 20], version=0).json()['scores']['points'], [241, 301])
+        self.assertEqual(self.turn(score=100, checkout_darts_used=None).json()['scores']['points'], [241, 201])
+        self.assertEqual(self.turn(bust=True).json()['scores']['points'], [241, 201])
+
+    def test_invalid_turns_are_refused(self):
+        for data in (
+            {}, {'hits': 5}, {'checkout_darts_used': [1]}, {'score': 60, 'checkout_darts_used': [1]},
+            {'score': 1.5}, {'score': '60'}, {'score': True}, {'score': None}, {'darts': 60}, {'darts': [20, '20']},
+            {'darts': [21]}, {'bust': 1}, {'score': 60, 'version': '0'}, {'score': 60, 'checkout_darts_used': 4},
+        ):
+            response = self.turn(**data)
+            self.assertEqual(response.status_code, 400, data)
+            self.assertTrue(response.json()['error'].startswith('Invalid turn'), data)
+        self.assertEqual(self.turn(score=181).json()['error'], 'Score must be between 0 and 180')
+        self.assertEqual(self.client.post(reverse('turn', kwargs={'uuid': self.game.uuid}), '[60]', content_type='application/json').status_code, 400)
+        self.assertEqual(self.game.turns.count(), 0)
+
+
+class VersionedCommitTests(GameTestCase):
+
+    def test_turn_on_an_old_version_conflicts(self):
+        self.assertEqual(self.turn(score=60, version=0).json()['version'], 1)
+        # the other tablet still shows version 0
+        response = self.turn(score=100, version=0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.json()['version'], response.json()['scores']['points']), (1, [241, 301]))
+        self.assertEqual(self.game.turns.count(), 1)
+
+    def test_turn_without_version_goes_on_top(self):
+        stale = GameSession.objects.get()
+        self.turn(score=60)
+        stale.turn_count += 1
+        with self.assertRaises(ScoresChanged):
+            save_game(stale)
+        self.turn(score=100)
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.scores['points'], self.game.version, self.game.turn_count), ([241, 201], 2, 2))
+
+    def test_stale_form_post_is_refused(self):
+        self.turn(score=60)
+        response = self.client.post(reverse('play', kwargs={'uuid': self.game.uuid}), {'undo': 'undo', 'version': 0})
+        self.assertContains(response, 'Scores were changed on another device')
+        self.assertEqual(self.game.turns.count(), 1)
+        self.client.post(reverse('play', kwargs={'uuid': self.game.uuid}), {'undo': 'undo', 'version': 1})
+        self.assertEqual(self.game.turns.count(), 0)
+
+
+class PartialSaveTests(GameTestCase):
+
+    def writes(self, queries):
+        return [query['sql'] for query in queries if query['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+
+    def test_turn_writes_changed_columns_once(self):
+        # both players have stats rows after their first turns
+        self.turn(score=60)
+        self.turn(score=60)
+        # session, user, game, savepoint, game, turn, player stats, task of the win chances, release savepoint,
+        # players come from the cached roster
+        with self.assertNumQueries(9), CaptureQueriesContext(connection) as queries:
+            self.turn(score=60)
+        game_writes = [sql for sql in self.writes(queries) if 'darts_gamesession' in sql]
+        self.assertEqual(len(game_writes), 1)
+        for column in ('"uuid"', '"game_type"', '"owner_id"', '"time_created"'):
+            self.assertNotIn(column, game_writes[0])
+        self.game.refresh_from_db()
+        with CaptureQueriesContext(connection) as queries:
+            self.game.save()
+        self.assertLess(len(game_writes[0]), len(self.writes(queries)[0]))
+
+    def test_no_op_actions_write_nothing(self):
+        url = reverse('play', kwargs={'uuid': self.game.uuid})
+        with CaptureQueriesContext(connection) as queries:
+            # nothing to undo yet
+            self.client.post(url, {'undo': 'undo'})
+            self.client.get(url)
+        self.assertEqual(self.writes(queries), [])
+        game = GameSession.objects.get()
+        with self.assertNumQueries(0):
+            save_game(game)
+        self.assertEqual(game.version, 0)
+
+
+class MultiPlayerTests(DartsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.player3 = Player.objects.create(name='Cleo', owner=self.user)
+        self.players = [self.player1, self.player2, self.player3]
+
+    def test_create_needs_two_to_eight_players(self):
+        response = self.client.post(reverse('game_create'), {'game_type': 1, 'players': [self.player1.id]})
+        self.assertFormError(response.context['form'], 'players', 'Select 2 to 8 players to play!')
+        self.assertFalse(GameSession.objects.exists())
+
+    def test_turns_rotate_through_seats(self):
+        self.client.post(reverse('game_create'), {'game_type': 1, 'players': [player.id for player in self.players]})
+        game = GameSession.objects.get()
+        self.assertEqual(game.scores['seats'], [player.id for player in self.players])
+        url = reverse('turn', kwargs={'uuid': game.uuid})
+        for score in (100, 60, 45, 140):
+            self.client.post(url, json.dumps({'score': score}), content_type='application/json')
+        game.refresh_from_db()
+        self.assertEqual((game.scores['points'], game.scores['turn']), ([261, 441, 456], 1))
+        self.assertEqual(game.turns.get(sequence=4).player, self.player1)
+        response = self.client.get(reverse('play', kwargs={'uuid': game.uuid}))
+        self.assertEqual([seat['player'] for seat in response.context['seats']], self.players)
+        self.assertContains(response, 'data-seat="2"')
+        # checkout advice for the skill of the player to throw
+        bucket = response.context['buckets'][1]
+        self.assertEqual(response.context['checkouts'][2], advisor.route_table(bucket, 2))
+
+
+class CricketEngineTests(SimpleTestCase):
+
+    def visit(self, state, *hits):
+        return cricket.apply_turn(state, cricket.CricketTurn(cricket.MARKS, hits))
+
+    def test_marks_close_and_score(self):
+        state, _ = self.visit(cricket.new_state(), (20, 3), (20, 2), (5, 3))
+        self.assertEqual((cricket.target_marks(state.marks[0], 20), state.points, state.marks_total), (3, (40, 0), (5, 0)))
+        # second player closes 20, extra marks of the first player no longer score
+        state, _ = self.visit(state, (20, 3))
+        state, _ = self.visit(state, (20, 1))
+        self.assertEqual((state.points, state.marks_total), ((40, 0), (5, 3)))
+
+    def test_cut_throat_points_go_to_open_opponents(self):
+        state = cricket.new_state(3, cut_throat=True)
+        state, _ = self.visit(state, (19, 3), (19, 2))
+        self.assertEqual(state.points, (0, 38, 38))
+
+    def test_closing_everything_with_most_points_wins(self):
+        state = cricket.new_state()
+        for number in (15, 16, 17, 18, 19, 20):
+            state, _ = self.visit(state, (number, 3))
+            state, _ = self.visit(state)
+        state, leg_darts = self.visit(state, (25, 2), (25, 1))
+        self.assertEqual((leg_darts, state.games, state.marks, state.turn), (20, (1, 0), (0, 0), 1))
+
+    def test_scores_dict_round_trip(self):
+        state, _ = self.visit(cricket.new_state(3, cut_throat=True), (20, 3), (25, 2), (17, 1))
+        self.assertEqual(cricket.from_scores(cricket.to_scores(state, [1, 2, 3])), state)
+
+
+class CricketGameTests(DartsTestCase):
+
+    def test_cricket_visit_and_undo(self):
+        self.client.post(reverse('game_create'), {'game_type': 3, 'players': [self.player1.id, self.player2.id]})
+        game = GameSession.objects.get()
+        url = reverse('turn', kwargs={'uuid': game.uuid})
+        for hits in ([[20, 3], [20, 3], [25, 3]], [[20, 3]] * 4, [[20.0, 3]], [[20, 3, 1]], 20):
+            response = self.client.post(url, json.dumps({'hits': hits}), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, json.dumps({'hits': [], 'score': 60}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, json.dumps({'hits': [[20, 3], [20, 3], [1, 1]]}), content_type='application/json')
+        scores = response.json()['scores']
+        self.assertEqual((scores['points'], scores['marks_total'], scores['turn']), ([60, 0], [6, 0], 1))
+        self.client.post(reverse('play', kwargs={'uuid': game.uuid}), {'submit_hits': '1', 'dart1': 'T19', 'dart2': 'DB', 'dart3': ''})
+        game.refresh_from_db()
+        self.assertEqual(game.scores['marks_total'], [6, 5])
+        self.assertFalse(PlayerStats.objects.filter(visits__gt=0).exists())
+        response = self.client.post(reverse('play', kwargs={'uuid': game.uuid}), {'undo': 'undo'})
+        self.assertEqual(response.context['seats'][1]['mpr'], 0)
+        self.assertContains(response, 'Ⓧ')
+
+
+class MonteCarloTests(SimpleTestCase):
+
+    def test_board_landing(self):
+        self.assertEqual(board.landing(*board.aim_point('T20')), (60, False))
+        self.assertEqual(board.landing(*board.aim_point('D16')), (32, True))
+        self.assertEqual(board.landing(*board.aim_point('DB')), (50, True))
+        self.assertEqual(board.landing(0, -200), (0, False))
+
+    def test_skill_buckets_spread(self):
+        self.assertEqual(board.skill_bucket(57), 60)
+        self.assertGreater(board.bucket_sigma(40), board.bucket_sigma(80))
+        self.assertAlmostEqual(board.treble_twenty_average(board.bucket_sigma(60)), 60, delta=1)
+
+    def test_better_player_wins_more(self):
+        sigmas = (board.bucket_sigma(90), board.bucket_sigma(40))
+        strong, weak = montecarlo.win_probabilities((501, 501), 0, sigmas, legs=500)
+        self.assertAlmostEqual(strong + weak, 1)
+        self.assertGreater(strong, 0.8)
+
+    def test_leg_odds_are_memoized(self):
+        odds = montecarlo.leg_win_probabilities((40, 501, 501), 1, (60, 60, 60))
+        self.assertIs(montecarlo.leg_win_probabilities((40, 501, 501), 1, (60, 60, 60)), odds)
+        # two players are far from a finish, the first on a double
+        self.assertGreater(odds[0], 0.9)
+
+
+class CheckoutTableTests(SimpleTestCase):
+
+    def test_known_checkouts(self):
+        self.assertEqual([CHECKOUT_TABLES[3][points] for points in (170, 100, 60, 40)], ['T20 T20 DB', 'T20 D20', '20 D20', 'D20'])
+        # hand picked routes win over generated ones
+        self.assertEqual(CHECKOUT_TABLES[3][135], checkouts['135'])
+        self.assertEqual([CHECKOUT_TABLES[2][points] for points in (110, 101, 60)], ['T20 DB', 'T17 DB', '20 D20'])
+        self.assertEqual([CHECKOUT_TABLES[1][points] for points in (50, 40, 2)], ['DB', 'D20', 'D1'])
+
+    def test_points_without_a_checkout(self):
+        self.assertEqual([points for points in range(2, 171) if not CHECKOUT_TABLES[3][points]], [159, 162, 163, 165, 166, 168, 169])
+        self.assertEqual([points for points in range(99, 171) if CHECKOUT_TABLES[2][points]], [100, 101, 104, 107, 110])
+        self.assertEqual([points for points in range(171) if CHECKOUT_TABLES[1][points]], list(range(2, 41, 2)) + [50])
+        for darts_left in range(4):
+            self.assertIsNone(CHECKOUT_TABLES[darts_left][0])
+            self.assertIsNone(CHECKOUT_TABLES[darts_left][1])
+
+    def test_routes_add_up_and_finish_on_a_double(self):
+        for darts_left in (1, 2, 3):
+            for points in range(2, 171):
+                for route in generate_routes(points, darts_left)[:3]:
+                    self.assertLessEqual(len(route), darts_left)
+                    self.assertEqual(sum(value for _, value in route), points)
+                    self.assertIn(route[-1][0][0], 'D')
+
+    def test_every_table_entry_checks_out(self):
+        for darts_left in (1, 2, 3):
+            for points, routes in enumerate(CHECKOUT_TABLES[darts_left]):
+                for route in routes.split('|') if routes else ():
+                    self.assertTrue(checks_out(route, points, darts_left), (darts_left, points, route))
+        # hand picked routes that don't add up are left for generated ones
+        self.assertFalse(checks_out(checkouts['161'], 161))
+        self.assertEqual(CHECKOUT_TABLES[3][161], 'T20 T17 DB')
+        self.assertEqual(CHECKOUT_TABLES[3][75], 'T13 D18')
+
+    def test_route_preference(self):
+        # fewest darts first
+        self.assertEqual(route_name(generate_routes(40, 3)[0]), 'D20')
+        # then the best double, then big singles over hard setup darts
+        self.assertEqual([route_name(route) for route in generate_routes(56, 2)[:3]], ['16 D20', 'D8 D20', 'T8 D16'])
+        self.assertEqual([route_name(route) for route in generate_routes(9, 2)[:3]], ['1 D4', '3 D3', 'T1 D3'])
+
+
+class CheckoutAdvisorTests(SimpleTestCase):
+
+    def route_points(self, route):
+        return sum(advisor.aim_value(board.aim_name(segment))[0] for segment in route.split())
+
+    def test_routes_check_out_where_the_tables_do(self):
+        for darts_left in (1, 2, 3):
+            for points, route in enumerate(advisor.route_table(60, darts_left)):
+                self.assertEqual(route is None, CHECKOUT_TABLES[darts_left][points] is None)
+                if route:
+                    self.assertEqual(self.route_points(route), points)
+                    self.assertTrue(advisor.aim_value(board.aim_name(route.split()[-1]))[1])
+
+    def test_better_player_finishes_more(self):
+        _, weak = advisor.advise(81, 3, 40)
+        route, strong = advisor.advise(81, 3, 100)
+        self.assertEqual(self.route_points(route), 81)
+        self.assertGreater(strong, weak)
+        self.assertEqual(advisor.advise(41, 1, 100), (None, 0.0))
+
+    def test_tables_are_memoized(self):
+        self.assertIs(advisor.route_table(60, 3), advisor.route_table(60, 3))
+        self.assertIs(checkout_tables(60)[2], advisor.route_table(60, 2))
+        self.assertEqual(checkout_check(40, 1, 60), ('D20', True))
+
+
+class LoadTestCommandTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_boards_are_scored_and_cleaned_up(self):
+        out = io.StringIO()
+        call_command('loadtest', boards=3, turns=4, threads=1, stdout=out)
+        self.assertIn('12 turns on 3 boards', out.getvalue())
+        self.assertIn('0 errors', out.getvalue())
+        self.assertFalse(GameSession.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class BenchmarkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, 'baseline.json')
+
+    def benchmark(self, **options):
+        out = io.StringIO()
+        call_command('benchmark', mode='client', boards=2, legs=2, threads=1, repeat=1, baseline=self.baseline, stdout=out, **options)
+        return out.getvalue()
+
+    def test_script_ends_on_a_fresh_leg(self):
+        self.assertEqual(len(benchmark.engine_legs(3)), 3 * len(benchmark.LEG_SCRIPT))
+        user = get_user_model().objects.create_user('bench', 'bench@example.com', 'pass')
+        game, = benchmark.create_boards(user, 1)
+        timings, queries, errors = benchmark.play_legs(user, game, 1)
+        self.assertEqual((len(timings), len(queries), errors), (len(benchmark.LEG_SCRIPT), len(benchmark.LEG_SCRIPT), 0))
+        game.refresh_from_db()
+        self.assertEqual(game.scores['points'], [501, 501])
+        self.assertEqual(game.scores['games'], [0, 0])
+
+    def test_steps_end_on_the_play_page(self):
+        user = get_user_model().objects.create_user('bench', 'bench@example.com', 'pass')
+        game, = benchmark.create_boards(user, 1)
+        self.client.force_login(user)
+        for step, value in (('darts', (20, 20, 20)), ('score', 60), ('reset', None)):
+            response = benchmark.step_request(self.client, game, step, value)
+            self.assertEqual(response.status_code, 200)
+            self.assertTemplateUsed(response, 'play.html')
+
+    def test_baseline_is_saved_and_compared(self):
+        self.assertIn('Baseline saved', self.benchmark(save_baseline=True))
+        self.assertFalse(GameSession.objects.exists())
+        with open(self.baseline) as baseline_file:
+            saved = json.load(baseline_file)
+        self.assertEqual(set(saved['client']), {'requests_per_second', 'p50_ms', 'p99_ms', 'queries_per_turn', 'boards', 'legs', 'threads'})
+        self.assertIn('No regressions', self.benchmark(tolerance=1000))
+
+    def test_more_queries_per_turn_fail_the_run(self):
+        self.benchmark(save_baseline=True)
+        with open(self.baseline) as baseline_file:
+            saved = json.load(baseline_file)
+        saved['client']['queries_per_turn'] -= 1
+        # other options only compare the queries
+        saved['client']['boards'] = 50
+        with open(self.baseline, 'w') as baseline_file:
+            json.dump(saved, baseline_file)
+        with self.assertRaisesMessage(CommandError, 'client: queries_per_turn'):
+            self.benchmark()
+
+    def test_regressions(self):
+        baseline = {'requests_per_second': 100, 'p50_ms': 10, 'p99_ms': 50, 'queries_per_turn': 8}
+        self.assertEqual(benchmark.regressions(baseline, baseline, 0.5), [])
+        slower = {'requests_per_second': 40, 'p50_ms': 14, 'p99_ms': 80, 'queries_per_turn': 8.5}
+        self.assertEqual(
+            benchmark.regressions(slower, baseline, 0.5),
+            ['requests_per_second 40, baseline 100', 'p99_ms 80, baseline 50', 'queries_per_turn 8.5, baseline 8'],
+        )
+
+
+class ApiTests(DartsTestCase):
+
+    def post(self, name, data, **kwargs):
+        return self.client.post(reverse(name, kwargs=kwargs), json.dumps(data), content_type='application/json')
+
+    def create_session(self):
+        response = self.post('api_sessions', {'game_type': 0, 'players': [self.player2.id, self.player1.id]})
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_login_is_required(self):
+        self.client.logout()
+        response = self.client.get(reverse('api_sessions'))
+        self.assertEqual((response.status_code, response.json()), (401, {'error': 'Authentication required'}))
+
+    def test_session_is_created_with_players_in_posted_order(self):
+        state = self.create_session()
+        self.assertEqual(state['scores']['seats'], [self.player2.id, self.player1.id])
+        self.assertEqual((state['version'], state['checkout']), (0, None))
+        sessions = self.client.get(reverse('api_sessions')).json()
+        self.assertEqual([session['uuid'] for session in sessions['sessions']], [state['uuid']])
+        self.assertEqual([player['name'] for player in sessions['sessions'][0]['players']], ['Bert', 'Anna'])
+        response = self.post('api_sessions', {'game_type': 0, 'players': [self.player1.id]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('players', response.json()['fields'])
+
+    def test_session_players_are_ids_seated_once(self):
+        for players in ([self.player1.id, str(self.player1.id), self.player2.id], [self.player1.id, self.player1.id, self.player2.id],
+                        [self.player1.id, True], [self.player1.id, 2.0], str(self.player1.id)):
+            response = self.post('api_sessions', {'game_type': 0, 'players': players})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('players', response.json()['fields'])
+        self.assertFalse(GameSession.objects.exists())
+
+    def test_turns_undo_and_conditional_state(self):
+        uuid = self.create_session()['uuid']
+        url = reverse('api_session', kwargs={'uuid': uuid})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.post('api_session_turn', {'score': 180}, uuid=uuid).json()['version'], 1)
+        self.assertEqual(self.post('api_session_turn', {'darts': [20, 20, 20]}, uuid=uuid).json()['version'], 2)
+        state = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(state.status_code, 200)
+        self.assertEqual(state.json()['scores']['points'], [121, 241])
+        self.assertEqual(state.json()['checkout'], checkout_tables(board.skill_bucket(DEFAULT_AVERAGE))[3][121])
+        # undo on a version another device already moved on from
+        response = self.post('api_session_undo', {'version': 1}, uuid=uuid)
+        self.assertEqual((response.status_code, response.json()['version']), (409, 2))
+        response = self.post('api_session_undo', {'version': 2}, uuid=uuid)
+        self.assertEqual((response.json()['undone'], response.json()['scores']['points']), (True, [121, 301]))
+
+    def test_batch_state_reads_in_constant_queries(self):
+        uuids = [self.create_session()['uuid'] for _ in range(3)]
+        url = reverse('api_session_batch')
+        missing = '00000000-0000-0000-0000-000000000000'
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'uuid': uuids + [missing]})
+        self.assertEqual([state['uuid'] for state in response.json()['sessions']], uuids)
+        self.assertEqual(response.json()['missing'], [missing])
+        self.assertEqual(self.client.get(url, {'uuid': 'nope'}).status_code, 400)
+
+    def test_player_crud(self):
+        response = self.post('api_players', {'name': 'Cleo'})
+        self.assertEqual(response.status_code, 201)
+        url = reverse('api_player', kwargs={'pk': response.json()['id']})
+        self.assertEqual(self.post('api_players', {'name': 'Cleo'}).status_code, 400)
+        names = [player['name'] for player in self.client.get(reverse('api_players')).json()['players']]
+        self.assertEqual(names, ['Anna', 'Bert', 'Cleo'])
+        response = self.client.patch(url, json.dumps({'name': 'Dora'}), content_type='application/json')
+        self.assertEqual(response.json()['name'], 'Dora')
+        self.assertIsNone(self.client.get(url).json()['stats'])
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_player_is_deleted_with_game_sessions(self):
+        self.create_session()
+        self.post('api_session_turn', {'score': 60}, uuid=GameSession.objects.get().uuid)
+        response = self.client.delete(reverse('api_player', kwargs={'pk': self.player1.pk}))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(GameSession.objects.exists() or Turn.objects.exists())
+        self.assertTrue(Player.objects.filter(pk=self.player2.pk).exists())
+        other = get_user_model().objects.create_user('other', 'other@example.com', 'password')
+        foreign = Player.objects.create(name='Eve', owner=other)
+        self.assertEqual(self.client.delete(reverse('api_player', kwargs={'pk': foreign.pk})).status_code, 404)
+        self.assertTrue(Player.objects.filter(pk=foreign.pk).exists())
+
+
+@override_settings(TASK_WORKER=False, INGEST_QUEUE_SIZE=8)
+class IngestTests(GameTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ingest.reset()
+        self.addCleanup(ingest.reset)
+        self.board = Dartboard.objects.create(owner=self.user, name='Board 1', game_session=self.game)
+
+    def send(self, *darts, token=None, first_id=0):
+        events = [
+            {'id': first_id + number, 'takeout': True} if dart == 'out' else {'id': first_id + number, 'dart': dart}
+            for number, dart in enumerate(darts)
+        ]
+        return self.client.post(
+            reverse('api_board_events'), json.dumps({'events': events}), content_type='application/json',
+            HTTP_X_BOARD_TOKEN=token or self.board.token,
+        )
+
+    def scores(self):
+        tasks.run_all()
+        self.game.refresh_from_db()
+        return self.game.scores['points'], self.game.scores['games']
+
+    def test_darts_are_grouped_into_visits(self):
+        self.assertEqual(self.send('T20', 'T20', 'T20', '20', 'out').json(), {'queued': 5, 'duplicates': 0})
+        self.assertEqual(self.scores(), ([121, 281], [0, 0]))
+        # sent again after a timeout
+        self.assertEqual(self.send('T20', 'T20', 'T20', '20', 'out').json(), {'queued': 0, 'duplicates': 5})
+        # visit in progress waits for the next darts
+        self.send('T20', 'T17', first_id=5)
+        self.assertEqual(self.scores(), ([121, 281], [0, 0]))
+        self.send('D5', first_id=7)
+        self.assertEqual(self.scores(), ([301, 301], [1, 0]))
+        self.assertEqual(self.game.turns.last().darts, 3)
+
+    def test_bust_ends_the_visit(self):
+        self.send('T20', 'T20', 'T20', '20', 'out')
+        # 1 left after two darts
+        self.send('T20', 'T20', first_id=5)
+        self.assertEqual(self.scores(), ([121, 281], [0, 0]))
+        self.send('T20', 'T20', 'T20', first_id=7)
+        self.assertEqual(self.scores(), ([121, 101], [0, 0]))
+        # zero on a single
+        self.send('T20', 'T17', '10', first_id=10)
+        self.assertEqual(self.scores(), ([121, 101], [0, 0]))
+        self.assertEqual(list(self.game.turns.values_list('kind', flat=True)), [0, 0, 1, 0, 1])
+
+    def test_queue_is_kept_in_the_database(self):
+        self.send('T20', 'T20')
+        self.assertEqual(self.scores(), ([301, 301], [0, 0]))
+        # the visit in progress waits in the database, any process takes the next post
+        self.assertEqual(BoardEvent.objects.filter(board=self.board, applied=False).count(), 2)
+        ingest.reset()
+        self.assertEqual(self.send('T20', 'T20', 'T20').json(), {'queued': 1, 'duplicates': 2})
+        self.assertEqual(self.scores(), ([121, 301], [0, 0]))
+        # scored events are kept for the last ids only
+        with mock.patch('darts.ingest.DEDUPE_WINDOW', 4):
+            self.send('20', '20', '20', first_id=3)
+            self.assertEqual(self.scores(), ([121, 241], [0, 0]))
+        self.assertEqual(list(BoardEvent.objects.values_list('event_id', flat=True).order_by('id')), ['2', '3', '4', '5'])
+
+    def test_full_queue_is_refused(self):
+        self.assertEqual(self.send(*['20'] * 6).status_code, 202)
+        response = self.send('20', '20', '20', first_id=6)
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        exposition = '\n'.join(ingest.exposition())
+        self.assertIn(f'darts_ingest_events_total{{board="{self.board.id}",outcome="rejected"}} 3', exposition)
+        self.assertIn(f'darts_ingest_queue_depth{{board="{self.board.id}"}} 6', exposition)
+        tasks.run_all()
+        self.assertEqual(self.send('20', '20', '20', first_id=6).status_code, 202)
+        self.assertEqual(self.scores(), ([181, 241], [0, 0]))
+
+    def test_board_must_be_known_and_playing(self):
+        self.assertEqual(self.send('20', token='wrong').status_code, 403)
+        self.assertEqual(self.send('X20').status_code, 400)
+        self.board.game_session = None
+        self.board.save()
+        self.assertEqual(self.send('20').status_code, 409)
+
+    def test_simulator(self):
+        out = io.StringIO()
+        call_command('simulate_board', self.board.token, visits=4, seed=1, resend=1, stdout=out)
+        self.assertIn('16 events', out.getvalue())
+        self.assertIn('16 duplicates dropped', out.getvalue())
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.turn_count, 4)
+
+
+@override_settings(TASK_WORKER=False)
+class BackgroundTaskTests(GameTestCase):
+
+    def setUp(self):
+        # the win chances have tests of their own
+        patcher = mock.patch('darts.history.queue_odds')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+    def win_leg(self):
+        # 301 in six darts, checkout 121
+        for score in (180, 60, 121):
+            self.turn(score=score)
+
+    def test_won_leg_is_archived_by_the_worker(self):
+        self.win_leg()
+        self.assertEqual(tasks.queue_depth(), {'pending': 1, 'running': 0, 'failed': 0})
+        self.assertFalse(LegRecord.objects.exists())
+        self.assertEqual(tasks.run_pending(), 1)
+        record = LegRecord.objects.get()
+        self.assertEqual((record.winner, record.darts, record.checkout, record.average), (self.player1, 6, 121, 150.5))
+        self.assertEqual(
+            sorted(record.achievements.values_list('kind', flat=True)),
+            [AchievementKind.PERFECT_LEG, AchievementKind.TON_PLUS_CHECKOUT],
+        )
+        self.assertEqual(tasks.queue_depth()['pending'], 0)
+        # undoing the winning turn takes the archive with it
+        self.client.post(reverse('play', kwargs={'uuid': self.game.uuid}), {'undo': 'undo'})
+        self.assertFalse(LegRecord.objects.exists())
+        self.assertFalse(Achievement.objects.exists())
+
+    def test_leg_is_queued_with_the_winning_turn(self):
+        self.turn(score=180)
+        self.turn(score=60)
+        with CaptureQueriesContext(connection) as queries:
+            self.turn(score=121)
+        self.assertEqual([query['sql'] for query in queries if 'FROM "darts_turn"' in query['sql']], [])
+        self.assertEqual(Task.objects.get().payload, {'turn_id': self.game.turns.get(sequence=3).id, 'player_id': self.player1.id})
+
+    def test_leg_undone_before_the_worker_runs(self):
+        self.win_leg()
+        self.client.post(reverse('play', kwargs={'uuid': self.game.uuid}), {'undo': 'undo'})
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertFalse(LegRecord.objects.exists())
+
+    def test_failing_task_is_retried_then_kept(self):
+        def fail():
+            raise RuntimeError('archive is down')
+
+        with mock.patch.dict(tasks.TASKS, {'fail': fail}), self.assertLogs('darts.tasks', 'ERROR'):
+            tasks.enqueue('fail')
+            self.assertEqual(tasks.run_pending(), 1)
+            queued = Task.objects.get()
+            self.assertEqual((queued.status, queued.attempts), (TaskStatus.PENDING, 1))
+            self.assertIn('archive is down', queued.last_error)
+            # not due before the retry delay
+            self.assertEqual(tasks.run_pending(), 0)
+            for attempt in range(2, tasks.MAX_ATTEMPTS + 1):
+                Task.objects.update(run_after=timezone.now())
+                self.assertEqual(tasks.run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (TaskStatus.FAILED, tasks.MAX_ATTEMPTS))
+        out = io.StringIO()
+        call_command('run_tasks', status=True, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'pending 0, running 0, failed 1')
+        self.assertIn('darts_tasks{status="failed"} 1', registry.exposition())
+
+    def test_worker_can_be_waited_for(self):
+        worker = tasks.Worker()
+        self.assertTrue(worker.wait(0))
+        running, done = threading.Event(), threading.Event()
+
+        def run_all():
+            running.set()
+            done.wait(5)
+
+        with mock.patch('darts.tasks.run_all', run_all), mock.patch('darts.tasks.close_old_connections'):
+            worker.wake()
+            running.wait(5)
+            self.assertFalse(worker.wait(0))
+            done.set()
+            self.assertTrue(worker.wait(5))
+
+
+@override_settings(TASK_WORKER=False)
+class OddsTests(GameTestCase):
+
+    def odds(self):
+        return self.client.get(reverse('odds', kwargs={'uuid': self.game.uuid})).json()
+
+    def test_scoreboard_never_simulates(self):
+        with mock.patch('darts.odds.leg_win_probabilities', return_value=(0.25, 0.75)) as simulate:
+            self.turn(score=60)
+            response = self.client.get(reverse('play', kwargs={'uuid': self.game.uuid}))
+            self.assertEqual([seat['win_chance'] for seat in response.context['seats']], [None, None])
+            self.assertEqual(self.odds(), {'version': 1, 'odds': None})
+            simulate.assert_not_called()
+            tasks.run_all()
+        # the task of version 0 was moved on to version 1, only the current version is simulated
+        simulate.assert_called_once_with((241, 301), 1, mock.ANY)
+        self.assertEqual(self.odds(), {'version': 1, 'odds': [25, 75]})
+        response = self.client.get(reverse('watch', kwargs={'uuid': self.game.uuid}))
+        self.assertEqual([seat['win_chance'] for seat in response.context['seats']], [25, 75])
+        self.assertContains(response, '<td data-odds="1">75</td>', html=True)
+
+    def test_chances_follow_the_version(self):
+        with mock.patch('darts.odds.leg_win_probabilities', return_value=(0.5, 0.5)):
+            tasks.run_all()
+            self.turn(score=60)
+            self.assertEqual(self.odds(), {'version': 1, 'odds': None})
+            self.client.post(reverse('play', kwargs={'uuid': self.game.uuid}), {'undo': 'undo'})
+            self.assertEqual(self.odds(), {'version': 2, 'odds': None})
+            tasks.run_all()
+        self.assertEqual(self.odds(), {'version': 2, 'odds': [50, 50]})
+
+    def test_one_waiting_task_per_game(self):
+        versions = Task.objects.filter(name='leg_odds', payload__game_id=self.game.id).values_list('payload__version', flat=True)
+        self.turn(score=60)
+        self.turn(score=45)
+        self.client.post(reverse('play', kwargs={'uuid': self.game.uuid}), {'undo': 'undo'})
+        self.assertEqual(list(versions), [3])
+        # a claimed task doesn't take the changes after it
+        self.assertEqual(len(tasks.claim()), 1)
+        self.turn(score=60)
+        self.assertEqual(sorted(versions.all()), [3, 4])
+
+    def test_cricket_has_no_chances(self):
+        self.client.post(reverse('game_create'), {'game_type': 3, 'players': [self.player1.id, self.player2.id]})
+        self.assertFalse(Task.objects.filter(payload__game_id=GameSession.objects.latest('id').id).exists())
+
+
+class MigrationTests(TransactionTestCase):
+    """Data migrations run on rows written with the schema before them"""
+
+    def migrate(self, target):
+        """Migrates the darts app to `target` and returns the models of that state"""
+        executor = MigrationExecutor(connection)
+        executor.migrate([('darts', target)])
+        return executor.loader.project_state([('darts', target)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def owner(self, apps):
+        return apps.get_model('user', 'CustomUser').objects.create(username='darts', email='darts@example.com')
+
+    def test_score_reprs_become_json_and_back(self):
+        apps = self.migrate('0001_initial')
+        scores = {'points': {'player1': 441, 'player2': 501}, 'turn': {'player1': False, 'player2': True}, 'average': {'player1': 60.0, 'player2': 0}}
+        apps.get_model('darts', 'GameSession').objects.create(owner=self.owner(apps), scores=repr(scores), undo='')
+        game = self.migrate('0002_scores_jsonfield').get_model('darts', 'GameSession').objects.get()
+        self.assertEqual((game.scores, game.undo), (scores, {}))
+        game = self.migrate('0001_initial').get_model('darts', 'GameSession').objects.get()
+        self.assertEqual((ast.literal_eval(game.scores), ast.literal_eval(game.undo)), (scores, {}))
+        game.delete()
+
+    def test_two_player_scores_get_seats(self):
+        apps = self.migrate('0007_turn_first_nine')
+        Player = apps.get_model('user', 'Player')
+        owner = self.owner(apps)
+        # seated by name
+        bert, anna = (Player.objects.create(name=name, owner=owner) for name in ('Bert', 'Anna'))
+        keyed = {
+            'points': {'player1': 441, 'player2': 301}, 'games': {'player1': 1, 'player2': 0},
+            'darts': {'player1': 3, 'player2': 6}, 'darts_total': {'player1': 9, 'player2': 12},
+            'total_points_scored': {'player1': 561, 'player2': 200}, 'average': {'player1': 60.0, 'player2': 100.0},
+            'average_total': {'player1': 187.0, 'player2': 50.0}, 'turn': {'player1': False, 'player2': True},
+        }
+        game = apps.get_model('darts', 'GameSession').objects.create(owner=owner, scores=keyed, turn_count=2)
+        game.players.set([bert, anna])
+        apps.get_model('darts', 'Snapshot').objects.create(game_session=game, sequence=0, scores=keyed)
+        apps = self.migrate('0008_scores_seats')
+        game = apps.get_model('darts', 'GameSession').objects.get()
+        self.assertEqual(game.scores, {
+            'seats': [anna.id, bert.id], 'turn': 1, 'points': [441, 301], 'games': [1, 0], 'darts': [3, 6],
+            'darts_total': [9, 12], 'total_points_scored': [561, 200], 'average': [60.0, 100.0], 'average_total': [187.0, 50.0],
+        })
+        self.assertEqual(apps.get_model('darts', 'Snapshot').objects.get().scores, game.scores)
+        apps = self.migrate('0007_turn_first_nine')
+        self.assertEqual(apps.get_model('darts', 'GameSession').objects.get().scores, keyed)
+        self.assertEqual(apps.get_model('darts', 'Snapshot').objects.get().scores, keyed)
+        apps.get_model('darts', 'GameSession').objects.all().delete()
@@ -7,5 +7,9 @@ urlpatterns = [
     path('create/', views.GameCreateView.as_view(), name='game_create'),
     path('delete/<str:uuid>/', views.GameDeleteView.as_view(), name='game_delete'),
     path('play/<str:uuid>/', views.play_game_view, name='play'),
+    path('play/<str:uuid>/turn/', views.turn_commit_view, name='turn'),
     path('reset/<str:uuid>/', views.reset_game_view, name='reset'),
+    path('watch/<uuid:uuid>/', views.watch_game_view, name='watch'),
+    path('watch/<uuid:uuid>/odds/', views.odds_view, name='odds'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
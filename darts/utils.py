@@ -1,27 +1,21 @@
-from .checkouts import checkouts
+from .checkouts import CHECKOUT_TABLES, MAX_CHECKOUT
+from .engine.advisor import route_table
+from .engine import calculate_average, calculate_total_average, new_state, to_scores, cricket
+from .models import GameChoices
 
-def calculate_average(game_win_points, player_points, player_total_darts_thrown):
-    """Calculates player's average, takes in 301, 501 or 701 as game win points, player's current points left and total number of darts thrown"""
-    # Average = Total points scored divided by the number of darts thrown multiplied by 3.
-    player_total_points_scored = game_win_points - player_points
-    player_average = round(player_total_points_scored / player_total_darts_thrown * 3, 1)
-    return player_average
 
+def checkout_tables(bucket=None):
+    """Checkout tables indexed by [darts_left][points], advised for a skill bucket when given"""
+    if bucket is None:
+        return CHECKOUT_TABLES
+    return (CHECKOUT_TABLES[0],) + tuple(route_table(bucket, darts_left) for darts_left in (1, 2, 3))
 
-def calculate_total_average(player_total_points_scored, player_total_darts_thrown):
-    """Calculates player's total average, takes in total points scored in a game session and a total number of darts thrown in same session"""
-    player_total_average = round(player_total_points_scored / player_total_darts_thrown * 3, 1)
-    return player_total_average
 
-
-def checkout_check(player_points):
-    """Show possible checkout"""
-    if player_points > 170:
+def checkout_check(player_points, darts_left=3, bucket=None):
+    """Show possible checkout with darts_left darts in hand, for the skill bucket of the player when given"""
+    if player_points > MAX_CHECKOUT:
         checkout = ''
         checkout_show = False
-    elif str(player_points) in checkouts:
-        checkout = checkouts[str(player_points)]
-        checkout_show = True
     elif player_points == 0:
         checkout = 'Win!'
         checkout_show = True
@@ -29,13 +23,30 @@ def checkout_check(player_points):
         checkout = 'Bust!'
         checkout_show = True
     else:
-        checkout = 'No possible checkout'
+        checkout = checkout_tables(bucket)[darts_left][player_points] or 'No possible checkout'
         checkout_show = True
     return checkout, checkout_show
 
 
-def temp_checkout_calculated(player_points, current_sum):
+def temp_checkout_calculated(player_points, current_sum, darts_left=3, bucket=None):
     '''Show calculated checkout'''
     temp_score = player_points - current_sum
-    temp_checkout, temp_checkout_show = checkout_check(temp_score)
-    return temp_checkout, temp_checkout_show
\ No newline at end of file
+    temp_checkout, temp_checkout_show = checkout_check(temp_score, darts_left, bucket)
+    return temp_checkout, temp_checkout_show
+
+
+def new_scores(game_win_points, seats):
+    """Fresh scores dict for an X01 game session of players with ids `seats`, in seat order"""
+    return to_scores(new_state(game_win_points, len(seats)), seats)
+
+
+def new_cricket_scores(seats, cut_throat=False):
+    """Fresh scores dict for a cricket game session of players with ids `seats`, in seat order"""
+    return cricket.to_scores(cricket.new_state(len(seats), cut_throat), seats)
+
+
+def start_scores(game, seats):
+    """Fresh scores dict for the game type of a game session"""
+    if game.is_cricket:
+        return new_cricket_scores(seats, cut_throat=game.game_type == GameChoices.CRICKETCUT)
+    return new_scores(game.win_points, seats)
@@ -1,27 +1,103 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib import messages
+from django.db import transaction
+from django.core.cache import cache
+from django.db.models import Prefetch, Q
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_POST, require_GET, condition
+from django.views.decorators.vary import vary_on_cookie
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 
-from .models import GameSession, Player
+from .models import GameSession, Player, TurnKind
+from .cache import HOME_TIMEOUT, home_key, roster, seated_players
 from .forms import GameCreateForm
-from .utils import calculate_average, calculate_total_average, checkout_check, temp_checkout_calculated
+from .utils import checkout_check, checkout_tables, start_scores
+from .db import ScoresChanged, delete_game_sessions
+from .engine import from_scores, cricket
+from .history import start_history, record_turn, undo_turns
+from .live import publish_game
+from .metrics import registry
+from .odds import win_chances
+from .signals import UndoRefused, leg_won, undoing
+from .stats import skill_buckets
 
-import ast, copy
+import hashlib
+import json
+
+
+# values of the score calculator buttons, 25 is bull
+NUMERIC_BUTTONS = list(range(1, 21)) + [25]
+# game sessions listed per home page
+HOME_PAGE_SIZE = 20
+# cricket target buttons, highest first
+CRICKET_BUTTONS = sorted(cricket.TARGETS, reverse=True)
+# how 0 to 3 marks on a cricket target are shown
+MARK_SYMBOLS = ('', '/', 'X', 'Ⓧ')
+# multiplier prefixes of typed in darts
+HIT_MULTIPLIERS = {'S': 1, 'D': 2, 'T': 3}
+
+# fields of a JSON turn by whether the game is cricket, besides the optional version
+TURN_FIELDS = {False: frozenset(('darts', 'score', 'checkout_darts_used', 'bust')), True: frozenset(('hits',))}
+
+# tries of a turn commit that doesn't name the version it was entered on
+COMMIT_ATTEMPTS = 3
+
+# seconds a rendered score table is cached
+SCOREBOARD_TIMEOUT = 10 * 60
+
+CONFLICT_MESSAGE = 'Scores were changed on another device, check them and enter the turn again.'
+
+
+def home_page(user, before=None, before_id=None):
+    """Games of a home page with the query string of the next one, and the user's players count when there are no games"""
+    # show users game sessions, players of each game fetched in one extra query
+    games = (
+        GameSession.objects.filter(owner=user)
+        .prefetch_related(Prefetch('players', queryset=Player.objects.order_by('name')))
+        .order_by('-time_modified', '-id')
+    )
+    if before is not None:
+        games = games.filter(Q(time_modified__lt=before) | Q(time_modified=before, id__lt=before_id))
+    games = list(games[:HOME_PAGE_SIZE + 1])
+    next_page = None
+    if len(games) > HOME_PAGE_SIZE:
+        games = games[:HOME_PAGE_SIZE]
+        next_page = urlencode({'before': games[-1].time_modified.isoformat(), 'before_id': games[-1].id})
+    # players count is only shown when there are no games yet
+    players_count = None if games or before is not None else Player.objects.filter(owner=user).count()
+    return games, next_page, players_count
 
 
 @login_required
 def home_view(request):
-    """Home page for the logged in user with list of all game sessions"""
-    # show all users game sessions
-    games = GameSession.objects.filter(owner=request.user).order_by('-time_modified')
-    players = Player.objects.filter(owner=request.user).order_by('name')
-    players_count = len(players)
-    games_count = False if len(games)==0 else True
-    context = {'games':games, 'players':players, 'games_count':games_count, 'players_count':players_count,}
+    """Home page for the logged in user with list of game sessions, newest first, HOME_PAGE_SIZE per page.
+    Pages are keyset paginated: ?before=<time_modified>&before_id=<id> of the last game on the previous page"""
+    try:
+        before = parse_datetime(request.GET.get('before', ''))
+        before_id = int(request.GET.get('before_id', ''))
+    except ValueError:
+        before = None
+    paginated = before is not None
+    if paginated:
+        games, next_page, players_count = home_page(request.user, before, before_id)
+    else:
+        # the first page is cached per user until one of their games or players changes
+        page = cache.get(home_key(request.user.pk))
+        if page is None:
+            page = home_page(request.user)
+            cache.set(home_key(request.user.pk), page, HOME_TIMEOUT)
+        games, next_page, players_count = page
+    games_count = bool(games) or paginated
+    context = {'games':games, 'games_count':games_count, 'players_count':players_count, 'next_page':next_page, 'paginated':paginated,}
     return render(request, 'home.html', context=context)
 
 
@@ -36,34 +112,19 @@ class GameCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
     def form_valid(self, form):
         '''Auto set logged in user to owner and set scores dict to correct game type'''
         form.instance.owner = self.request.user
-        
-        if form.instance.game_type == 0:
-            points = 301
-        elif form.instance.game_type == 1:
-            points = 501
-        elif form.instance.game_type == 2:
-            points = 701
-        else:
-            # cricket not implemented yet!
-            raise NotImplementedError('Cricket is not implemented yet.')
-        
-        form.instance.scores = {
-            'points': {'player1':points, 'player2':points,},
-            'games': {'player1':0, 'player2':0,},
-            'turn': {'player1':True, 'player2':False},
-            'darts': {'player1':0, 'player2':0},
-            'darts_total': {'player1':0, 'player2':0},
-            'total_points_scored': {'player1':0, 'player2':0},
-            'average': {'player1':0, 'player2':0},
-            'average_total': {'player1':0, 'player2':0},
-            }
-        form.instance.undo = form.instance.scores
-        return super().form_valid(form)
+        # players sit in the order they are listed in
+        seats = [player.id for player in form.cleaned_data['players']]
+        form.instance.scores = start_scores(form.instance, seats)
+        response = super().form_valid(form)
+        start_history(self.object, self.object.scores)
+        return response
         
     def get_form(self, *args, **kwargs):
         '''Show only players owned by logged in user'''
         form = super().get_form(*args, **kwargs)  # Get the form as usual
         form.fields['players'].queryset = Player.objects.filter(owner=self.request.user).order_by('name')
+        # checkboxes are rendered from the cached roster, the queryset only validates posted players
+        form.fields['players'].widget.choices = [(player.pk, player.name) for player in roster(self.request.user.pk)]
         return form
         
 
@@ -82,354 +143,356 @@ class GameDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
         '''Get object by uuid'''
         return get_object_or_404(GameSession, uuid=self.kwargs.get("uuid"), owner_id=self.request.user)
 
+    def form_valid(self, form):
+        # the same delete as for a player's game sessions, receivers of games_deleting get to clean up
+        delete_game_sessions(GameSession.objects.filter(pk=self.object.pk))
+        messages.success(self.request, self.get_success_message(form.cleaned_data))
+        return redirect(self.get_success_url())
+
 
 @login_required
 def reset_game_view(request, uuid):
     """Reset Game Session by uuid. Resets players' scores and round"""
     active_game = get_object_or_404(GameSession, owner_id=request.user, uuid=uuid)
     
-    if active_game.game_type == 0:
-        game_win_points = 301
-    elif active_game.game_type == 1:
-        game_win_points = 501
-    elif active_game.game_type == 2:
-        game_win_points = 701
-    else:
-        # Game Type is Cricket, not implemented
-        pass
-    
     if request.method == 'POST':
-        scores_def = {
-            'points': {'player1':game_win_points, 'player2':game_win_points,},
-            'games': {'player1':0, 'player2':0,},
-            'turn': {'player1':True, 'player2':False},
-            'darts': {'player1':0, 'player2':0},
-            'darts_total': {'player1':0, 'player2':0},
-            'total_points_scored': {'player1':0, 'player2':0},
-            'average': {'player1':0, 'player2':0},
-            'average_total': {'player1':0, 'player2':0},
-        }
-        
-        active_game.scores = scores_def
-        active_game.undo = scores_def
-        active_game.save()
+        # logged as a turn, so the players' all time stats stay and the reset can be undone
+        try:
+            commit_turn(request, active_game, TurnKind.RESET)
+        except ScoresChanged:
+            messages.warning(request, CONFLICT_MESSAGE)
         return redirect('play', uuid=active_game.uuid)
     context = {'game': active_game}
     return render(request, 'game_reset.html', context=context)
 
 
+def commit_turn(request, active_game, kind, score=0, checkout_darts_used=3, hits=(), version=None):
+    """Applies one turn to the game session and saves it in a single transaction, adds win message if leg is won.
+    `version` is the version of the game the turn was entered on, without it the turn goes on top of the current scores.
+    Raises ScoresChanged when the game was changed by another request in the meantime"""
+    players = seated_players(active_game)
+    for attempt in range(COMMIT_ATTEMPTS):
+        if version is not None and version != active_game.version:
+            raise ScoresChanged
+        try:
+            seat, leg_darts = save_turn(active_game, kind, score, checkout_darts_used, players, hits)
+            break
+        except ScoresChanged:
+            if version is not None or attempt == COMMIT_ATTEMPTS - 1:
+                raise
+            # somebody else's turn got in first, this one goes on top of it
+            active_game.refresh_from_db(fields=['scores', 'turn_count', 'version'])
+    if leg_darts:
+        # Win message:
+        if active_game.is_cricket:
+            messages.success(request, f'{players[seat]} has won the game with {leg_darts} darts thrown!')
+        else:
+            messages.success(request, f'{players[seat]} has won the game with {leg_darts} darts thrown and average score of {active_game.scores["average"][seat]}!')
+    return leg_darts
+
+
+def save_turn(active_game, kind, score, checkout_darts_used, players, hits):
+    """One try of a turn commit, returns the seat that threw and the darts the leg was won with"""
+    seat = active_game.scores['turn']
+    games = active_game.scores['games']
+    with transaction.atomic():
+        turn = record_turn(active_game, kind, score, checkout_darts_used, players[seat], hits)
+        # in cut-throat cricket a dart can win the leg for another player
+        for winner, (before, after) in enumerate(zip(games, active_game.scores['games'])):
+            if after > before:
+                leg_won.send(sender=GameSession, game=active_game, seat=winner, turn=turn)
+        publish_game(active_game)
+    return seat, turn.leg_darts
+
+
+def undo_turn(active_game, version=None):
+    """Undoes the last turn of the game session, returns False if there was nothing to undo.
+    Raises ScoresChanged when `version` is given and the game was changed since, UndoRefused when a receiver of
+    the undoing signal keeps the turns"""
+    if version is not None and version != active_game.version:
+        raise ScoresChanged
+    undoing.send(sender=GameSession, game=active_game)
+    if not undo_turns(active_game):
+        return False
+    publish_game(active_game)
+    return True
+
+
+def parse_checkout_darts(value):
+    """Darts used for checkout, 1 to 3, defaults to 3"""
+    try:
+        checkout_darts_used = int(value)
+    except (TypeError, ValueError):
+        return 3
+    return min(max(checkout_darts_used, 1), 3)
+
+
+def parse_version(value):
+    """Game version a form or turn was entered on, None if not given"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_hit(value):
+    """Dart typed in as 20, S20, D20, T20, 25, SB or DB, 0 or empty for a miss. Returns (number, multiplier), None if invalid"""
+    value = (value or '').strip().upper()
+    if value in ('', '0'):
+        return 0, 0
+    multiplier = HIT_MULTIPLIERS.get(value[0])
+    number = value[1:] if multiplier else value
+    try:
+        number = 25 if number == 'B' else int(number)
+    except ValueError:
+        return None
+    multiplier = multiplier or 1
+    return (number, multiplier) if cricket.valid_hit(number, multiplier) else None
+
+
+def cricket_table_context(active_game, players):
+    """Template context of the cricket score table, `targets` rows hold the marks of every seat"""
+    state = cricket.from_scores(active_game.scores)
+    seats = [
+        {'player': player, 'turn': seat == state.turn, 'points': points, 'games': games, 'mpr': mpr}
+        for seat, (player, points, games, mpr) in enumerate(zip(players, state.points, state.games, state.mpr))
+    ]
+    targets = [
+        {
+            'number': number,
+            'index': cricket.TARGET_INDEX[number],
+            'marks': [MARK_SYMBOLS[cricket.target_marks(marks, number)] for marks in state.marks],
+        }
+        for number in CRICKET_BUTTONS
+    ]
+    return {'active_game': active_game, 'seats': seats, 'targets': targets}
+
+
+def x01_table_context(active_game, players):
+    """Template context of the X01 score table, one entry of `seats` per player in seat order"""
+    state = from_scores(active_game.scores, active_game.win_points)
+    # chances to win the leg, blank until the background worker simulated this version (see odds.py)
+    chances = win_chances(active_game) or [None] * len(state.points)
+    seats = [
+        {
+            'player': player, 'turn': seat == state.turn, 'points': points, 'games': games, 'average': average,
+            'average_total': average_total, 'win_chance': win_chance,
+        }
+        for seat, (player, points, games, average, average_total, win_chance) in enumerate(
+            zip(players, state.points, state.games, state.average, state.average_total, chances)
+        )
+    ]
+    return {'active_game': active_game, 'seats': seats}
+
+
+def scoreboard_key(active_game, players, buckets):
+    """Cache key of a rendered score table. Besides the game version it takes whether the win chances are in,
+    the seated players' names and their skill buckets, which change without a new version"""
+    seated = hashlib.md5(repr(([str(player) for player in players], buckets)).encode()).hexdigest()
+    has_odds = active_game.odds_version == active_game.version
+    return f'darts:scoreboard:{active_game.uuid}:{active_game.version}:{has_odds:d}:{seated}'
+
+
+def scoreboard_context(active_game):
+    """Template context of the play and watch pages, `scoreboard` is the rendered score table.
+    The table is taken from the cache before its seats are worked out"""
+    players = seated_players(active_game)
+    buckets = None if active_game.is_cricket else skill_buckets(active_game.scores['seats'])
+    key = scoreboard_key(active_game, players, buckets)
+    scoreboard = cache.get(key)
+    if scoreboard is None:
+        if active_game.is_cricket:
+            scoreboard = render_to_string('cricket_table.html', cricket_table_context(active_game, players))
+        else:
+            scoreboard = render_to_string('scoreboard_table.html', x01_table_context(active_game, players))
+        cache.set(key, scoreboard, SCOREBOARD_TIMEOUT)
+    context = {'active_game': active_game, 'scoreboard': scoreboard}
+    if active_game.is_cricket:
+        return context
+
+    #checkout, advised for the skill of the player to throw
+    turn = active_game.scores['turn']
+    p_points = active_game.scores['points'][turn]
+    checkout, checkout_show = checkout_check(p_points, 3, buckets[turn])
+
+    context.update({
+        'buckets': buckets,
+        'p_points': p_points,
+        'checkout': checkout,
+        'checkout_show': checkout_show,
+    })
+    return context
+
+
 @login_required
 def play_game_view(request, uuid):
-    """Gameplay view to show the active game by uuid"""
+    """Gameplay view to show the active game by uuid.
+    Score calculator runs in the browser and commits whole turns to turn_commit_view,
+    form posts here are for undo, switch player and manual score or darts without javascript"""
     
     active_game = get_object_or_404(GameSession, owner_id=request.user, uuid=uuid)
-    
-    # Check game type (301 or 501 or 701, etc.)
-    if active_game.game_type == 0:
-        game_win_points = 301
-    elif active_game.game_type == 1:
-        game_win_points = 501
-    elif active_game.game_type == 2:
-        game_win_points = 701
-        
-    players = active_game.players.all().order_by('name')
-    scores_dict = ast.literal_eval(active_game.scores)
-    
-    p1_real_name = players[0]
-    p2_real_name = players[1]
-    p1_points = scores_dict['points']['player1']
-    p2_points = scores_dict['points']['player2']
-    p1_games = scores_dict['games']['player1']
-    p2_games = scores_dict['games']['player2']
-    p1_turn = scores_dict['turn']['player1']
-    p2_turn = scores_dict['turn']['player2']
-    p1_game_darts_thrown = scores_dict['darts']['player1']
-    p2_game_darts_thrown = scores_dict['darts']['player2']
-    p1_total_darts_thrown = scores_dict['darts_total']['player1']
-    p2_total_darts_thrown = scores_dict['darts_total']['player2']
-    p1_total_points_scored = scores_dict['total_points_scored']['player1']
-    p2_total_points_scored = scores_dict['total_points_scored']['player2']
-    p1_average = scores_dict['average']['player1']
-    p2_average = scores_dict['average']['player2']
-    p1_average_total = scores_dict['average_total']['player1']
-    p2_average_total = scores_dict['average_total']['player2']
-    numeric_pressed = False
-    
-    #checkout
-    if p1_turn:
-        checkout, checkout_show = checkout_check(p1_points)
-        temp_checkout, temp_checkout_show = checkout_check(p1_points)
-    elif p2_turn:
-        checkout, checkout_show = checkout_check(p2_points)
-        temp_checkout, temp_checkout_show = checkout_check(p2_points)
-    
-    if request.method == 'GET':
-        # reset current_sum to 0 on first page entry from home page
-        active_game.current_sum = 0
-        active_game.save()
 
     if request.method == 'POST':
-        
-        if request.POST.get('bust'):
-            # "Bust" button pressed
-            active_game.undo = copy.deepcopy(scores_dict) # save last state for undo
-            active_game.current_sum = 0
-            # calculate average, but check who is playing:
-            if scores_dict['turn']['player1']:
-                # player1 turn
-                p1_game_darts_thrown += 3
-                p1_total_darts_thrown += 3
-                p1_average = calculate_average(game_win_points, p1_points, p1_game_darts_thrown)
-                p1_average_total = calculate_total_average(p1_total_points_scored, p1_total_darts_thrown)
-                scores_dict['darts']['player1'] = p1_game_darts_thrown
-                scores_dict['darts_total']['player1'] = p1_total_darts_thrown
-                scores_dict['total_points_scored']['player1'] = p1_total_points_scored
-                scores_dict['average']['player1'] = p1_average
-                scores_dict['average_total']['player1'] = p1_average_total
-                scores_dict['turn']['player1'] = False
-                scores_dict['turn']['player2'] = True
-            else:
-                # player2 turn
-                p2_game_darts_thrown += 3
-                p2_total_darts_thrown += 3
-                p2_average = calculate_average(game_win_points, p2_points, p2_game_darts_thrown)
-                p2_average_total = calculate_total_average(p2_total_points_scored, p2_total_darts_thrown)
-                scores_dict['darts']['player2'] = p2_game_darts_thrown
-                scores_dict['darts_total']['player2'] = p2_total_darts_thrown
-                scores_dict['total_points_scored']['player2'] = p2_total_points_scored
-                scores_dict['average']['player2'] = p2_average
-                scores_dict['average_total']['player2'] = p2_average_total
-                scores_dict['turn']['player1'] = True
-                scores_dict['turn']['player2'] = False
+        # forms carry the version of the game they were shown with
+        version = parse_version(request.POST.get('version'))
+        try:
+            if request.POST.get('bust') and not active_game.is_cricket:
+                # "Bust" button pressed
+                commit_turn(request, active_game, TurnKind.BUST, version=version)
             
-        elif request.POST.get('next'):
-            # "Switch player" button pressed. Switch players' turn without affecting average scores
-            scores_dict['turn']['player1'] = False if scores_dict['turn']['player1'] else True
-            scores_dict['turn']['player2'] = False if scores_dict['turn']['player2'] else True
-            active_game.current_sum = 0
-            # messages.success(request, 'Player switched.')
-
-        elif request.POST.get('score_manual') or request.POST.get('submit_score'):
-            active_game.undo = copy.deepcopy(scores_dict) # save last state for undo
-            
-            try:
-                # check if any input typed in "Enter score manually" input field
-                score = int(request.POST.get('score_manual'))
-                if score <= 180:
-                    active_game.current_sum = score # manually typed score always overtakes calculated score
-            except:
-                pass
-            try:
-                score = active_game.current_sum # try setting the score to manually typed score input field's value
-                if score <= 180:
+            elif request.POST.get('next'):
+                # "Switch player" button pressed. Switch players' turn without affecting average scores
+                commit_turn(request, active_game, TurnKind.SWITCH, version=version)
+                # messages.success(request, 'Player switched.')
+
+            elif request.POST.get('submit_score') and not active_game.is_cricket:
+                try:
+                    # score typed in "Enter score manually" input field
+                    score = int(request.POST.get('score_manual'))
+                except (TypeError, ValueError):
+                    score = None
+                if score is not None and 0 <= score <= 180:
                     # score can't be more than 180
+                    commit_turn(request, active_game, TurnKind.SCORE, score, parse_checkout_darts(request.POST.get('checkout_darts_used')), version=version)
 
-                    if scores_dict['turn']['player1']:
-                        p_name = 'player1'
-                        p_real_name = players[0]
-                        p_points = scores_dict['points'][p_name]
-                        p_game_darts_thrown = p1_game_darts_thrown
-                        p_total_darts_thrown = p1_total_darts_thrown
-                        p_total_points_scored = p1_total_points_scored
-                    elif scores_dict['turn']['player2']:
-                        p_name = 'player2'
-                        p_real_name = players[1]
-                        p_points = scores_dict['points'][p_name]
-                        p_game_darts_thrown = p2_game_darts_thrown
-                        p_total_darts_thrown = p2_total_darts_thrown
-                        p_total_points_scored = p2_total_points_scored
-                    
-                    result = p_points - score
-                    p_game_darts_thrown += 3
-                    p_total_darts_thrown += 3
-                    if result < 0 or result == 1:
-                        # Result can't be less than 0 or 1 (double out rule)
-                        # Bust!
-                        score = scores_dict['points'][p_name]
-                        p_average = calculate_average(game_win_points, score, p_game_darts_thrown)
-                        p_average_total = calculate_total_average(p_total_points_scored, p_total_darts_thrown)
-                    elif result == 0:
-                        # Game Won!
-                        p_total_points_scored += score
-                        # checkout darts used for stats
-                        checkout_darts_used = int(request.POST.get('checkout_darts_used'))
-                        if checkout_darts_used == 1:
-                            p_game_darts_thrown -= 2
-                            p_total_darts_thrown -= 2
-                        elif checkout_darts_used == 2:
-                            p_game_darts_thrown -= 1
-                            p_total_darts_thrown -= 1
-                        p_average = calculate_average(game_win_points, result, p_game_darts_thrown)
-                        p_average_total = calculate_total_average(p_total_points_scored, p_total_darts_thrown)
-                        # Win message:
-                        messages.success(request, f'{p_real_name} has won the game with {p_game_darts_thrown} darts thrown and average score of {p_average}!')
-                        # reset scores for both players
-                        scores_dict['points']['player1'] = game_win_points
-                        scores_dict['points']['player2'] = game_win_points
-                        # add 1 game to player1
-                        scores_dict['games'][p_name] += 1
-                        game_won = True
-                    else:
-                        # Legal result scored
-                        scores_dict['points'][p_name] = result
-                        p_total_points_scored += score
-                        p_average = calculate_average(game_win_points, result, p_game_darts_thrown)
-                        p_average_total = calculate_total_average(p_total_points_scored, p_total_darts_thrown)
-                    
-                    if p_name == 'player1':
-                        scores_dict['turn']['player1'] = False
-                        scores_dict['turn']['player2'] = True
-                        scores_dict['darts']['player1'] = p_game_darts_thrown
-                        scores_dict['darts_total']['player1'] = p_total_darts_thrown
-                        scores_dict['total_points_scored']['player1'] = p_total_points_scored
-                        scores_dict['average']['player1'] = p_average
-                        scores_dict['average_total']['player1'] = p_average_total
-                    elif p_name == 'player2':
-                        scores_dict['turn']['player1'] = True
-                        scores_dict['turn']['player2'] = False
-                        scores_dict['darts']['player2'] = p_game_darts_thrown
-                        scores_dict['darts_total']['player2'] = p_total_darts_thrown
-                        scores_dict['total_points_scored']['player2'] = p_total_points_scored
-                        scores_dict['average']['player2'] = p_average
-                        scores_dict['average_total']['player2'] = p_average_total
-                    
-                    if game_won:
-                        scores_dict['darts']['player1'] = 0
-                        scores_dict['darts']['player2'] = 0
- 
-                if p1_turn:
-                    checkout, checkout_show = checkout_check(p1_points)
-                elif p2_turn:
-                    checkout, checkout_show = checkout_check(p2_points)
-            except:
-                pass
-            active_game.current_sum = 0
-
-        # Buttons pressed to calculate score:
-        elif request.POST.get('1'):
-            numeric_pressed_value = 1
-            numeric_pressed = True
-        elif request.POST.get('2'):
-            numeric_pressed_value = 2
-            numeric_pressed = True
-        elif request.POST.get('3'):
-            numeric_pressed_value = 3
-            numeric_pressed = True
-        elif request.POST.get('4'):
-            numeric_pressed_value = 4
-            numeric_pressed = True
-        elif request.POST.get('5'):
-            numeric_pressed_value = 5
-            numeric_pressed = True
-        elif request.POST.get('6'):
-            numeric_pressed_value = 6
-            numeric_pressed = True
-        elif request.POST.get('7'):
-            numeric_pressed_value = 7
-            numeric_pressed = True
-        elif request.POST.get('8'):
-            numeric_pressed_value = 8
-            numeric_pressed = True
-        elif request.POST.get('9'):
-            numeric_pressed_value = 9
-            numeric_pressed = True
-        elif request.POST.get('10'):
-            numeric_pressed_value = 10
-            numeric_pressed = True
-        elif request.POST.get('11'):
-            numeric_pressed_value = 11
-            numeric_pressed = True
-        elif request.POST.get('12'):
-            numeric_pressed_value = 12
-            numeric_pressed = True
-        elif request.POST.get('13'):
-            numeric_pressed_value = 13
-            numeric_pressed = True
-        elif request.POST.get('14'):
-            numeric_pressed_value = 14
-            numeric_pressed = True
-        elif request.POST.get('15'):
-            numeric_pressed_value = 15
-            numeric_pressed = True
-        elif request.POST.get('16'):
-            numeric_pressed_value = 16
-            numeric_pressed = True
-        elif request.POST.get('17'):
-            numeric_pressed_value = 17
-            numeric_pressed = True
-        elif request.POST.get('18'):
-            numeric_pressed_value = 18
-            numeric_pressed = True
-        elif request.POST.get('19'):
-            numeric_pressed_value = 19
-            numeric_pressed = True
-        elif request.POST.get('20'):
-            numeric_pressed_value = 20
-            numeric_pressed = True
-        elif request.POST.get('25'):
-            numeric_pressed_value = 25
-            numeric_pressed = True
-
-        if numeric_pressed:
-            active_game.current_sum += numeric_pressed_value
-            if p1_turn:
-                temp_checkout, temp_checkout_show = temp_checkout_calculated(p1_points, active_game.current_sum)
-            else:
-                temp_checkout, temp_checkout_show = temp_checkout_calculated(p2_points, active_game.current_sum)
-
-        elif request.POST.get('reset_counter'):
-            active_game.current_sum = 0
+            elif request.POST.get('submit_hits') and active_game.is_cricket:
+                # cricket darts typed in the three dart fields
+                hits = [parse_hit(request.POST.get(f'dart{number}')) for number in (1, 2, 3)]
+                if None not in hits:
+                    commit_turn(request, active_game, TurnKind.MARKS, hits=hits, version=version)
             
-        elif request.POST.get('undo'):
-            if active_game.scores != active_game.undo:
-                scores_dict = ast.literal_eval(active_game.undo)
-
-        active_game.scores = scores_dict
-        active_game.save()
-        p1_points = scores_dict['points']['player1']
-        p2_points = scores_dict['points']['player2']
-        p1_games = scores_dict['games']['player1']
-        p2_games = scores_dict['games']['player2']
-        p1_turn = scores_dict['turn']['player1']
-        p2_turn = scores_dict['turn']['player2']
-        p1_game_darts_thrown = scores_dict['darts']['player1']
-        p2_game_darts_thrown = scores_dict['darts']['player2']
-        p1_total_darts_thrown = scores_dict['darts_total']['player1']
-        p2_total_darts_thrown = scores_dict['darts_total']['player2']
-        p1_total_points_scored = scores_dict['total_points_scored']['player1']
-        p2_total_points_scored = scores_dict['total_points_scored']['player2']
-        p1_average = scores_dict['average']['player1']
-        p2_average = scores_dict['average']['player2']
-        p1_average_total = scores_dict['average_total']['player1']
-        p2_average_total = scores_dict['average_total']['player2']
-        numeric_pressed = False
-        
-        if p1_turn:
-            checkout, checkout_show = checkout_check(p1_points)
-            temp_checkout, temp_checkout_show = checkout_check(p1_points - active_game.current_sum)
-        elif p2_turn:
-            checkout, checkout_show = checkout_check(p2_points)
-            temp_checkout, temp_checkout_show = checkout_check(p2_points - active_game.current_sum)
-
-    context = {
-        'active_game': active_game,
-        'players': players,
-        'p1_real_name': p1_real_name,
-        'p2_real_name': p2_real_name,
-        'p1_points': p1_points,
-        'p1_games': p1_games,
-        'p1_turn': p1_turn,
-        'p2_points': p2_points,
-        'p2_games': p2_games,
-        'p2_turn': p2_turn,
-        'p1_average': p1_average,
-        'p2_average': p2_average,
-        'p1_average_total': p1_average_total,
-        'p2_average_total': p2_average_total,
-        'current_sum': active_game.current_sum,
-        'checkout': checkout,
-        'checkout_show': checkout_show,
-        'temp_checkout': temp_checkout,
-        'temp_checkout_show': temp_checkout_show,
-    }
-    return render(request, 'play.html', context=context)
\ No newline at end of file
+            elif request.POST.get('undo'):
+                undo_turn(active_game, version)
+        except ScoresChanged:
+            messages.warning(request, CONFLICT_MESSAGE)
+            active_game.refresh_from_db(fields=['scores', 'turn_count', 'version'])
+        except UndoRefused as refused:
+            messages.warning(request, str(refused))
+
+    context = scoreboard_context(active_game)
+    if active_game.is_cricket:
+        context['cricket_buttons'] = CRICKET_BUTTONS
+        return render(request, 'cricket.html', context=context)
+    context.update({
+        # indexed by [darts_left][points], for the player to throw
+        'checkouts': checkout_tables(context['buckets'][active_game.scores['turn']]),
+        'numeric_buttons': NUMERIC_BUTTONS,
+    })
+    return render(request, 'play.html', context=context)
+
+
+@login_required
+@require_POST
+def turn_commit_view(request, uuid):
+    """Commits one whole turn posted as JSON by the play page's score calculator.
+    Body: {"darts": [20, 20, 20]} or {"score": 60} (manual score wins over darts), optional "checkout_darts_used" 1 to 3,
+    or {"bust": true}. Cricket visits post {"hits": [[20, 3], [19, 1], [0, 0]]}, [number, multiplier] per dart.
+    Other fields and values that aren't whole numbers are refused with 400 Bad Request.
+    Optional "version" is the game version the turn was entered on, a turn on an older version is refused with
+    409 Conflict and the current scores. Returns the new scores and version"""
+    active_game = get_object_or_404(GameSession, owner_id=request.user, uuid=uuid)
+    return json_turn_response(request, active_game)
+
+
+def is_int(value):
+    # JSON true and false are ints to python
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_json_turn(data, is_cricket):
+    """(kind, score, checkout darts, hits, version) of a turn posted as JSON, see turn_commit_view.
+    Raises ValueError if it has fields the game doesn't take or values of the wrong type"""
+    if not isinstance(data, dict) or not data.keys() & TURN_FIELDS[is_cricket] or data.keys() - TURN_FIELDS[is_cricket] - {'version'}:
+        raise ValueError('Unknown turn')
+    version = data.get('version')
+    if version is not None and not is_int(version):
+        raise ValueError('Version must be a whole number')
+    if is_cricket:
+        hits = data['hits']
+        if not isinstance(hits, list) or len(hits) > 3:
+            raise ValueError('Up to three darts')
+        for hit in hits:
+            if not (isinstance(hit, list) and len(hit) == 2 and all(is_int(value) for value in hit) and cricket.valid_hit(*hit)):
+                raise ValueError('Unknown dart value')
+        return TurnKind.MARKS, 0, 3, [tuple(hit) for hit in hits], version
+    checkout_darts_used = data.get('checkout_darts_used')
+    if checkout_darts_used is not None and not (is_int(checkout_darts_used) and 1 <= checkout_darts_used <= 3):
+        raise ValueError('Checkout darts must be 1, 2 or 3')
+    if not isinstance(data.get('bust', False), bool):
+        raise ValueError('Bust must be true or false')
+    if data.get('bust'):
+        return TurnKind.BUST, 0, 3, (), version
+    if 'score' in data:
+        score = data['score']
+        if not is_int(score):
+            raise ValueError('Score must be a whole number')
+    else:
+        darts = data.get('darts')
+        if not isinstance(darts, list) or not all(is_int(dart) and dart in NUMERIC_BUTTONS for dart in darts):
+            raise ValueError('Unknown dart value')
+        score = sum(darts)
+    return TurnKind.SCORE, score, checkout_darts_used or 3, (), version
+
+
+def json_turn_response(request, active_game):
+    """Commits the turn in the JSON body of the request, see turn_commit_view"""
+    try:
+        kind, score, checkout_darts_used, hits, version = parse_json_turn(json.loads(request.body), active_game.is_cricket)
+    except ValueError as error:
+        return JsonResponse({'error': f'Invalid turn: {error}'}, status=400)
+    if not 0 <= score <= 180:
+        # score can't be more than 180
+        return JsonResponse({'error': 'Score must be between 0 and 180'}, status=400)
+
+    try:
+        leg_darts = commit_turn(request, active_game, kind, score, checkout_darts_used, hits, version)
+    except ScoresChanged:
+        active_game.refresh_from_db(fields=['scores', 'turn_count', 'version'])
+        return JsonResponse({
+            'error': CONFLICT_MESSAGE, 'scores': active_game.scores, 'turn_count': active_game.turn_count,
+            'version': active_game.version,
+        }, status=409)
+    return JsonResponse({
+        'scores': active_game.scores, 'turn_count': active_game.turn_count, 'version': active_game.version,
+        'leg_won': bool(leg_darts),
+    })
+
+
+def watch_etag(request, uuid):
+    """Version of the game session, the same for every viewer"""
+    version = GameSession.objects.filter(uuid=uuid).values_list('version', flat=True).first()
+    return None if version is None else f'v{version}'
+
+
+@require_GET
+@cache_control(no_cache=True, public=True)
+# the navbar differs per user
+@vary_on_cookie
+@condition(etag_func=watch_etag)
+def watch_game_view(request, uuid):
+    """Read-only scoreboard of a game session for spectators, anyone with the link can watch.
+    Never writes, answers 304 Not Modified while the game is on the same version and follows live updates"""
+    active_game = get_object_or_404(GameSession, uuid=uuid)
+    context = scoreboard_context(active_game)
+    if not active_game.is_cricket:
+        # 3 darts tables indexed by [seat][points]
+        context['checkouts'] = [checkout_tables(bucket)[3] for bucket in context['buckets']]
+    context['mark_symbols'] = MARK_SYMBOLS
+    return render(request, 'watch.html', context=context)
+
+
+@require_GET
+@cache_control(no_cache=True, public=True)
+def odds_view(request, uuid):
+    """Leg win chances of a game session's current version for scoreboards rendered before they were simulated.
+    `odds` is null until the background worker is done, read-only like the spectator scoreboard"""
+    active_game = get_object_or_404(GameSession, uuid=uuid)
+    return JsonResponse({'version': active_game.version, 'odds': win_chances(active_game)})
+
+
+@require_GET
+def metrics_view(request):
+    """Request metrics of this process in the Prometheus text format, staff only"""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
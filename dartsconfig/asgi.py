@@ -2,6 +2,7 @@
 ASGI config for dartsconfig project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests under /live/ are the live scoreboard event streams, everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -13,4 +14,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dartsconfig.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from darts.live import sse_application  # noqa: E402 needs apps loaded
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'].startswith('/live/'):
+        return await sse_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,11 +50,14 @@ INSTALLED_APPS = [
     # my apps
     'user',
     'darts',
+    'tournament',
     'crispy_forms',
     'crispy_bootstrap5',
 ]
 
 MIDDLEWARE = [
+    # first, so it times everything below. Only used with METRICS_ENABLED
+    'darts.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +67,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# per view request timings, database queries and response sizes on /metrics/ for staff
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+
 ROOT_URLCONF = 'dartsconfig.urls'
 
 TEMPLATES = [
@@ -87,12 +94,64 @@ WSGI_APPLICATION = 'dartsconfig.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default, DB_ENGINE=postgresql for PostgreSQL with DB_NAME, DB_USER, DB_PASSWORD, DB_HOST and DB_PORT
+
+if os.environ.get('DB_ENGINE') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'darts'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # persistent connections, checked before reuse. Put PgBouncer in front to pool across processes
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # seconds a write waits for another board's write before "database is locked"
+                'timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 20)),
+            },
+        }
+    }
+
+# write-ahead log for single box SQLite installs, see darts/db.py
+SQLITE_WAL = os.environ.get('DB_SQLITE_WAL') == '1'
+
+
+# Dartboard ingest, see darts/ingest.py
+# events a board may have waiting before its posts are refused with 429, they are scored by the background tasks
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 64))
+
+# Background tasks, see darts/tasks.py
+# `manage.py run_tasks` runs them, TASK_WORKER=1 runs them in a thread of the web process instead (development only,
+# every web process would get one)
+TASK_WORKER = os.environ.get('TASK_WORKER') == '1'
+
+
+# Cache
+# local memory per process by default, CACHE_URL=redis://host:6379/0 shares one Redis between processes (needs the redis package)
+
+if os.environ.get('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 
 # Password validation
@@ -32,6 +32,8 @@ urlpatterns = [
     path('accounts/', include(providers_urlpatterns)),
     # path('user/', include('django.contrib.auth.urls')),
     # path('accounts/', include('allauth.urls')),
+    path('tournaments/', include('tournament.urls')),
+    path('api/v1/', include('darts.api_urls')),
     path('', include('darts.urls')), # disable this line for initial makemigrations
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
@@ -0,0 +1,81 @@
+// Dart picker for the cricket play page.
+// Up to three darts are collected in the browser and the visit is committed
+// with one request to the turn endpoint, then the page reloads with new scores.
+(function () {
+  const form = document.getElementById('hits-form');
+  if (!form) {
+    return;
+  }
+  const hitsLabel = document.getElementById('current-hits');
+  const csrfToken = form.querySelector('[name=csrfmiddlewaretoken]').value;
+  const PREFIXES = {1: '', 2: 'D', 3: 'T'};
+  let hits = [];
+
+  function label(hit) {
+    if (hit[0] === 0) {
+      return 'Miss';
+    }
+    return PREFIXES[hit[1]] + (hit[0] === 25 ? 'Bull' : hit[0]);
+  }
+
+  function update() {
+    hitsLabel.textContent = hits.length ? hits.map(label).join(' ') : '-';
+  }
+
+  function commitTurn(turn) {
+    // the server refuses the turn if the scores changed on another device since this page was loaded
+    turn.version = parseInt(form.elements.version.value, 10);
+    fetch(form.dataset.turnUrl, {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken},
+      body: JSON.stringify(turn),
+      credentials: 'same-origin',
+    }).then((response) => {
+      if (response.status === 409) {
+        return response.json().then((data) => {
+          alert(data.error);
+          window.location.reload();
+        });
+      }
+      if (!response.ok) {
+        return response.json().then((data) => { throw new Error(data.error); });
+      }
+      window.location.reload();
+    }).catch((error) => {
+      alert(error.message || 'Darts could not be saved, try again.');
+    });
+  }
+
+  form.querySelectorAll('[data-hit]').forEach((button) => {
+    button.addEventListener('click', () => {
+      if (hits.length === 3) {
+        return;
+      }
+      const number = parseInt(button.dataset.hit, 10);
+      let multiplier = parseInt(form.elements.multiplier.value, 10);
+      if (number === 25) {
+        // there is no treble bull
+        multiplier = Math.min(multiplier, 2);
+      }
+      hits.push([number, number === 0 ? 0 : multiplier]);
+      // every dart starts as a single again
+      form.elements.multiplier.value = '1';
+      update();
+    });
+  });
+
+  document.getElementById('reset-hits').addEventListener('click', () => {
+    hits = [];
+    update();
+  });
+
+  form.addEventListener('submit', (event) => {
+    const typed = ['dart1', 'dart2', 'dart3'].some((name) => form.elements[name].value.trim());
+    if (typed) {
+      // typed in darts are parsed by the server
+      return;
+    }
+    event.preventDefault();
+    commitTurn({hits: hits});
+  });
+})();
@@ -0,0 +1,53 @@
+// Leg win chances of the X01 score table.
+// They are simulated by the background worker after every turn, so a page rendered
+// before that has blank cells and asks the odds endpoint until the chances are in.
+(function () {
+  const table = document.querySelector('#scoreboard[data-odds-url]');
+  if (!table) {
+    return;
+  }
+  const POLL_INTERVAL = 1000;
+  const MAX_POLLS = 30;
+  let timer = null;
+
+  function cells() {
+    return table.querySelectorAll('[data-odds]');
+  }
+
+  function fill(odds) {
+    cells().forEach((cell) => {
+      cell.textContent = odds[cell.dataset.odds];
+    });
+  }
+
+  // version pins the chances to the scores on the page, without it any fresh chances do
+  function poll(version, polls) {
+    clearTimeout(timer);
+    timer = setTimeout(() => {
+      fetch(table.dataset.oddsUrl, {credentials: 'same-origin'})
+        .then((response) => response.json())
+        .then((data) => {
+          if (version !== null && data.version !== version) {
+            return;
+          }
+          if (data.odds) {
+            fill(data.odds);
+          } else if (polls > 1) {
+            poll(version, polls - 1);
+          }
+        })
+        .catch(() => {});
+    }, POLL_INTERVAL);
+  }
+
+  window.pollOdds = (version) => {
+    cells().forEach((cell) => {
+      cell.textContent = '';
+    });
+    poll(version, MAX_POLLS);
+  };
+
+  if (Array.from(cells()).some((cell) => cell.textContent === '')) {
+    poll(parseInt(table.dataset.version, 10), MAX_POLLS);
+  }
+})();
@@ -0,0 +1,93 @@
+// Score calculator for the play page.
+// Dart presses are added up in the browser and a whole turn is committed
+// with one request to the turn endpoint, then the page reloads with new scores.
+(function () {
+  const form = document.getElementById('score-form');
+  if (!form) {
+    return;
+  }
+  const checkouts = JSON.parse(document.getElementById('checkouts').textContent);
+  const points = parseInt(form.dataset.points, 10);
+  const sumLabel = document.getElementById('current-sum');
+  const tempCheckout = document.getElementById('temp-checkout');
+  const csrfToken = form.querySelector('[name=csrfmiddlewaretoken]').value;
+  let darts = [];
+
+  function checkoutCheck(playerPoints, dartsLeft) {
+    // same rules as checkout_check in darts/utils.py
+    if (playerPoints > 170) {
+      return '';
+    } else if (playerPoints === 0) {
+      return 'Win!';
+    } else if (playerPoints < 0) {
+      return 'Bust!';
+    }
+    // checkouts are the thrower's tables indexed by darts left and points, null where there is none
+    return checkouts[dartsLeft][playerPoints] || 'No possible checkout';
+  }
+
+  function currentSum() {
+    return darts.reduce((total, dart) => total + dart, 0);
+  }
+
+  function update() {
+    const sum = currentSum();
+    sumLabel.textContent = sum;
+    // after the third dart the next visit has 3 darts again
+    tempCheckout.textContent = checkoutCheck(points - sum, Math.max(3 - darts.length, 0) || 3);
+  }
+
+  function commitTurn(turn) {
+    // the server refuses the turn if the scores changed on another device since this page was loaded
+    turn.version = parseInt(form.elements.version.value, 10);
+    fetch(form.dataset.turnUrl, {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken},
+      body: JSON.stringify(turn),
+      credentials: 'same-origin',
+    }).then((response) => {
+      if (response.status === 409) {
+        return response.json().then((data) => {
+          alert(data.error);
+          window.location.reload();
+        });
+      }
+      if (!response.ok) {
+        return response.json().then((data) => { throw new Error(data.error); });
+      }
+      window.location.reload();
+    }).catch((error) => {
+      alert(error.message || 'Score could not be saved, try again.');
+    });
+  }
+
+  form.querySelectorAll('[data-dart]').forEach((button) => {
+    button.addEventListener('click', () => {
+      darts.push(parseInt(button.dataset.dart, 10));
+      update();
+    });
+  });
+
+  document.getElementById('reset-counter').addEventListener('click', () => {
+    darts = [];
+    update();
+  });
+
+  form.addEventListener('submit', (event) => {
+    event.preventDefault();
+    if (event.submitter && event.submitter.name === 'bust') {
+      commitTurn({bust: true});
+      return;
+    }
+    const turn = {darts: darts};
+    const manual = parseInt(form.elements.score_manual.value, 10);
+    if (!Number.isNaN(manual)) {
+      // manually typed score always overtakes calculated score
+      turn.score = manual;
+    }
+    if (form.elements.checkout_darts_used) {
+      turn.checkout_darts_used = parseInt(form.elements.checkout_darts_used.value, 10);
+    }
+    commitTurn(turn);
+  });
+})();
@@ -0,0 +1,75 @@
+// Live spectator scoreboard.
+// Follows the game over Server-Sent Events and patches the score table in place.
+// Without the live stream (plain WSGI deployment) the page reloads every few seconds,
+// which is cheap because the scoreboard answers 304 Not Modified until the game changes.
+(function () {
+  const page = document.getElementById('watch');
+  const checkouts = JSON.parse(document.getElementById('checkouts').textContent);
+  const checkoutLabel = document.getElementById('checkout');
+  // cricket marks, same as MARK_SYMBOLS in darts/views.py
+  const markSymbols = JSON.parse(document.getElementById('mark-symbols').textContent);
+  const RELOAD_INTERVAL = 10000;
+  let scores = null;
+
+  function checkoutCheck(playerPoints, seat) {
+    // same rules as checkout_check in darts/utils.py
+    if (playerPoints > 170) {
+      return '';
+    } else if (playerPoints === 0) {
+      return 'Win!';
+    } else if (playerPoints < 0) {
+      return 'Bust!';
+    }
+    // 3 darts tables of every seat's skill, indexed by seat and points
+    return checkouts[seat][playerPoints] || 'No possible checkout';
+  }
+
+  function render() {
+    // per player fields are lists indexed by seat
+    page.querySelectorAll('[data-field][data-seat]').forEach((cell) => {
+      cell.textContent = scores[cell.dataset.field][cell.dataset.seat];
+    });
+    page.querySelectorAll('[data-turn]').forEach((cell) => {
+      cell.classList.toggle('table-active-player', parseInt(cell.dataset.turn, 10) === scores.turn);
+    });
+    if (scores.marks) {
+      // cricket marks are packed two bits per target
+      page.querySelectorAll('[data-marks][data-seat]').forEach((cell) => {
+        const marks = scores.marks[cell.dataset.seat] >> (2 * parseInt(cell.dataset.marks, 10));
+        cell.textContent = markSymbols[marks & 3];
+      });
+      return;
+    }
+    checkoutLabel.textContent = checkoutCheck(scores.points[scores.turn], scores.turn);
+  }
+
+  function fallback() {
+    setTimeout(() => window.location.reload(), RELOAD_INTERVAL);
+  }
+
+  if (!window.EventSource) {
+    fallback();
+    return;
+  }
+  const source = new EventSource(page.dataset.liveUrl);
+  source.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.full) {
+      scores = message.scores;
+    } else if (scores) {
+      Object.assign(scores, message.changes);
+      // win chances of the new scores are simulated by the server, see odds.js
+      if (window.pollOdds) {
+        window.pollOdds(null);
+      }
+    }
+    if (scores) {
+      render();
+    }
+  };
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      fallback();
+    }
+  };
+})();
@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import Tournament, Board, Match
+
+
+admin.site.register(Tournament)
+admin.site.register(Board)
+admin.site.register(Match)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class TournamentConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tournament'
+
+    def ready(self):
+        from darts.signals import games_deleting, leg_won, undoing
+        from .scheduler import game_leg_won, game_undoing, games_deleted
+        leg_won.connect(game_leg_won, dispatch_uid='tournament_leg_won')
+        undoing.connect(game_undoing, dispatch_uid='tournament_undoing')
+        games_deleting.connect(games_deleted, dispatch_uid='tournament_games_deleting')
@@ -0,0 +1,39 @@
+from django import forms
+from django.forms import CheckboxSelectMultiple, ChoiceField
+
+from darts.models import GameChoices
+from .models import Tournament
+
+
+# players and boards a tournament can have
+MIN_PLAYERS = 2
+MAX_PLAYERS = 128
+MAX_BOARDS = 32
+
+
+class TournamentCreateForm(forms.ModelForm):
+
+    game_type = ChoiceField(choices=GameChoices.choices)
+    boards = forms.IntegerField(min_value=1, max_value=MAX_BOARDS, initial=8, help_text='Boards played on at the same time.')
+
+    class Meta:
+        model = Tournament
+        fields = ('name', 'format', 'game_type', 'best_of', 'players',)
+        widgets = {
+            'players': CheckboxSelectMultiple,
+        }
+
+    def clean_players(self):
+        data = self.cleaned_data['players']
+        if not MIN_PLAYERS <= len(data) <= MAX_PLAYERS:
+            raise forms.ValidationError(f'Select {MIN_PLAYERS} to {MAX_PLAYERS} players for a tournament!')
+        return data
+
+    def clean_game_type(self):
+        return int(self.cleaned_data['game_type'])
+
+    def clean_best_of(self):
+        data = self.cleaned_data['best_of']
+        if data % 2 == 0:
+            raise forms.ValidationError('Matches are played over an odd number of legs.')
+        return data
@@ -0,0 +1,81 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('darts', '0009_cricket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('user', '0003_player_stats_first9_checkout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Board',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'ordering': ['number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Tournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('format', models.IntegerField(choices=[(0, 'Round robin'), (1, 'Knockout')], default=1)),
+                ('game_type', models.IntegerField(choices=[(0, 'Standard 301'), (1, 'Standard 501'), (2, 'Standard 701'), (3, 'Cricket'), (4, 'Cricket Cut Throat')], default=1)),
+                ('best_of', models.PositiveSmallIntegerField(default=3)),
+                ('status', models.IntegerField(choices=[(0, 'Running'), (1, 'Finished')], default=0)),
+                ('time_created', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('players', models.ManyToManyField(related_name='tournaments', to='user.player')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournaments_won', to='user.player')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveSmallIntegerField()),
+                ('position', models.PositiveSmallIntegerField()),
+                ('status', models.IntegerField(choices=[(0, 'Pending'), (1, 'Ready'), (2, 'Playing'), (3, 'Finished')], default=0)),
+                ('next_slot', models.PositiveSmallIntegerField(default=0)),
+                ('board', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='matches', to='tournament.board')),
+                ('game_session', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='match', to='darts.gamesession')),
+                ('next_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tournament.match')),
+                ('player1', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='user.player')),
+                ('player2', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='user.player')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='tournament.tournament')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='user.player')),
+            ],
+            options={
+                'ordering': ['round', 'position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='tournament',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='boards', to='tournament.tournament'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['tournament', 'status', 'round', 'position'], name='match_queue'),
+        ),
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.UniqueConstraint(fields=('tournament', 'round', 'position'), name='unique_match_position'),
+        ),
+        migrations.AddConstraint(
+            model_name='board',
+            constraint=models.UniqueConstraint(fields=('tournament', 'number'), name='unique_board_number'),
+        ),
+    ]
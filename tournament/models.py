@@ -0,0 +1,89 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+from darts.models import GameSession, GameChoices
+from user.models import Player
+
+
+class TournamentFormat(models.IntegerChoices):
+    """ How the players of a tournament meet """
+    ROUND_ROBIN = 0, 'Round robin'
+    KNOCKOUT = 1, 'Knockout'
+
+
+class TournamentStatus(models.IntegerChoices):
+    RUNNING = 0, 'Running'
+    FINISHED = 1, 'Finished'
+
+
+class Tournament(models.Model):
+    """ Tournament or league night owned by CustomUser, its matches are played as GameSessions on its boards """
+    name = models.CharField(max_length=100)
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    format = models.IntegerField(choices=TournamentFormat.choices, default=TournamentFormat.KNOCKOUT)
+    game_type = models.IntegerField(choices=GameChoices.choices, default=GameChoices.DARTS501)
+    # legs a match is played over, the first to win more than half of them wins the match
+    best_of = models.PositiveSmallIntegerField(default=3)
+    players = models.ManyToManyField(Player, related_name='tournaments')
+    status = models.IntegerField(choices=TournamentStatus.choices, default=TournamentStatus.RUNNING)
+    winner = models.ForeignKey(Player, on_delete=models.SET_NULL, null=True, blank=True, related_name='tournaments_won')
+    time_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def legs_to_win(self):
+        return self.best_of // 2 + 1
+
+
+class Board(models.Model):
+    """ Dartboard of a tournament, plays one match at a time """
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='boards')
+    number = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['number']
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'number'], name='unique_board_number'),
+        ]
+
+    def __str__(self):
+        return f'{self.tournament} board {self.number}'
+
+
+class MatchStatus(models.IntegerChoices):
+    """ Match lifecycle: waiting for players of earlier matches, queued for a board, on a board, done """
+    PENDING = 0, 'Pending'
+    READY = 1, 'Ready'
+    PLAYING = 2, 'Playing'
+    FINISHED = 3, 'Finished'
+
+
+class Match(models.Model):
+    """ Meeting of two players in a tournament, played as one GameSession once a board is free """
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='matches')
+    round = models.PositiveSmallIntegerField()
+    position = models.PositiveSmallIntegerField()
+    player1 = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    player2 = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    status = models.IntegerField(choices=MatchStatus.choices, default=MatchStatus.PENDING)
+    board = models.ForeignKey(Board, on_delete=models.SET_NULL, null=True, blank=True, related_name='matches')
+    game_session = models.OneToOneField(GameSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='match')
+    winner = models.ForeignKey(Player, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # knockout: the match the winner moves on to and as which of its two players
+    next_match = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    next_slot = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['round', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'round', 'position'], name='unique_match_position'),
+        ]
+        indexes = [
+            # scheduler queue: ready matches of a tournament in round order, matches on the boards
+            models.Index(fields=['tournament', 'status', 'round', 'position'], name='match_queue'),
+        ]
+
+    def __str__(self):
+        return f'{self.tournament} round {self.round}: {self.player1} vs {self.player2}'
@@ -0,0 +1,200 @@
+"""
+Tournament brackets and the board scheduler.
+
+`start_tournament` lays out every match up front: all pairings of a round robin, or a knockout
+bracket whose later rounds wait for the winners of earlier ones. Matches whose two players are
+known are READY and queue for a board in round order. `schedule` puts queued matches on free
+boards as GameSessions, skipping matches of players who are still on another board.
+When a leg is won, `game_leg_won` finishes the match once a player reached the legs to win,
+moves the winner on and schedules the board again, all in the transaction of the winning turn.
+The turns of a finished match can't be undone (see `game_undoing`), its board and winner may be in use again.
+A match whose game session is deleted before it's finished queues again and its board is free (see `games_deleted`).
+
+Every lookup goes through the match_queue index or a primary key, never over all matches.
+"""
+from django.db import transaction
+
+from darts.history import start_history
+from darts.models import GameSession
+from darts.signals import UndoRefused
+from darts.utils import start_scores
+from .models import Tournament, Board, Match, MatchStatus, TournamentFormat, TournamentStatus
+
+
+def seeding_order(size):
+    """Seeds 1 to `size` in bracket order, so top seeds only meet in late rounds. `size` is a power of two"""
+    order = [1]
+    while len(order) < size:
+        order = [seed for top in order for seed in (top, len(order) * 2 + 1 - top)]
+    return order
+
+
+def round_robin_rounds(players):
+    """Every pairing of `players`, grouped in rounds where nobody plays twice (circle method)"""
+    players = list(players)
+    if len(players) % 2:
+        # odd number of players, whoever meets None sits the round out
+        players.append(None)
+    rounds = []
+    for _ in range(len(players) - 1):
+        pairs = zip(players[:len(players) // 2], reversed(players[len(players) // 2:]))
+        rounds.append([(home, away) for home, away in pairs if home is not None and away is not None])
+        # first player stays, the others move one place on
+        players = [players[0], players[-1]] + players[1:-1]
+    return rounds
+
+
+def start_tournament(tournament, boards):
+    """Creates the boards and every match of a new tournament and puts the first matches on the boards"""
+    Board.objects.bulk_create([Board(tournament=tournament, number=number) for number in range(1, boards + 1)])
+    players = list(tournament.players.order_by('name'))
+    if tournament.format == TournamentFormat.KNOCKOUT:
+        create_knockout(tournament, players)
+    else:
+        create_round_robin(tournament, players)
+    schedule(tournament)
+
+
+def create_round_robin(tournament, players):
+    Match.objects.bulk_create([
+        Match(tournament=tournament, round=round, position=position, player1=home, player2=away, status=MatchStatus.READY)
+        for round, pairs in enumerate(round_robin_rounds(players), start=1)
+        for position, (home, away) in enumerate(pairs)
+    ])
+
+
+def create_knockout(tournament, players):
+    """Bracket for the players in seed order, top seeds get the byes when the field isn't a power of two"""
+    size = 2 ** (len(players) - 1).bit_length()
+    seeds = players + [None] * (size - len(players))
+    line = [seeds[seed - 1] for seed in seeding_order(size)]
+    rounds = size.bit_length() - 1
+    # final first, so every match knows the one its winner moves on to
+    next_round = []
+    for round in range(rounds, 0, -1):
+        matches = []
+        for position in range(size >> round):
+            match = Match(tournament=tournament, round=round, position=position, next_slot=position % 2)
+            if next_round:
+                match.next_match = next_round[position // 2]
+            if round == 1:
+                match.player1, match.player2 = line[2 * position], line[2 * position + 1]
+                match.status = MatchStatus.READY
+            matches.append(match)
+        next_round = Match.objects.bulk_create(matches)
+    for match in next_round:
+        if match.player2 is None:
+            finish_match(match, match.player1_id)
+
+
+def finish_match(match, winner_id):
+    """Records the winner, moves them on in a knockout and ends the tournament after its last match"""
+    match.winner_id = winner_id
+    match.status = MatchStatus.FINISHED
+    match.save(update_fields=['winner', 'status'])
+    if match.next_match_id:
+        next_match = Match.objects.select_for_update().get(pk=match.next_match_id)
+        setattr(next_match, f'player{match.next_slot + 1}_id', winner_id)
+        if next_match.player1_id and next_match.player2_id:
+            next_match.status = MatchStatus.READY
+        next_match.save(update_fields=['player1', 'player2', 'status'])
+        return
+    tournament = match.tournament
+    if tournament.format == TournamentFormat.KNOCKOUT:
+        end_tournament(tournament, winner_id)
+    elif not Match.objects.filter(tournament=tournament, status__lt=MatchStatus.FINISHED).exists():
+        end_tournament(tournament, standings(tournament)[0]['player'].id)
+
+
+def end_tournament(tournament, winner_id):
+    tournament.winner_id = winner_id
+    tournament.status = TournamentStatus.FINISHED
+    tournament.save(update_fields=['winner', 'status'])
+
+
+def schedule(tournament):
+    """Starts ready matches on free boards in round order, a player still on a board waits for the next one.
+    Returns the started matches"""
+    with transaction.atomic():
+        # one scheduler per tournament at a time, so no board or player is given out twice
+        Tournament.objects.select_for_update().filter(pk=tournament.pk).exists()
+        busy_boards, busy_players = set(), set()
+        playing = Match.objects.filter(tournament=tournament, status=MatchStatus.PLAYING)
+        for board_id, player1_id, player2_id in playing.values_list('board_id', 'player1_id', 'player2_id'):
+            busy_boards.add(board_id)
+            busy_players.update((player1_id, player2_id))
+        free_boards = [board for board in tournament.boards.all() if board.id not in busy_boards]
+        started = []
+        if not free_boards:
+            return started
+        queue = Match.objects.filter(tournament=tournament, status=MatchStatus.READY).order_by('round', 'position')
+        for match in queue.iterator(chunk_size=100):
+            if match.player1_id in busy_players or match.player2_id in busy_players:
+                continue
+            start_match(tournament, match, free_boards.pop(0))
+            busy_players.update((match.player1_id, match.player2_id))
+            started.append(match)
+            if not free_boards:
+                break
+        return started
+
+
+def start_match(tournament, match, board):
+    """Creates the match's game session, owned by the tournament owner, and puts it on the board"""
+    seats = [match.player1_id, match.player2_id]
+    game = GameSession(owner_id=tournament.owner_id, game_type=tournament.game_type)
+    game.scores = start_scores(game, seats)
+    game.save()
+    game.players.set(seats)
+    start_history(game, game.scores)
+    match.game_session = game
+    match.board = board
+    match.status = MatchStatus.PLAYING
+    match.save(update_fields=['game_session', 'board', 'status'])
+
+
+def game_leg_won(sender, game, seat, **kwargs):
+    """leg_won receiver, finishes the game session's match when the leg winner has won enough legs"""
+    match = Match.objects.filter(game_session=game, status=MatchStatus.PLAYING).select_related('tournament').first()
+    if match is None or game.scores['games'][seat] < match.tournament.legs_to_win:
+        return
+    finish_match(match, game.scores['seats'][seat])
+    if match.tournament.status == TournamentStatus.RUNNING:
+        schedule(match.tournament)
+
+
+def game_undoing(sender, game, **kwargs):
+    """undoing receiver, keeps the turns of a finished match. Its board may be playing the next match
+    and in a knockout its winner may have moved on"""
+    if Match.objects.filter(game_session=game, status=MatchStatus.FINISHED).exists():
+        raise UndoRefused('The match of this game session is over, its turns can no longer be undone.')
+
+
+def games_deleted(sender, game_ids, **kwargs):
+    """games_deleting receiver, puts the unfinished matches of the game sessions back in the queue and
+    schedules their tournaments, the boards they were on are free"""
+    matches = Match.objects.filter(game_session_id__in=game_ids, status=MatchStatus.PLAYING)
+    tournament_ids = set(matches.values_list('tournament_id', flat=True))
+    if not tournament_ids:
+        return
+    matches.update(status=MatchStatus.READY, board=None, game_session=None)
+    for tournament in Tournament.objects.filter(pk__in=tournament_ids, status=TournamentStatus.RUNNING):
+        schedule(tournament)
+
+
+def standings(tournament):
+    """Players of a tournament by matches won, then legs won"""
+    rows = {player.id: {'player': player, 'played': 0, 'won': 0, 'legs': 0} for player in tournament.players.all()}
+    finished = Match.objects.filter(tournament=tournament, status=MatchStatus.FINISHED).select_related('game_session')
+    for match in finished:
+        if match.winner_id in rows:
+            rows[match.winner_id]['won'] += 1
+        if match.game_session is None:
+            # bye
+            continue
+        scores = match.game_session.scores
+        for player_id, legs in zip(scores['seats'], scores['games']):
+            if player_id in rows:
+                rows[player_id]['played'] += 1
+                rows[player_id]['legs'] += legs
+    return sorted(rows.values(), key=lambda row: (-row['won'], -row['legs'], row['player'].name))
@@ -0,0 +1,128 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from darts.db import delete_game_sessions
+from darts.models import GameSession
+from user.models import Player
+from .models import Tournament, Match, MatchStatus, TournamentFormat, TournamentStatus
+from .scheduler import seeding_order, round_robin_rounds
+
+
+class BracketTests(SimpleTestCase):
+
+    def test_seeding_order(self):
+        self.assertEqual(seeding_order(8), [1, 8, 4, 5, 2, 7, 3, 6])
+
+    def test_round_robin_pairs_everyone_once(self):
+        for count in (4, 5):
+            rounds = round_robin_rounds(range(count))
+            pairs = [frozenset(pair) for pairs in rounds for pair in pairs]
+            self.assertEqual(len(pairs), count * (count - 1) // 2)
+            self.assertEqual(len(set(pairs)), len(pairs))
+            for pairs in rounds:
+                players = [player for pair in pairs for player in pair]
+                self.assertEqual(len(players), len(set(players)))
+
+
+class TournamentTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('darts', 'darts@example.com', 'password')
+        self.client.force_login(self.user)
+        self.players = [Player.objects.create(name=name, owner=self.user) for name in ('Anna', 'Bert', 'Cleo', 'Dave', 'Emil')]
+
+    def create(self, tournament_format, players, boards):
+        self.client.post(reverse('tournament_create'), {
+            'name': 'Friday league', 'format': tournament_format, 'game_type': 0, 'best_of': 1, 'boards': boards,
+            'players': [player.id for player in players],
+        })
+        return Tournament.objects.get()
+
+    def win_match(self, match):
+        """First player checks out 301 in two visits"""
+        url = reverse('turn', kwargs={'uuid': match.game_session.uuid})
+        for score in (180, 0, 121):
+            self.client.post(url, json.dumps({'score': score}), content_type='application/json')
+        match.refresh_from_db()
+
+    def playing(self, tournament):
+        return list(Match.objects.filter(tournament=tournament, status=MatchStatus.PLAYING).select_related('game_session'))
+
+    def test_knockout_advances_winners(self):
+        tournament = self.create(TournamentFormat.KNOCKOUT, self.players, boards=2)
+        # 5 players in a bracket of 8, the top 3 seeds get byes
+        self.assertEqual(Match.objects.filter(tournament=tournament, round=1, player2=None, status=MatchStatus.FINISHED).count(), 3)
+        # Bert and Cleo both had byes and meet in round 2 already
+        playing = self.playing(tournament)
+        self.assertEqual(
+            [(match.round, match.player1, match.player2) for match in playing],
+            [(1, self.players[3], self.players[4]), (2, self.players[1], self.players[2])],
+        )
+        self.win_match(playing[0])
+        self.assertEqual(playing[0].winner, self.players[3])
+        # the freed board goes to Anna against the winner
+        self.assertEqual(
+            [(match.player1, match.player2) for match in self.playing(tournament)],
+            [(self.players[0], self.players[3]), (self.players[1], self.players[2])],
+        )
+        while tournament.status == TournamentStatus.RUNNING:
+            for match in self.playing(tournament):
+                self.win_match(match)
+            tournament.refresh_from_db()
+        self.assertEqual(tournament.winner, self.players[0])
+
+    def test_round_robin_never_seats_a_player_twice(self):
+        tournament = self.create(TournamentFormat.ROUND_ROBIN, self.players[:4], boards=3)
+        for _ in range(6):
+            playing = self.playing(tournament)
+            players = [player for match in playing for player in (match.player1_id, match.player2_id)]
+            self.assertEqual(len(players), len(set(players)))
+            self.assertEqual(len({match.board_id for match in playing}), len(playing))
+            self.win_match(playing[0])
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, TournamentStatus.FINISHED)
+        response = self.client.get(reverse('tournament_detail', kwargs={'pk': tournament.pk}))
+        self.assertEqual(sum(row['won'] for row in response.context['standings']), 6)
+        self.assertEqual(response.context['standings'][0]['player'], tournament.winner)
+        self.assertContains(self.client.get(reverse('tournaments')), f'Won by {tournament.winner}')
+
+    def test_finished_match_can_not_be_undone(self):
+        tournament = self.create(TournamentFormat.KNOCKOUT, self.players[:4], boards=1)
+        match = self.playing(tournament)[0]
+        game = match.game_session
+        response = self.client.post(reverse('play', kwargs={'uuid': game.uuid}), {'undo': 'undo'})
+        self.assertEqual(response.status_code, 200)
+        self.win_match(match)
+        self.assertEqual(match.status, MatchStatus.FINISHED)
+        response = self.client.post(reverse('play', kwargs={'uuid': game.uuid}), {'undo': 'undo'})
+        self.assertContains(response, 'its turns can no longer be undone')
+        response = self.client.post(reverse('api_session_undo', kwargs={'uuid': game.uuid}), '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        game.refresh_from_db()
+        self.assertEqual((game.turn_count, game.scores['games']), (3, [1, 0]))
+        match.refresh_from_db()
+        self.assertEqual((match.status, match.winner_id), (MatchStatus.FINISHED, match.player1_id))
+        # the winner has moved on and the board plays the next match
+        self.assertEqual(Match.objects.get(pk=match.next_match_id).player1_id, match.player1_id)
+        self.assertEqual(self.playing(tournament)[0].board_id, match.board_id)
+
+    def test_deleted_game_puts_its_match_back_in_the_queue(self):
+        tournament = self.create(TournamentFormat.ROUND_ROBIN, self.players[:4], boards=1)
+        match = self.playing(tournament)[0]
+        game = match.game_session
+        self.client.post(reverse('game_delete', kwargs={'uuid': game.uuid}))
+        self.assertFalse(GameSession.objects.filter(pk=game.pk).exists())
+        # the board is free and the match is the first in the queue again, with a new game session
+        replayed = self.playing(tournament)
+        self.assertEqual([(other.pk, other.board_id) for other in replayed], [(match.pk, match.board_id)])
+        self.assertNotEqual(replayed[0].game_session_id, game.pk)
+        # deleting the games of a player's sessions does the same
+        delete_game_sessions(GameSession.objects.filter(pk=replayed[0].game_session_id))
+        self.assertEqual([other.pk for other in self.playing(tournament)], [match.pk])
+        self.win_match(self.playing(tournament)[0])
+        self.assertEqual(Match.objects.get(pk=match.pk).status, MatchStatus.FINISHED)
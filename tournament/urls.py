@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+
+urlpatterns = [
+    path('', views.TournamentListView.as_view(), name='tournaments'),
+    path('create/', views.TournamentCreateView.as_view(), name='tournament_create'),
+    path('<int:pk>/', views.TournamentDetailView.as_view(), name='tournament_detail'),
+]
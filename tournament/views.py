@@ -0,0 +1,70 @@
+from itertools import groupby
+
+from django.db import transaction
+from django.urls import reverse
+from django.views.generic import CreateView, DetailView, ListView
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.messages.views import SuccessMessageMixin
+
+from user.models import Player
+from .forms import TournamentCreateForm
+from .models import Tournament, Match, MatchStatus, TournamentFormat
+from .scheduler import start_tournament, standings
+
+
+class TournamentListView(LoginRequiredMixin, ListView):
+    model = Tournament
+    template_name = 'tournaments_list.html'
+    context_object_name = 'tournaments'
+
+    def get_queryset(self):
+        return self.model.objects.filter(owner=self.request.user).select_related('winner').order_by('-time_created')
+
+
+class TournamentCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
+    """Creates a tournament with all of its matches and starts the first ones on the boards"""
+    model = Tournament
+    form_class = TournamentCreateForm
+    template_name = 'tournament_create.html'
+    success_message = 'Tournament created successfully'
+
+    def form_valid(self, form):
+        form.instance.owner = self.request.user
+        with transaction.atomic():
+            response = super().form_valid(form)
+            start_tournament(self.object, form.cleaned_data['boards'])
+        return response
+
+    def get_form(self, *args, **kwargs):
+        '''Show only players owned by logged in user'''
+        form = super().get_form(*args, **kwargs)
+        form.fields['players'].queryset = Player.objects.filter(owner=self.request.user).order_by('name')
+        return form
+
+    def get_success_url(self):
+        return reverse('tournament_detail', kwargs={'pk': self.object.pk})
+
+
+class TournamentDetailView(LoginRequiredMixin, DetailView):
+    '''Boards with their current matches, the matches by round and the round robin table'''
+    model = Tournament
+    template_name = 'tournament_detail.html'
+    context_object_name = 'tournament'
+
+    def get_queryset(self):
+        return self.model.objects.filter(owner=self.request.user).select_related('winner')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tournament = self.object
+        matches = list(
+            Match.objects.filter(tournament=tournament)
+            .select_related('player1', 'player2', 'winner', 'board', 'game_session')
+            .order_by('round', 'position')
+        )
+        context['boards'] = [match for match in matches if match.status == MatchStatus.PLAYING]
+        context['queued'] = sum(match.status == MatchStatus.READY for match in matches)
+        context['rounds'] = [(round, list(round_matches)) for round, round_matches in groupby(matches, key=lambda match: match.round)]
+        if tournament.format == TournamentFormat.ROUND_ROBIN:
+            context['standings'] = standings(tournament)
+        return context
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from .forms import CustomUserCreationForm, CustomUserChangeForm
-from .models import CustomUser, Player
+from .models import CustomUser, Player, PlayerStats
 
 
 class CustomUserAdmin(UserAdmin):
@@ -12,4 +12,5 @@ class CustomUserAdmin(UserAdmin):
     
 
 admin.site.register(CustomUser, CustomUserAdmin)
-admin.site.register(Player)
\ No newline at end of file
+admin.site.register(Player)
+admin.site.register(PlayerStats)
\ No newline at end of file
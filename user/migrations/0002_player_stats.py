@@ -0,0 +1,31 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('darts', models.PositiveIntegerField(default=0)),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('busts', models.PositiveIntegerField(default=0)),
+                ('scores_100_plus', models.PositiveIntegerField(default=0)),
+                ('scores_140_plus', models.PositiveIntegerField(default=0)),
+                ('scores_180', models.PositiveIntegerField(default=0)),
+                ('legs_won', models.PositiveIntegerField(default=0)),
+                ('legs_won_darts', models.PositiveIntegerField(default=0)),
+                ('highest_checkout', models.PositiveIntegerField(default=0)),
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='user.player')),
+            ],
+        ),
+    ]
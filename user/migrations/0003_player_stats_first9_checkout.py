@@ -0,0 +1,33 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_player_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerstats',
+            name='checkout_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playerstats',
+            name='first9_darts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playerstats',
+            name='first9_points',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playerstats',
+            name='scores_60_plus',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -15,25 +15,60 @@ class Player(models.Model):
     """ Players are owned by CustomUser, one CustomUser can have many Players """
     name = models.CharField(max_length=20)
     owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
-    # standard_all_time_average = models.PositiveIntegerField(default=0)
-    # standard_all_time_tries = models.PositiveIntegerField(default=0)
-    # standard_number_of_180s = models.PositiveBigIntegerField(default=0)
-    # standard_highest_checkout = models.PositiveIntegerField(default=0)
-    # cricket_all_time_average
-    # cricket_lowest_round_win
     
     def __str__(self):
         return self.name
+
+
+class PlayerStats(models.Model):
+    """ All time X01 stats of a Player, kept up to date with every committed turn """
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, related_name='stats')
+    visits = models.PositiveIntegerField(default=0)
+    darts = models.PositiveIntegerField(default=0)
+    points = models.PositiveIntegerField(default=0)
+    busts = models.PositiveIntegerField(default=0)
+    scores_60_plus = models.PositiveIntegerField(default=0)
+    scores_100_plus = models.PositiveIntegerField(default=0)
+    scores_140_plus = models.PositiveIntegerField(default=0)
+    scores_180 = models.PositiveIntegerField(default=0)
+    legs_won = models.PositiveIntegerField(default=0)
+    legs_won_darts = models.PositiveIntegerField(default=0)
+    highest_checkout = models.PositiveIntegerField(default=0)
+    # visits that started on a score that can be checked out with three darts
+    checkout_attempts = models.PositiveIntegerField(default=0)
+    first9_points = models.PositiveIntegerField(default=0)
+    first9_darts = models.PositiveIntegerField(default=0)
     
-    """
-    implement new features: Player stats...
-    
-    standard_all_time_average = load current from db
-    standard_all_time_tries = load current from db
+    def __str__(self):
+        return f'{self.player} stats'
+
+    @property
+    def average(self):
+        """Three dart average over all visits"""
+        return round(self.points / self.darts * 3, 1) if self.darts else 0
+
+    @property
+    def first9_average(self):
+        """Three dart average over the first nine darts of each leg"""
+        return round(self.first9_points / self.first9_darts * 3, 1) if self.first9_darts else 0
+
+    @property
+    def checkout_percentage(self):
+        return round(self.legs_won / self.checkout_attempts * 100, 1) if self.checkout_attempts else 0
 
-    new_avg = (standard_all_time_average * standard_all_time_tries + player_points) / (standard_all_time_tries + 1)
+    @property
+    def score_distribution(self):
+        """Visits per score band"""
+        top = self.scores_60_plus + self.scores_100_plus + self.scores_140_plus + self.scores_180
+        return {
+            '0-59': self.visits - top,
+            '60-99': self.scores_60_plus,
+            '100-139': self.scores_100_plus,
+            '140-179': self.scores_140_plus,
+            '180': self.scores_180,
+        }
 
-    standard_all_time_tries += 1
-    standard_all_time_average = new_avg
-    save to db
-    """
\ No newline at end of file
+    @property
+    def darts_per_leg(self):
+        """Average darts needed for a won leg"""
+        return round(self.legs_won_darts / self.legs_won, 1) if self.legs_won else 0
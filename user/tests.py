@@ -1,3 +1,64 @@
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from darts.models import Achievement, AchievementKind, Dartboard, GameSession, LegRecord, Snapshot, Turn
+from darts.utils import new_scores
+from .models import Player, PlayerStats
+
+
+class PlayerDeleteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('darts', 'darts@example.com', 'password')
+        self.client.force_login(self.user)
+
+    def player_with_history(self, games_count):
+        """Player with games_count game sessions against another player, 10 turns, a snapshot and an archived leg each.
+        The first game session is on a dartboard"""
+        player = Player.objects.create(name='Anna', owner=self.user)
+        opponent = Player.objects.create(name='Bert', owner=self.user)
+        PlayerStats.objects.create(player=player)
+        for _ in range(games_count):
+            game = GameSession.objects.create(owner=self.user, scores=new_scores(501, [player.id, opponent.id]))
+            game.players.set([player, opponent])
+            Snapshot.objects.create(game_session=game, sequence=0, scores=game.scores)
+            turns = Turn.objects.bulk_create(
+                Turn(game_session=game, sequence=sequence, seat=sequence % 2, player=player, score=60) for sequence in range(1, 11)
+            )
+            leg = LegRecord.objects.create(turn=turns[-1], game_session=game, winner=player, darts=30, checkout=60, average=50)
+            Achievement.objects.create(player=player, leg=leg, kind=AchievementKind.PERFECT_LEG)
+        Dartboard.objects.create(owner=self.user, name='Board', game_session=GameSession.objects.first())
+        return player
+
+    def delete_queries(self, games_count):
+        player = self.player_with_history(games_count)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('players_delete', kwargs={'pk': player.pk}))
+        self.assertRedirects(response, reverse('players'))
+        self.assertFalse(Player.objects.filter(pk=player.pk).exists())
+        self.assertFalse(GameSession.objects.exists())
+        self.assertFalse(Turn.objects.exists() or Snapshot.objects.exists() or LegRecord.objects.exists() or Achievement.objects.exists())
+        self.assertIsNone(Dartboard.objects.get().game_session)
+        # nothing of any app is left pointing at a deleted game session
+        for related in GameSession._meta.get_fields(include_hidden=True):
+            if related.auto_created and not related.concrete:
+                rows = related.related_model._base_manager.filter(**{f'{related.field.name}__isnull': False})
+                self.assertFalse(rows.exists(), related.related_model)
+        Player.objects.all().delete()
+        Dartboard.objects.all().delete()
+        return len(queries)
+
+    def test_query_count_independent_of_history(self):
+        self.assertEqual(self.delete_queries(2), self.delete_queries(40))
 
-# Create your tests here.
+    def test_only_own_players_can_be_deleted(self):
+        other = get_user_model().objects.create_user('other', 'other@example.com', 'password')
+        player = Player.objects.create(name='Cleo', owner=other)
+        self.assertEqual(self.client.post(reverse('players_delete', kwargs={'pk': player.pk})).status_code, 404)
+        self.assertTrue(Player.objects.filter(pk=player.pk).exists())
@@ -1,8 +1,11 @@
 from django.urls import reverse_lazy
-from django.views.generic import CreateView, UpdateView, ListView, DeleteView
+from django.views.generic import CreateView, UpdateView, ListView, DeleteView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.contrib import messages
+from django.shortcuts import redirect
 
+from darts.db import delete_player
 from .forms import PlayerForm
 from .models import Player
 
@@ -33,7 +36,17 @@ class PlayerListView(LoginRequiredMixin, ListView):
     context_object_name = 'players'
     
     def get_queryset(self):
-        return self.model.objects.filter(owner=self.request.user).order_by('name')
+        return self.model.objects.filter(owner=self.request.user).select_related('stats').order_by('name')
+
+
+class PlayerDetailView(LoginRequiredMixin, DetailView):
+    '''Player profile with precomputed all time stats'''
+    model = Player
+    template_name = 'players_detail.html'
+    context_object_name = 'player'
+    
+    def get_queryset(self):
+        return self.model.objects.filter(owner=self.request.user).select_related('stats')
     
 
 class PlayerUpdateView(LoginRequiredMixin, PassRequestToFormViewMixin, SuccessMessageMixin, UpdateView):
@@ -51,11 +64,13 @@ class PlayerDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
     context_object_name = 'player'
     success_url = reverse_lazy('players')
     success_message = 'Player deleted successfully'
-    
-    def form_valid(self, form, *args, **kwargs):
-        # Delete all related player's game sessions
-        player = Player.objects.get(id=self.kwargs['pk'])
-        player_game_sessions = player.game_session.all()
-        for session in player_game_sessions:
-            session.delete()
-        return super().form_valid(form, *args, **kwargs)
\ No newline at end of file
+
+    def get_queryset(self):
+        return self.model.objects.filter(owner=self.request.user)
+
+    def form_valid(self, form):
+        # player's game sessions and their whole history go in a set delete per table,
+        # so neither the number of queries nor the rows loaded grow with the player's history
+        delete_player(self.object)
+        messages.success(self.request, self.get_success_message(form.cleaned_data))
+        return redirect(self.get_success_url())